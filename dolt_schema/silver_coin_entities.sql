@@ -0,0 +1,13 @@
+
+CREATE TABLE silver_coin_entities (
+    source_site VARCHAR(100) NOT NULL, 
+    coin_unique_source_id VARCHAR(100) NOT NULL, 
+    coin_entity_id VARCHAR(250) NOT NULL, 
+    coin_entity_name VARCHAR(200) NOT NULL, 
+    coin_entity_symbol VARCHAR(100), 
+    coin_entity_record_count BIGINT NOT NULL, 
+    created_at DATETIME DEFAULT now() NOT NULL, 
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP NOT NULL, 
+    PRIMARY KEY (source_site, coin_unique_source_id)
+)
+
@@ -17,3 +17,52 @@ def is_dry_run() -> bool:
     if dry_run:
         logger.info("⚠️ Running in DRY RUN mode. No data will be written to Dolt.")
     return dry_run
+
+
+def is_strict_validation() -> bool:
+    """Return True if every Parquet file read must be fully re-validated.
+
+    Determined by the environment variable STRICT_VALIDATION. Otherwise, files with a
+    matching validation stamp skip re-validation.
+    """
+    strict_validation: bool = os.getenv("STRICT_VALIDATION", "").lower() == "true"
+    if strict_validation:
+        logger.info("Running in STRICT VALIDATION mode. All reads are re-validated.")
+    return strict_validation
+
+
+def is_incremental_gold() -> bool:
+    """Return True if gold tables should only recompute the groups with silver deltas.
+
+    Determined by the environment variable INCREMENTAL_GOLD. Otherwise, gold tables are
+    fully recomputed from the silver tables.
+    """
+    incremental_gold: bool = os.getenv("INCREMENTAL_GOLD", "").lower() == "true"
+    if incremental_gold:
+        logger.info("Running in INCREMENTAL GOLD mode. Only changed groups recomputed.")
+    return incremental_gold
+
+
+def is_step_cache_disabled() -> bool:
+    """Return True if cached pipeline steps must always run.
+
+    Determined by the environment variable DISABLE_STEP_CACHE. Otherwise, steps whose
+    inputs and code are unchanged since their last run are skipped.
+    """
+    step_cache_disabled: bool = os.getenv("DISABLE_STEP_CACHE", "").lower() == "true"
+    if step_cache_disabled:
+        logger.info("Running with STEP CACHE DISABLED. All steps run.")
+    return step_cache_disabled
+
+
+def get_dolt_write_branch() -> str | None:
+    """Return the Dolt branch to commit and push to, or None to push to `main`.
+
+    Determined by the environment variable DOLT_WRITE_BRANCH (e.g.,
+    `auto/minerstat-<run id>`), so that concurrent jobs push without contention.
+    The branches are merged into `main` afterwards by `dolt_merge_branches.py`.
+    """
+    write_branch = os.getenv("DOLT_WRITE_BRANCH", "").strip() or None
+    if write_branch:
+        logger.info(f"Writing to Dolt branch {write_branch} (merged into main later).")
+    return write_branch
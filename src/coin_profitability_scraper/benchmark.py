@@ -0,0 +1,499 @@
+"""Offline benchmarks of the parsers and transforms, over recorded fixtures.
+
+Fixtures are recorded from the `./out/` folder of a previous (online) pipeline run,
+keeping their relative paths. Benchmarks then run with a temporary copy of the
+fixtures folder as the working directory, so that each step's own input paths resolve
+to the fixtures, and its outputs (e.g., validation failures) don't touch them. No
+network access is needed, and the upsert diff runs against an in-memory SQLite
+stand-in for Dolt.
+
+Usage:
+    uv run src/coin_profitability_scraper/benchmark.py record
+    uv run src/coin_profitability_scraper/benchmark.py run [--update-baseline]
+"""
+
+import argparse
+import contextlib
+import shutil
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Mapping, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+
+import orjson
+import polars as pl
+import sqlalchemy
+from loguru import logger
+
+from coin_profitability_scraper.crypto_slate.step_1_scrape import (
+    step_1_html_folder_path,
+)
+from coin_profitability_scraper.crypto_slate.step_2_parse_scrape import (
+    _load_file_fetch_data,
+)
+from coin_profitability_scraper.cryptodelver.step_1_scrape_coins_lists import (
+    cryptodelver_step1_output_path,
+)
+from coin_profitability_scraper.cryptodelver.step_3_ingest_coins_lists import (
+    _extract_table_data,
+)
+from coin_profitability_scraper.dolt_util import find_changed_rows
+from coin_profitability_scraper.dy_util import read_validated_parquet
+from coin_profitability_scraper.minerstat.step_1a_algo_list import (
+    load_minerstat_table_from_html,
+    step_1a_output_folder_path,
+)
+from coin_profitability_scraper.minerstat.step_2b_scrape_each_coin_page import (
+    step_2b_output_folder_path,
+)
+from coin_profitability_scraper.minerstat.step_3b_ingest_each_coin_page import (
+    _ingest_coin_page,
+)
+from coin_profitability_scraper.miningnow.step_1_scrape_data import (
+    extract_valid_json_substrings,
+    miningnow_step1_output_path,
+)
+from coin_profitability_scraper.reports import (
+    aliases,
+    silver_stacked_coins,
+    silver_stacked_miners,
+)
+from coin_profitability_scraper.reports.gold_algorithms import (
+    DySchemaGoldAlgorithms,
+    _compute_gold_algorithms,
+)
+from coin_profitability_scraper.reports.silver_coin_entities import (
+    DySchemaSilverCoinEntities,
+    resolve_coin_entities,
+)
+from coin_profitability_scraper.reports.silver_stacked_coins import (
+    DySchemaSilverStackedCoins,
+)
+from coin_profitability_scraper.reports.silver_stacked_miners import (
+    DySchemaSilverStackedMiners,
+)
+from coin_profitability_scraper.tables import table_to_path_and_schema
+from coin_profitability_scraper.whattomine.step_1_api_fetch import (
+    asics_api_data_json_path,
+    coins_api_data_json_path,
+    gpus_api_data_json_path,
+)
+from coin_profitability_scraper.whattomine.step_2_ingest_coins_api import (
+    load_coin_list_df,
+)
+from coin_profitability_scraper.whattomine.step_3_ingest_miners_apis import (
+    load_miner_types_df,
+)
+
+benchmark_output_folder = Path("./out/benchmark/")
+benchmark_fixtures_folder = benchmark_output_folder / "fixtures"
+benchmark_baseline_path = benchmark_output_folder / "benchmark_baseline.json"
+benchmark_results_path = benchmark_output_folder / "benchmark_results.parquet"
+
+_miningnow_coins_json_text_path = (
+    miningnow_step1_output_path
+    / "preview"
+    / "checkpoint_3_miningnow_coins_after_split.txt"
+)
+_silver_stacked_coins_path = table_to_path_and_schema["silver_stacked_coins"][0]
+_silver_coin_entities_path = table_to_path_and_schema["silver_coin_entities"][0]
+_silver_stacked_miners_path = table_to_path_and_schema["silver_stacked_miners"][0]
+_gold_algorithms_path = table_to_path_and_schema["gold_algorithms"][0]
+
+
+@dataclass(frozen=True, kw_only=True)
+class BenchmarkCase:
+    """A benchmark of one parser or transform.
+
+    `prepare()` loads the fixtures (untimed), and returns the timed function, which
+    returns the number of items (pages, rows, etc.) it processed. `cache_paths` are
+    deleted before each repeat (untimed), so that every repeat runs cold.
+    """
+
+    name: str
+    fixture_paths: tuple[Path, ...]
+    prepare: Callable[[], Callable[[], int]]
+    cache_paths: tuple[Path, ...] = ()
+
+
+def _prepare_minerstat_algorithms_table() -> Callable[[], int]:
+    html_content = (
+        step_1a_output_folder_path / "minerstat_algorithms.html"
+    ).read_bytes()
+    return lambda: load_minerstat_table_from_html(html_content).height
+
+
+def _prepare_minerstat_coin_pages() -> Callable[[], int]:
+    pages = [
+        (path.stem, path.read_text())
+        for path in sorted(step_2b_output_folder_path.glob("*.html"))
+    ]
+
+    def run() -> int:
+        for coin_slug, html_content in pages:
+            _ingest_coin_page(html_content, coin_slug=coin_slug)
+        return len(pages)
+
+    return run
+
+
+def _prepare_cryptoslate_coin_pages() -> Callable[[], int]:
+    paths = sorted(step_1_html_folder_path.glob("*.html"))
+
+    def run() -> int:
+        for path in paths:
+            _load_file_fetch_data(path)
+        return len(paths)
+
+    return run
+
+
+def _prepare_cryptodelver_list_pages() -> Callable[[], int]:
+    pages = [
+        path.read_text()
+        for path in sorted(cryptodelver_step1_output_path.glob("*.html"))
+    ]
+    return lambda: sum(len(_extract_table_data(page)) for page in pages)
+
+
+def _prepare_miningnow_extract_json() -> Callable[[], int]:
+    text = _miningnow_coins_json_text_path.read_text()
+    return lambda: len(extract_valid_json_substrings(text))
+
+
+def _prepare_whattomine_coins() -> Callable[[], int]:
+    coins_api_data = orjson.loads(coins_api_data_json_path.read_bytes())
+    return lambda: load_coin_list_df(coins_api_data).height
+
+
+def _prepare_whattomine_miners() -> Callable[[], int]:
+    asics_list = orjson.loads(asics_api_data_json_path.read_bytes())
+    gpus_list = orjson.loads(gpus_api_data_json_path.read_bytes())
+    return lambda: load_miner_types_df(
+        asics_list=asics_list, gpus_list=gpus_list
+    ).height
+
+
+def _prepare_silver_stacked_coins() -> Callable[[], int]:
+    return lambda: silver_stacked_coins._silver_stacked_coins().height  # noqa: SLF001
+
+
+def _prepare_silver_stacked_miners() -> Callable[[], int]:
+    get_silver_stacked_miners = silver_stacked_miners._get_silver_stacked_miners  # noqa: SLF001
+    return lambda: get_silver_stacked_miners().height
+
+
+def _prepare_silver_coin_entities() -> Callable[[], int]:
+    df_coins = read_validated_parquet(
+        _silver_stacked_coins_path, DySchemaSilverStackedCoins
+    )
+    return lambda: resolve_coin_entities(df_coins).height
+
+
+def _prepare_gold_algorithms() -> Callable[[], int]:
+    df_coins = read_validated_parquet(
+        _silver_stacked_coins_path, DySchemaSilverStackedCoins
+    )
+    df_entities = read_validated_parquet(
+        _silver_coin_entities_path, DySchemaSilverCoinEntities
+    )
+    df_miners = read_validated_parquet(
+        _silver_stacked_miners_path, DySchemaSilverStackedMiners
+    )
+    return lambda: _compute_gold_algorithms(df_coins, df_entities, df_miners).height
+
+
+def _prepare_upsert_diff() -> Callable[[], int]:
+    """Diff the gold table (with 1% of rows changed) against an SQLite stand-in."""
+    df = read_validated_parquet(_gold_algorithms_path, DySchemaGoldAlgorithms)
+    df = df.with_columns(
+        (pl.selectors.enum() | pl.selectors.categorical()).cast(pl.String)
+    )
+
+    engine = sqlalchemy.create_engine("sqlite://")
+    table = sqlalchemy.Table(
+        "gold_algorithms",
+        sqlalchemy.MetaData(),
+        *DySchemaGoldAlgorithms.to_sqlalchemy_columns(  # pyright: ignore[reportUnknownMemberType,reportUnknownArgumentType]
+            dialect=engine.dialect
+        ),
+    )
+    table.create(engine)
+    with engine.begin() as conn:
+        conn.execute(sqlalchemy.insert(table), df.to_dicts())
+
+    df_new = df.with_columns(
+        pl.when(pl.int_range(pl.len()) % 100 == 0)
+        .then(pl.col("algo_name") + " (changed)")
+        .otherwise(pl.col("algo_name"))
+        .alias("algo_name")
+    )
+
+    def run() -> int:
+        df_current = pl.read_database(
+            "SELECT * FROM gold_algorithms", engine, infer_schema_length=None
+        )
+        find_changed_rows(df_new, df_current)
+        return df_new.height
+
+    return run
+
+
+BENCHMARK_CASES: tuple[BenchmarkCase, ...] = (
+    BenchmarkCase(
+        name="minerstat.load_minerstat_table_from_html",
+        fixture_paths=(step_1a_output_folder_path / "minerstat_algorithms.html",),
+        prepare=_prepare_minerstat_algorithms_table,
+    ),
+    BenchmarkCase(
+        name="minerstat.ingest_coin_page",
+        fixture_paths=(step_2b_output_folder_path,),
+        prepare=_prepare_minerstat_coin_pages,
+    ),
+    BenchmarkCase(
+        name="crypto_slate.load_file_fetch_data",
+        fixture_paths=(step_1_html_folder_path,),
+        prepare=_prepare_cryptoslate_coin_pages,
+    ),
+    BenchmarkCase(
+        name="cryptodelver.extract_table_data",
+        fixture_paths=(cryptodelver_step1_output_path,),
+        prepare=_prepare_cryptodelver_list_pages,
+    ),
+    BenchmarkCase(
+        name="miningnow.extract_valid_json_substrings",
+        fixture_paths=(_miningnow_coins_json_text_path,),
+        prepare=_prepare_miningnow_extract_json,
+    ),
+    BenchmarkCase(
+        name="whattomine.load_coin_list_df",
+        fixture_paths=(coins_api_data_json_path,),
+        prepare=_prepare_whattomine_coins,
+    ),
+    BenchmarkCase(
+        name="whattomine.load_miner_types_df",
+        fixture_paths=(asics_api_data_json_path, gpus_api_data_json_path),
+        prepare=_prepare_whattomine_miners,
+    ),
+    BenchmarkCase(
+        name="reports.silver_stacked_coins",
+        fixture_paths=tuple(
+            silver_stacked_coins.output_folder / f"src_{table_name}.parquet"
+            for table_name in (
+                "crypto51_coins",
+                "cryptodelver_coins",
+                "cryptoslate_coins",
+                "minerstat_coins",
+                "miningnow_coins",
+                "whattomine_coins",
+                "wheretomine_coins",
+            )
+        ),
+        prepare=_prepare_silver_stacked_coins,
+        cache_paths=(aliases.algorithm_name_cache_folder,),
+    ),
+    BenchmarkCase(
+        name="reports.silver_stacked_miners",
+        fixture_paths=(
+            silver_stacked_miners.output_folder / "src_miningnow_asics.parquet",
+            silver_stacked_miners.output_folder / "src_whattomine_miners.parquet",
+        ),
+        prepare=_prepare_silver_stacked_miners,
+        cache_paths=(aliases.algorithm_name_cache_folder,),
+    ),
+    BenchmarkCase(
+        name="reports.resolve_coin_entities",
+        fixture_paths=(_silver_stacked_coins_path,),
+        prepare=_prepare_silver_coin_entities,
+    ),
+    BenchmarkCase(
+        name="reports.compute_gold_algorithms",
+        fixture_paths=(
+            _silver_stacked_coins_path,
+            _silver_coin_entities_path,
+            _silver_stacked_miners_path,
+        ),
+        prepare=_prepare_gold_algorithms,
+    ),
+    BenchmarkCase(
+        name="dolt_util.find_changed_rows",
+        fixture_paths=(_gold_algorithms_path,),
+        prepare=_prepare_upsert_diff,
+    ),
+)
+
+
+def record_fixtures(
+    cases: Sequence[BenchmarkCase] = BENCHMARK_CASES,
+    *,
+    fixtures_folder: Path = benchmark_fixtures_folder,
+    max_files_per_folder: int = 3000,
+) -> None:
+    """Copy the fixtures of each case from the current `./out/` folder.
+
+    Folders are capped to their first `max_files_per_folder` files (sorted by name).
+    """
+    for case in cases:
+        for fixture_path in case.fixture_paths:
+            if not fixture_path.exists():
+                logger.warning(f"Missing fixture for {case.name}: {fixture_path}")
+                continue
+
+            source_paths = (
+                sorted(p for p in fixture_path.iterdir() if p.is_file())[
+                    :max_files_per_folder
+                ]
+                if fixture_path.is_dir()
+                else [fixture_path]
+            )
+            for source_path in source_paths:
+                destination_path = fixtures_folder / source_path
+                destination_path.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(source_path, destination_path)
+            logger.info(f"Recorded {len(source_paths)} fixture files: {fixture_path}")
+
+
+def run_benchmarks(
+    cases: Sequence[BenchmarkCase] = BENCHMARK_CASES,
+    *,
+    fixtures_folder: Path = benchmark_fixtures_folder,
+    repeats: int = 3,
+) -> pl.DataFrame:
+    """Run each case `repeats` times (in the fixtures folder), keeping the best time.
+
+    Runs in a temporary copy of the fixtures folder, so that outputs written by the
+    cases are discarded. Cases with missing fixtures are skipped.
+
+    Has unit test.
+    """
+    results: list[dict[str, str | int | float]] = []
+    with tempfile.TemporaryDirectory(prefix="benchmark_") as work_folder:
+        shutil.copytree(fixtures_folder, work_folder, dirs_exist_ok=True)
+        with contextlib.chdir(work_folder):
+            for case in cases:
+                result = _run_benchmark_case(case, repeats=repeats)
+                if result is not None:
+                    results.append(result)
+
+    return pl.DataFrame(
+        results,
+        schema={
+            "case_name": pl.String,
+            "item_count": pl.Int64,
+            "best_seconds": pl.Float64,
+            "items_per_second": pl.Float64,
+        },
+    )
+
+
+def _run_benchmark_case(
+    case: BenchmarkCase, *, repeats: int
+) -> dict[str, str | int | float] | None:
+    """Run one case `repeats` times, keeping the best time. None if skipped."""
+    missing_paths = [path for path in case.fixture_paths if not path.exists()]
+    if missing_paths:
+        logger.warning(f"Skipping {case.name}: missing fixtures {missing_paths}")
+        return None
+
+    run = case.prepare()
+    durations: list[float] = []
+    item_count = 0
+    for _ in range(repeats):
+        for cache_path in case.cache_paths:
+            shutil.rmtree(cache_path, ignore_errors=True)
+        start_time = time.perf_counter()
+        item_count = run()
+        durations.append(time.perf_counter() - start_time)
+
+    best_seconds = min(durations)
+    logger.info(
+        f"{case.name}: {item_count:,} items in {best_seconds:.3f}s "
+        f"({item_count / best_seconds:,.1f} items/s)."
+    )
+    return {
+        "case_name": case.name,
+        "item_count": item_count,
+        "best_seconds": best_seconds,
+        "items_per_second": item_count / best_seconds,
+    }
+
+
+def compare_to_baseline(
+    df_results: pl.DataFrame,
+    baseline_seconds: Mapping[str, float],
+    *,
+    tolerance: float = 0.25,
+) -> pl.DataFrame:
+    """Add the baseline time of each case, and flag cases slower than the tolerance.
+
+    Has unit test.
+    """
+    return df_results.with_columns(
+        baseline_seconds=pl.col("case_name").replace_strict(
+            dict(baseline_seconds), default=None, return_dtype=pl.Float64
+        ),
+    ).with_columns(
+        slowdown=pl.col("best_seconds") / pl.col("baseline_seconds"),
+        is_regression=(
+            pl.col("best_seconds") > pl.col("baseline_seconds") * (1 + tolerance)
+        ).fill_null(value=False),
+    )
+
+
+def main() -> None:
+    """Record fixtures, or run the benchmarks and compare them to the baseline."""
+    parser = argparse.ArgumentParser(
+        description="Offline benchmarks of the parsers and transforms."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    record_parser = subparsers.add_parser("record", help="Record fixtures from ./out/")
+    record_parser.add_argument("--max-files-per-folder", type=int, default=3000)
+    run_parser = subparsers.add_parser("run", help="Run the benchmarks.")
+    run_parser.add_argument("--repeats", type=int, default=3)
+    run_parser.add_argument("--tolerance", type=float, default=0.25)
+    run_parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record_fixtures(max_files_per_folder=args.max_files_per_folder)
+        return
+
+    df_results = run_benchmarks(repeats=args.repeats)
+
+    baseline_seconds: dict[str, float] = (
+        orjson.loads(benchmark_baseline_path.read_bytes())
+        if benchmark_baseline_path.is_file()
+        else {}
+    )
+    df_results = compare_to_baseline(
+        df_results, baseline_seconds, tolerance=args.tolerance
+    )
+    benchmark_output_folder.mkdir(parents=True, exist_ok=True)
+    df_results.write_parquet(benchmark_results_path)
+    with pl.Config(tbl_rows=-1, tbl_cols=-1, tbl_width_chars=200):
+        logger.info(f"Benchmark results:\n{df_results}")
+
+    if args.update_baseline:
+        benchmark_baseline_path.write_bytes(
+            orjson.dumps(
+                # Keep the baseline of skipped cases.
+                baseline_seconds
+                | dict(
+                    zip(
+                        df_results["case_name"], df_results["best_seconds"], strict=True
+                    )
+                ),
+                option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS,
+            )
+        )
+        logger.info(f"Updated the baseline: {benchmark_baseline_path}")
+    elif df_results["is_regression"].any():
+        regressed_case_names = df_results.filter("is_regression")["case_name"]
+        logger.error(f"Regressions: {', '.join(regressed_case_names)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
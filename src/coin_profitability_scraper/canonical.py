@@ -0,0 +1,108 @@
+"""Canonical forms of frames and JSON columns, to avoid Dolt storage churn.
+
+Dolt stores rows in content-addressed chunks, so a JSON column whose keys or elements
+come back from upstream in another order produces new chunks (and a bigger push),
+even if the data is semantically unchanged. JSON columns are declared with
+`dy_json_string()`, and canonicalized by `canonicalize_frame()`.
+"""
+
+from typing import Any
+
+import dataframely as dy
+import orjson
+import polars as pl
+
+# Column metadata key: the JSON canonicalization options of a `dy.String` column.
+JSON_COLUMN_METADATA_KEY = "json_column"
+
+
+def dy_json_string(
+    *,
+    min_length: int,
+    max_length: int,
+    nullable: bool,
+    sort_arrays: bool,
+) -> dy.String:
+    """Create a `dy.String` column which holds JSON, canonicalized before writing.
+
+    Args:
+        min_length: Minimum length of the JSON string.
+        max_length: Maximum length of the JSON string.
+        nullable: Whether the column is nullable.
+        sort_arrays: Whether arrays are sets (i.e., their upstream order is
+            meaningless), and are sorted in their canonical form.
+
+    """
+    return dy.String(
+        nullable=nullable,
+        min_length=min_length,
+        max_length=max_length,
+        metadata={JSON_COLUMN_METADATA_KEY: {"sort_arrays": sort_arrays}},
+    )
+
+
+def _canonicalize_json_value(value: Any, *, sort_arrays: bool) -> Any:  # noqa: ANN401
+    if isinstance(value, dict):
+        return {
+            key: _canonicalize_json_value(item, sort_arrays=sort_arrays)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        items = [
+            _canonicalize_json_value(item, sort_arrays=sort_arrays) for item in value
+        ]
+        if sort_arrays:
+            items.sort(key=lambda item: orjson.dumps(item, option=orjson.OPT_SORT_KEYS))
+        return items
+    return value
+
+
+def canonical_json_string(json_str: str, *, sort_arrays: bool) -> str:
+    """Get the canonical form of a JSON string.
+
+    Object keys are sorted, floats use the shortest round-trip form, and arrays are
+    optionally sorted (by the canonical JSON of their elements).
+
+    Has unit test.
+    """
+    value = _canonicalize_json_value(orjson.loads(json_str), sort_arrays=sort_arrays)
+    return orjson.dumps(value, option=orjson.OPT_SORT_KEYS).decode()
+
+
+def get_json_columns(schema: type[dy.Schema]) -> dict[str, bool]:
+    """Get the JSON columns of a schema, mapped to their `sort_arrays` option."""
+    return {
+        col_name: column.metadata[JSON_COLUMN_METADATA_KEY]["sort_arrays"]
+        for col_name, column in schema.columns().items()
+        if column.metadata and JSON_COLUMN_METADATA_KEY in column.metadata
+    }
+
+
+def canonicalize_frame(df: pl.DataFrame, schema: type[dy.Schema]) -> pl.DataFrame:
+    """Get the canonical form of a frame to write to Dolt.
+
+    Rows are sorted by primary key, JSON columns are canonicalized (see
+    `canonical_json_string()`), and negative zeros in float columns become zero.
+
+    Has unit test.
+    """
+    json_col_exprs: list[pl.Expr] = []
+    for col, sort_arrays in get_json_columns(schema).items():
+        # JSON columns are low-cardinality, so only canonicalize each distinct value.
+        unique_values = df[col].drop_nulls().unique().to_list()
+        json_col_exprs.append(
+            pl.col(col).replace_strict(
+                unique_values,
+                [
+                    canonical_json_string(value, sort_arrays=sort_arrays)
+                    for value in unique_values
+                ],
+                default=None,  # Only nulls are not in `unique_values`.
+                return_dtype=pl.String,
+            )
+        )
+
+    return df.with_columns(
+        *json_col_exprs,
+        pl.selectors.float().replace({-0.0: 0.0}),
+    ).sort(schema.primary_key(), nulls_last=True, maintain_order=True)
@@ -0,0 +1,77 @@
+"""Global dictionaries for low-cardinality string columns (e.g., `source_site`).
+
+These columns are stored as `pl.Enum` (closed sets) or `pl.Categorical` (open sets,
+like `algo_name`) in memory and in Parquet, but are written to Dolt as plain strings,
+with the SQL lengths given in the column metadata.
+"""
+
+from collections.abc import Sequence
+
+import dataframely as dy
+import polars as pl
+
+# Column metadata key: the `VARCHAR(n)` length to use in the generated SQL schema.
+SQL_VARCHAR_LENGTH_METADATA_KEY = "sql_varchar_length"
+
+# Keep sorted, so that sorting by the physical Enum order matches sorting by string.
+SOURCE_SITES = (
+    "crypto51",
+    "cryptodelver",
+    "cryptoslate",
+    "minerstat",
+    "miningnow",
+    "whattomine",
+    "wheretomine",
+)
+
+# Keep sorted, so that sorting by the physical Enum order matches sorting by string.
+SOURCE_TABLES = (
+    "crypto51_coins",
+    "cryptodelver_coins",
+    "cryptoslate_coins",
+    "minerstat_coins",
+    "miningnow_asics",
+    "miningnow_coins",
+    "whattomine_coins",
+    "whattomine_miners",
+    "wheretomine_coins",
+)
+
+SOURCE_SITE_DTYPE = pl.Enum(SOURCE_SITES)
+SOURCE_TABLE_DTYPE = pl.Enum(SOURCE_TABLES)
+
+
+def dy_enum_string(
+    categories: Sequence[str],
+    *,
+    max_length: int,
+    nullable: bool,
+    primary_key: bool = False,
+) -> dy.Enum:
+    """Create a `dy.Enum` column, written to SQL as `VARCHAR(max_length)`."""
+    return dy.Enum(
+        categories,
+        nullable=nullable,
+        primary_key=primary_key,
+        metadata={SQL_VARCHAR_LENGTH_METADATA_KEY: max_length},
+    )
+
+
+def dy_categorical_string(
+    *,
+    min_length: int,
+    max_length: int,
+    nullable: bool,
+    primary_key: bool = False,
+) -> dy.Categorical:
+    """Create a `dy.Categorical` column, with the length rules of a `dy.String`."""
+    return dy.Categorical(
+        nullable=nullable,
+        primary_key=primary_key,
+        check={
+            "length": lambda col: (
+                col.cast(pl.String).str.len_chars().is_between(min_length, max_length)
+            )
+        },
+        metadata={SQL_VARCHAR_LENGTH_METADATA_KEY: max_length},
+    )
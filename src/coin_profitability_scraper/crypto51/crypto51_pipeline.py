@@ -2,6 +2,7 @@
 
 from coin_profitability_scraper import step_9_dolt_write
 from coin_profitability_scraper.crypto51 import step_1_scrape_main_page
+from coin_profitability_scraper.run_metrics import collect_run_metrics
 
 
 def main_crypto51_pipeline() -> None:
@@ -12,4 +13,5 @@ def main_crypto51_pipeline() -> None:
 
 
 if __name__ == "__main__":
-    main_crypto51_pipeline()
+    with collect_run_metrics("crypto51_pipeline"):
+        main_crypto51_pipeline()
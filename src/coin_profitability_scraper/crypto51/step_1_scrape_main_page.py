@@ -11,6 +11,8 @@ from bs4 import BeautifulSoup
 from loguru import logger
 
 from coin_profitability_scraper.data_util import pl_df_all_common_str_cleaning
+from coin_profitability_scraper.dy_util import write_validated_parquet
+from coin_profitability_scraper.run_metrics import metered_step
 from coin_profitability_scraper.util import download_as_bytes
 
 _URL = "https://www.crypto51.app"
@@ -64,6 +66,7 @@ def _extract_table_data(page_html: str) -> list[dict[str, str | None]]:
     return data
 
 
+@metered_step
 def main() -> None:
     """Scrape and parse coins list."""
     crypto51_step1_output_path.mkdir(parents=True, exist_ok=True)
@@ -100,7 +103,7 @@ def main() -> None:
     )
 
     df = DySchemaCrypto51Coins.validate(df, cast=True)
-    df.write_parquet(output_parquet_file)
+    write_validated_parquet(df, DySchemaCrypto51Coins, output_parquet_file)
 
     logger.success("Coins list scraping completed.")
 
@@ -6,6 +6,7 @@ from coin_profitability_scraper.crypto_slate import (
     step_2_parse_scrape,
     step_3_algo_report,
 )
+from coin_profitability_scraper.run_metrics import collect_run_metrics
 
 
 def main_minerstat_pipeline() -> None:
@@ -18,4 +19,5 @@ def main_minerstat_pipeline() -> None:
 
 
 if __name__ == "__main__":
-    main_minerstat_pipeline()
+    with collect_run_metrics("crypto_slate_pipeline"):
+        main_minerstat_pipeline()
@@ -11,6 +11,7 @@ from typing import TypeVar
 from bs4 import BeautifulSoup
 from loguru import logger
 
+from coin_profitability_scraper.run_metrics import bind_current_step, metered_step
 from coin_profitability_scraper.util import download_as_bytes
 
 step_1_html_folder_path = Path("./out/crypto_slate/step_1_downloaded_coin_pages/")
@@ -40,6 +41,7 @@ def is_direct_coin_url(url: str) -> bool:
     return bool(re.match(r"^https://cryptoslate\.com/coins/[^/?=]+/?$", url))
 
 
+@metered_step
 def main() -> None:
     """Scrape coin pages."""
     logger.info(f"Starting {Path(__file__).name} main()")
@@ -85,7 +87,9 @@ def main() -> None:
             futures: dict[Future[bytes], str] = {}
             while len(coin_urls_queue) > 0:
                 coin_url = coin_urls_queue.pop()
-                futures[executor.submit(download_as_bytes, coin_url)] = coin_url
+                futures[
+                    executor.submit(bind_current_step(download_as_bytes), coin_url)
+                ] = coin_url
 
             for future in as_completed(futures):
                 coin_url = futures[future]
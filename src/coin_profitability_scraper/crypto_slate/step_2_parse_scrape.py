@@ -19,6 +19,9 @@ from coin_profitability_scraper.data_util import (
     clean_col_name,
     pl_df_all_common_str_cleaning,
 )
+from coin_profitability_scraper.dy_util import write_validated_parquet
+from coin_profitability_scraper.run_metrics import metered_step
+from coin_profitability_scraper.step_cache import cached_step
 
 step_2_output_folder = Path("./out/crypto_slate/step_2_coins_list/")
 
@@ -313,6 +316,11 @@ def load_coin_list_df() -> pl.DataFrame:
     return df
 
 
+@metered_step
+@cached_step(
+    inputs=[step_1_html_folder_path],
+    outputs=[step_2_output_folder / "cryptoslate_coins.parquet"],
+)
 def main() -> None:
     """Parse HTML files and extract coin information."""
     logger.info(f"Starting {Path(__file__).name} main()")
@@ -340,7 +348,9 @@ def main() -> None:
     logger.info(f"Top 10 coins by market cap:\n{df.head(10)}")
 
     step_2_output_folder.mkdir(parents=True, exist_ok=True)
-    df.write_parquet(step_2_output_folder / "cryptoslate_coins.parquet")
+    write_validated_parquet(
+        df, DySchemaCryptoslateCoins, step_2_output_folder / "cryptoslate_coins.parquet"
+    )
 
 
 if __name__ == "__main__":
@@ -9,6 +9,8 @@ from loguru import logger
 from coin_profitability_scraper.crypto_slate.step_2_parse_scrape import (
     step_2_output_folder,
 )
+from coin_profitability_scraper.run_metrics import metered_step
+from coin_profitability_scraper.step_cache import cached_step
 
 step_3_output_folder = Path("./out/crypto_slate/step_3_algo_report/")
 
@@ -68,6 +70,11 @@ def summarize_by_algo(df_coins: pl.DataFrame) -> pl.DataFrame:
     return df_algos
 
 
+@metered_step
+@cached_step(
+    inputs=[step_2_output_folder / "cryptoslate_coins.parquet"],
+    outputs=[step_3_output_folder / "cryptoslate_algorithms.parquet"],
+)
 def main() -> None:
     """Generate a report summarizing the parsed coin data."""
     logger.info(f"Starting {Path(__file__).name} main()")
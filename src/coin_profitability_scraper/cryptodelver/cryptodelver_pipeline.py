@@ -5,6 +5,7 @@ from coin_profitability_scraper.cryptodelver import (
     step_1_scrape_coins_lists,
     step_3_ingest_coins_lists,
 )
+from coin_profitability_scraper.run_metrics import collect_run_metrics
 
 
 def main_cryptodelver_pipeline() -> None:
@@ -16,4 +17,5 @@ def main_cryptodelver_pipeline() -> None:
 
 
 if __name__ == "__main__":
-    main_cryptodelver_pipeline()
+    with collect_run_metrics("cryptodelver_pipeline"):
+        main_cryptodelver_pipeline()
@@ -8,6 +8,7 @@ from pathlib import Path
 from loguru import logger
 from tqdm import tqdm
 
+from coin_profitability_scraper.run_metrics import metered_step
 from coin_profitability_scraper.util import download_as_bytes
 
 _URL = "https://cryptodelver.com/all-coins/"
@@ -15,6 +16,7 @@ _URL = "https://cryptodelver.com/all-coins/"
 cryptodelver_step1_output_path = Path("./out/cryptodelver/") / Path(__file__).stem
 
 
+@metered_step
 def main() -> None:
     """Scrape and parse coins list."""
     cryptodelver_step1_output_path.mkdir(parents=True, exist_ok=True)
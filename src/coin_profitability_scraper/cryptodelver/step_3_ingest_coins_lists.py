@@ -16,6 +16,10 @@ from coin_profitability_scraper.data_util import (
     clean_col_name,
     pl_df_all_common_str_cleaning,
 )
+from coin_profitability_scraper.dy_util import write_validated_parquet
+from coin_profitability_scraper.float_change_rules import float_change_rule
+from coin_profitability_scraper.run_metrics import metered_step
+from coin_profitability_scraper.step_cache import cached_step
 
 cryptodelver_step_3_output_folder = Path("./out/cryptodelver/") / Path(__file__).stem
 output_parquet_path = cryptodelver_step_3_output_folder / "cryptodelver_coins.parquet"
@@ -37,8 +41,12 @@ class DySchemaCryptodelverCoins(dy.Schema):
     reported_market_cap = dy.String(nullable=True, **_default_string_kwargs)
     reported_price_usd = dy.String(nullable=True, **_default_string_kwargs)
     reported_volume = dy.String(nullable=True, **_default_string_kwargs)
-    reported_pct_change_24h = dy.Float64(nullable=True)
-    reported_pct_change_7d = dy.Float64(nullable=True)
+    reported_pct_change_24h = dy.Float64(
+        nullable=True, metadata=float_change_rule(abs_tolerance=0.5)
+    )
+    reported_pct_change_7d = dy.Float64(
+        nullable=True, metadata=float_change_rule(abs_tolerance=0.5)
+    )
     volume_usd = dy.UInt64(nullable=True)
     market_cap_usd = dy.UInt64(nullable=True)
     coin_url = dy.String(nullable=False, min_length=20, max_length=500)
@@ -98,6 +106,8 @@ def _extract_table_data(page_html: str) -> list[dict[str, str | None]]:
     return data
 
 
+@metered_step
+@cached_step(inputs=[cryptodelver_step1_output_path], outputs=[output_parquet_path])
 def main() -> None:
     """Ingest each coin page from Cryptodelver."""
     cryptodelver_step_3_output_folder.mkdir(parents=True, exist_ok=True)
@@ -175,7 +185,7 @@ def main() -> None:
 
     df = DySchemaCryptodelverCoins.validate(df, cast=True)
 
-    df.write_parquet(output_parquet_path)
+    write_validated_parquet(df, DySchemaCryptodelverCoins, output_parquet_path)
 
 
 if __name__ == "__main__":
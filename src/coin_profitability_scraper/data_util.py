@@ -1,9 +1,13 @@
 """Polars data transformations."""
 
 import re
+from typing import TYPE_CHECKING
 
 import polars as pl
 
+if TYPE_CHECKING:
+    from polars._typing import PolarsDataType
+
 
 def pl_df_empty_str_to_null(df: pl.DataFrame) -> pl.DataFrame:
     """Convert all empty str cells to nulls."""
@@ -27,3 +31,56 @@ def pl_df_all_common_str_cleaning(df: pl.DataFrame) -> pl.DataFrame:
 def clean_col_name(input_str: str) -> str:
     """Clean a string to a clean column name."""
     return re.sub(r"[^a-zA-Z0-9]+", "_", input_str).strip("_").lower()
+
+
+def _dtype_contains_float(dtype: "PolarsDataType") -> bool:
+    """Check if a (possibly nested) dtype contains any float leaf."""
+    if dtype.is_float():
+        return True
+    if isinstance(dtype, pl.List | pl.Array):
+        return _dtype_contains_float(dtype.inner)
+    if isinstance(dtype, pl.Struct):
+        return any(_dtype_contains_float(field.dtype) for field in dtype.fields)
+    return False
+
+
+def _pl_series_json_encode(s: pl.Series) -> pl.Series:
+    """Encode each element of a list/struct Series to a compact JSON string."""
+    # `json_encode` only exists for structs, so wrap each value as `{"v":...}` and
+    # strip the wrapper off afterwards.
+    encoded = (
+        pl.struct("v")
+        .struct.json_encode()
+        .str.strip_prefix('{"v":')
+        .str.strip_suffix("}")
+    )
+    if _dtype_contains_float(s.dtype):
+        # orjson writes large floats as `1e+20`, but Polars writes `1e20`. Split into
+        # JSON string tokens and everything else, and only patch the non-strings.
+        encoded = (
+            encoded.str.extract_all(r'"(?:[^"\\]|\\.)*"|[^"]+')
+            .list.eval(
+                pl.when(pl.element().str.starts_with('"'))
+                .then(pl.element())
+                .otherwise(pl.element().str.replace_all(r"(\d)e(\d)", "${1}e+${2}"))
+            )
+            .list.join("")
+        )
+
+    return (
+        s.to_frame("v")
+        .select(pl.when(pl.col("v").is_not_null()).then(encoded))
+        .to_series()
+        .alias(s.name)
+    )
+
+
+def pl_expr_json_encode(expr: pl.Expr) -> pl.Expr:
+    """Encode a list/struct column to JSON strings without a per-row Python call.
+
+    Output is byte-identical to `orjson.dumps(x.to_list())` via `map_elements`, so
+    that stored JSON columns don't churn. Nulls stay null.
+
+    Has unit test.
+    """
+    return expr.map_batches(_pl_series_json_encode, return_dtype=pl.String)
@@ -0,0 +1,47 @@
+"""Merge the per-job Dolt write branches into `main`, then push `main` once.
+
+When concurrent jobs set `DOLT_WRITE_BRANCH` (see `get_dolt_write_branch()`), each
+pushes its own branch without contention. Run this before any job which reads from
+`main` (e.g., the reports pipeline).
+"""
+
+from pathlib import Path
+
+from loguru import logger
+
+from coin_profitability_scraper import is_dry_run
+from coin_profitability_scraper.dolt_updater import DoltDatabaseUpdater
+from coin_profitability_scraper.dolt_util import (
+    DOLT_REPO_URL,
+    DOLT_WRITE_BRANCH_PREFIX,
+)
+from coin_profitability_scraper.run_metrics import collect_run_metrics, metered_step
+
+
+@metered_step
+def main() -> list[str]:
+    """Merge all write branches into `main`, push, and delete the merged branches.
+
+    Returns the merged branch names.
+    """
+    logger.info(f"Starting {Path(__file__).name} main()")
+
+    # Full clone, as merges need the common ancestor commits.
+    with DoltDatabaseUpdater(DOLT_REPO_URL, use_shallow_clone=False) as dolt:
+        merged_branch_names = dolt.merge_remote_branches(DOLT_WRITE_BRANCH_PREFIX)
+        if not merged_branch_names:
+            logger.info("No Dolt write branches to merge.")
+            return []
+
+        logger.info(f"Merged Dolt branches: {', '.join(merged_branch_names)}")
+        if is_dry_run() is False:
+            dolt.push()
+            dolt.delete_remote_branches(merged_branch_names)
+            logger.info("Pushed main, and deleted the merged branches.")
+
+    return merged_branch_names
+
+
+if __name__ == "__main__":
+    with collect_run_metrics("dolt_merge_branches"):
+        main()
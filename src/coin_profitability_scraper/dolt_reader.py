@@ -0,0 +1,386 @@
+"""Read-only access to Dolt tables, for consumers that never write.
+
+Cloning the database and starting a SQL server (see `DoltDatabaseUpdater`) is only
+needed to write. Readers call `read_dolt_tables()`, which picks the cheapest backend
+that can serve the requested tables at the requested commit:
+- `LocalFileBackend`: Parquet files in a folder (e.g., a stand-in for tests).
+- `DoltHubApiBackend`: The DoltHub CSV/SQL HTTP API, with conditional requests, and
+    a Parquet cache of each table at each commit.
+- `LocalCloneBackend`: A cached local clone, pulled before each read.
+"""
+
+import subprocess
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Sequence
+from pathlib import Path
+
+import backoff
+import orjson
+import polars as pl
+import requests
+from loguru import logger
+
+from coin_profitability_scraper.dolt_util import DOLT_REPO_URL
+from coin_profitability_scraper.run_metrics import record_duration, record_metric
+from coin_profitability_scraper.util import (
+    record_http_response_metrics,
+    record_http_retry,
+)
+
+dolt_reader_cache_folder = Path("./out/dolt_reader_cache/")
+
+DOLT_READER_METADATA_KEY = "coin_profitability_scraper.dolt_reader"
+
+
+def _get_table_polars_schema(table_name: str) -> pl.Schema | None:
+    from coin_profitability_scraper.tables import (  # noqa: PLC0415
+        table_to_path_and_schema,
+    )
+
+    if table_name not in table_to_path_and_schema:
+        return None
+    (_path, dy_schema) = table_to_path_and_schema[table_name]  # pyright: ignore[reportArgumentType]
+    return dy_schema.to_polars_schema()
+
+
+def _parse_csv_string_column(col: str, dtype: pl.DataType) -> pl.Expr:
+    """Parse a column read from CSV as strings to `dtype`, without any inference."""
+    if isinstance(dtype, pl.Datetime):
+        expr = pl.col(col).str.to_datetime(time_unit=dtype.time_unit)
+        if dtype.time_zone is not None:
+            expr = expr.dt.replace_time_zone(dtype.time_zone)
+        return expr
+    if isinstance(dtype, pl.Date):
+        return pl.col(col).str.to_date()
+    if isinstance(dtype, pl.Boolean):
+        return (
+            pl.col(col)
+            .str.to_lowercase()
+            .replace_strict(
+                {"1": True, "0": False, "true": True, "false": False},
+                return_dtype=pl.Boolean,
+            )
+        )
+    return pl.col(col).cast(dtype)
+
+
+def read_table_csv(content: bytes, table_name: str) -> pl.DataFrame:
+    """Read a Dolt table exported as CSV, with the dtypes of its schema.
+
+    All columns are read as strings, so that string columns are kept verbatim (e.g.,
+    zero-padded IDs, or timestamps as reported upstream). Schema columns, and the
+    automatic `created_at`/`updated_at` columns, are then parsed explicitly. Other
+    columns (of tables without a schema) keep their inferred dtypes.
+
+    Has unit test.
+    """
+    polars_schema = _get_table_polars_schema(table_name)
+    if polars_schema is None:
+        return pl.read_csv(content, infer_schema_length=None)
+
+    column_dtypes: dict[str, pl.DataType] = {
+        **{col: pl.Datetime("us") for col in ("created_at", "updated_at")},
+        **polars_schema,
+    }
+    df = pl.read_csv(content, infer_schema=False)
+    return df.with_columns(
+        _parse_csv_string_column(col, column_dtypes[col])
+        for col in df.columns
+        if col in column_dtypes
+    )
+
+
+class DoltReadBackend(ABC):
+    """A source of read-only Dolt tables."""
+
+    name: str
+
+    @abstractmethod
+    def estimate_cost(
+        self, table_names: Sequence[str], commit: str | None
+    ) -> float | None:
+        """Estimate the cost of reading the tables (roughly, in network round-trips).
+
+        Returns None if this backend can't serve the tables at the commit.
+        """
+
+    @abstractmethod
+    def read_tables(
+        self, table_names: Sequence[str], commit: str | None
+    ) -> dict[str, pl.DataFrame]:
+        """Read the tables at the commit (or at the head of `main`, if None)."""
+
+
+class LocalFileBackend(DoltReadBackend):
+    """Tables stored as `<folder>/<table>.parquet` (or `<folder>/<commit>/...`)."""
+
+    name = "local_file"
+
+    def __init__(self, folder: Path) -> None:
+        """Initialize the backend with the folder of the Parquet files."""
+        self.folder: Path = folder
+
+    def _get_path(self, table_name: str, commit: str | None) -> Path:
+        folder = self.folder if commit is None else self.folder / commit
+        return folder / f"{table_name}.parquet"
+
+    def estimate_cost(
+        self, table_names: Sequence[str], commit: str | None
+    ) -> float | None:
+        """Cost nothing if all the files exist. Otherwise, can't serve."""
+        if all(self._get_path(t, commit).is_file() for t in table_names):
+            return 0
+        return None
+
+    def read_tables(
+        self, table_names: Sequence[str], commit: str | None
+    ) -> dict[str, pl.DataFrame]:
+        """Read the Parquet files."""
+        return {t: pl.read_parquet(self._get_path(t, commit)) for t in table_names}
+
+
+class DoltHubApiBackend(DoltReadBackend):
+    """The DoltHub CSV API (for tables) and SQL API (for the head commit).
+
+    Tables are always read at a commit hash, so that all tables of a read come from
+    the same snapshot (reading the head of the branch resolves it first). Tables at a
+    commit hash never change, so they are cached as Parquet and read without a
+    request. The latest download of each table is also cached, with its
+    ETag/Last-Modified headers, so that a table unchanged at a new commit is served
+    from the cache by a conditional request.
+    """
+
+    name = "dolthub_api"
+
+    def __init__(
+        self,
+        *,
+        repo_url: str = DOLT_REPO_URL,
+        base_url: str = "https://www.dolthub.com",
+        branch: str = "main",
+        cache_folder: Path = dolt_reader_cache_folder / "dolthub_api",
+    ) -> None:
+        """Initialize the backend.
+
+        Args:
+            repo_url: URL of the DoltHub repository (`.../<owner>/<database>`).
+            base_url: Base URL of the DoltHub API (e.g., a local stand-in for tests).
+            branch: Branch whose head is read when no commit is requested.
+            cache_folder: Folder of the cached Parquet files.
+
+        """
+        (owner, database) = repo_url.rstrip("/").split("/")[-2:]
+        self.base_url: str = base_url.rstrip("/")
+        self.repo_path: str = f"{owner}/{database}"
+        self.branch: str = branch
+        self.cache_folder: Path = cache_folder
+
+    def _get_cache_path(self, table_name: str, ref: str) -> Path:
+        return self.cache_folder / ref.replace("/", "__") / f"{table_name}.parquet"
+
+    def _get_latest_cache_path(self, table_name: str) -> Path:
+        return self.cache_folder / "latest" / f"{table_name}.parquet"
+
+    def estimate_cost(
+        self, table_names: Sequence[str], commit: str | None
+    ) -> float | None:
+        """Cost one (conditional) request per table not cached at the commit.
+
+        Reading the head costs one more request (to resolve it), and any table may
+        need a request.
+        """
+        if commit is None:
+            return 1 + len(table_names)
+        return sum(not self._get_cache_path(t, commit).is_file() for t in table_names)
+
+    @backoff.on_exception(
+        backoff.expo,
+        requests.exceptions.RequestException,
+        max_time=60,
+        max_tries=5,
+        on_backoff=record_http_retry,
+    )
+    def _get(self, url: str, headers: dict[str, str]) -> requests.Response:
+        start_time = time.perf_counter()
+        response = requests.get(url, headers=headers, timeout=60)
+        record_http_response_metrics(
+            response, elapsed_seconds=time.perf_counter() - start_time
+        )
+        if response.status_code != requests.codes.not_modified:
+            response.raise_for_status()
+        return response
+
+    def get_head_commit_hash(self) -> str:
+        """Get the commit hash of the head of the branch, with the SQL API."""
+        response = self._get(
+            f"{self.base_url}/api/v1alpha1/{self.repo_path}/{self.branch}"
+            "?q=SELECT+commit_hash+FROM+dolt_log+LIMIT+1",
+            headers={},
+        )
+        return str(orjson.loads(response.content)["rows"][0]["commit_hash"])
+
+    def _read_table(self, table_name: str, commit: str) -> pl.DataFrame:
+        cache_path = self._get_cache_path(table_name, commit)
+        if cache_path.is_file():
+            record_metric("dolt_reader_cache_hits", 1, unit="count", label=table_name)
+            return pl.read_parquet(cache_path)
+
+        latest_cache_path = self._get_latest_cache_path(table_name)
+        headers: dict[str, str] = {}
+        if latest_cache_path.is_file():
+            cache_info = orjson.loads(
+                pl.read_parquet_metadata(latest_cache_path)[DOLT_READER_METADATA_KEY]
+            )
+            if cache_info.get("etag"):
+                headers["If-None-Match"] = cache_info["etag"]
+            if cache_info.get("last_modified"):
+                headers["If-Modified-Since"] = cache_info["last_modified"]
+
+        response = self._get(
+            f"{self.base_url}/csv/{self.repo_path}/{commit}/{table_name}",
+            headers=headers,
+        )
+        if response.status_code == requests.codes.not_modified:
+            logger.debug(f"DoltHub table {table_name}@{commit} not modified. Cached.")
+            record_metric("dolt_reader_cache_hits", 1, unit="count", label=table_name)
+            df = pl.read_parquet(latest_cache_path)
+        else:
+            df = read_table_csv(response.content, table_name)
+            cache_info = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+            }
+            latest_cache_path.parent.mkdir(parents=True, exist_ok=True)
+            df.write_parquet(
+                latest_cache_path,
+                metadata={DOLT_READER_METADATA_KEY: orjson.dumps(cache_info).decode()},
+            )
+
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        df.write_parquet(cache_path)
+        return df
+
+    def read_tables(
+        self, table_names: Sequence[str], commit: str | None
+    ) -> dict[str, pl.DataFrame]:
+        """Read each table at the commit (or at the head), from the cache or the API."""
+        if commit is None:
+            commit = self.get_head_commit_hash()
+            logger.debug(f"Reading DoltHub tables at {self.branch} = {commit}.")
+        return {t: self._read_table(t, commit) for t in table_names}
+
+
+class LocalCloneBackend(DoltReadBackend):
+    """A full local clone, kept between runs, and pulled before each read.
+
+    Read with the Dolt CLI, without starting a SQL server. Any commit can be read.
+    """
+
+    name = "local_clone"
+
+    def __init__(
+        self,
+        *,
+        repo_url: str = DOLT_REPO_URL,
+        clone_folder: Path = dolt_reader_cache_folder / "local_clone",
+    ) -> None:
+        """Initialize the backend with the repository and the folder of the clone."""
+        self.repo_url: str = repo_url
+        self.clone_dir: Path = clone_folder / repo_url.rstrip("/").split("/")[-1]
+        self._dolt_command_path: str = "dolt"
+
+    def estimate_cost(
+        self, table_names: Sequence[str], commit: str | None
+    ) -> float | None:
+        """Cost a pull (if already cloned) or a full clone, for any number of tables."""
+        del table_names, commit  # Any table at any commit.
+        return 2 if (self.clone_dir / ".dolt").is_dir() else 20
+
+    def _clone_or_pull(self) -> None:
+        with record_duration("dolt_clone_time", label=self.clone_dir.name):
+            if (self.clone_dir / ".dolt").is_dir():
+                subprocess.run(  # noqa: S603
+                    [self._dolt_command_path, "pull"], cwd=self.clone_dir, check=True
+                )
+            else:
+                self.clone_dir.parent.mkdir(parents=True, exist_ok=True)
+                subprocess.run(  # noqa: S603
+                    [self._dolt_command_path, "clone", self.repo_url, self.clone_dir],
+                    check=True,
+                )
+
+    def read_tables(
+        self, table_names: Sequence[str], commit: str | None
+    ) -> dict[str, pl.DataFrame]:
+        """Pull, then read each table as CSV with `dolt sql`."""
+        self._clone_or_pull()
+        as_of = "" if commit is None else f" AS OF '{commit}'"
+        tables: dict[str, pl.DataFrame] = {}
+        for table_name in table_names:
+            proc = subprocess.run(  # noqa: S603
+                [
+                    self._dolt_command_path,
+                    "sql",
+                    "-r",
+                    "csv",
+                    "-q",
+                    f"SELECT * FROM `{table_name}`{as_of}",  # noqa: S608
+                ],
+                cwd=self.clone_dir,
+                check=True,
+                capture_output=True,
+            )
+            tables[table_name] = read_table_csv(proc.stdout, table_name)
+        return tables
+
+
+def get_default_read_backends() -> list[DoltReadBackend]:
+    """Get the backends tried by `read_dolt_tables()` by default."""
+    return [DoltHubApiBackend(), LocalCloneBackend()]
+
+
+def read_dolt_tables(
+    table_names: Sequence[str],
+    *,
+    commit: str | None = None,
+    backends: Sequence[DoltReadBackend] | None = None,
+) -> dict[str, pl.DataFrame]:
+    """Read tables (at a commit, or at the head of `main`) from the cheapest backend.
+
+    If the cheapest backend fails, the next cheapest one is tried.
+
+    Has unit test.
+    """
+    if backends is None:
+        backends = get_default_read_backends()
+
+    backend_costs: list[tuple[float, int, DoltReadBackend]] = []
+    for idx, backend in enumerate(backends):
+        cost = backend.estimate_cost(table_names, commit)
+        if cost is not None:
+            backend_costs.append((cost, idx, backend))
+    if not backend_costs:
+        msg = f"No Dolt read backend can serve {list(table_names)} at {commit}."
+        raise ValueError(msg)
+
+    backend_costs.sort(key=lambda item: item[:2])
+    for try_num, (cost, _idx, backend) in enumerate(backend_costs):
+        logger.info(
+            f"Reading Dolt tables {', '.join(table_names)} at {commit or 'HEAD'} "
+            f"from {backend.name} (cost {cost})."
+        )
+        try:
+            with record_duration("dolt_read_time", label=backend.name):
+                tables = backend.read_tables(table_names, commit)
+        except Exception as e:
+            if try_num == len(backend_costs) - 1:
+                raise
+            logger.warning(f"Dolt read backend {backend.name} failed: {e}")
+            continue
+        for table_name, df in tables.items():
+            logger.info(f"Loaded {table_name}: {df.shape}")
+        return tables
+
+    msg = "Unreachable."
+    raise AssertionError(msg)
@@ -0,0 +1,269 @@
+"""Local manifest of the last-pushed state of each Dolt table.
+
+After each successful push, the primary key and a 64-bit hash of the other columns of
+every row (see `dolt_util.compute_row_hashes()`) are stored in a small Parquet file,
+along with the Dolt content hash of the pushed table (`DOLT_HASHOF_TABLE()`). On the
+next run, upserts and deletes can then be computed from the hashes, instead of reading
+the whole table.
+
+The manifest is only trusted if the live table still has the manifest's table hash,
+its row count matches, and a random sample of live rows hash the same. The table hash
+(unlike the commit hash) also matches once a pushed write branch is merged into
+`main`, and isn't changed by commits to other tables.
+"""
+
+from collections.abc import Mapping
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any
+
+import orjson
+import polars as pl
+import sqlalchemy
+from loguru import logger
+
+from coin_profitability_scraper.dolt_util import (
+    compute_row_hashes,
+    read_rows_by_primary_key,
+)
+from coin_profitability_scraper.float_change_rules import FloatChangeRule
+
+dolt_state_manifest_folder = Path("./out/dolt_state_manifest/")
+
+STATE_MANIFEST_METADATA_KEY = "coin_profitability_scraper.dolt_state_manifest"
+
+
+def _get_manifest_path(table_name: str) -> Path:
+    return dolt_state_manifest_folder / f"{table_name}.parquet"
+
+
+def _serialize_rules(
+    float_change_rules: Mapping[str, FloatChangeRule] | None,
+) -> dict[str, dict[str, Any]]:
+    return {
+        col: asdict(rule) for col, rule in sorted((float_change_rules or {}).items())
+    }
+
+
+def _cast_like(df_live: pl.DataFrame, df: pl.DataFrame) -> pl.DataFrame:
+    """Cast rows read from SQL like the frame to push, so that hashes are comparable."""
+    return df_live.select(df.columns).cast(
+        {
+            col: pl.String if isinstance(dtype, pl.Enum | pl.Categorical) else dtype
+            for col, dtype in df.schema.items()
+        }
+    )
+
+
+def read_live_row_hashes(
+    engine: sqlalchemy.engine.Engine,
+    table_name: str,
+    df: pl.DataFrame,
+    *,
+    float_change_rules: Mapping[str, FloatChangeRule] | None = None,
+) -> pl.DataFrame:
+    """Read the whole live table, and hash its rows like `df` would be hashed."""
+    table = sqlalchemy.Table(table_name, sqlalchemy.MetaData(), autoload_with=engine)
+    primary_key_columns = [c.name for c in table.primary_key.columns]
+    df_live = pl.read_database(
+        query=sqlalchemy.select(table),
+        connection=engine,
+        infer_schema_length=None,  # Use all rows.
+    )
+    return compute_row_hashes(
+        _cast_like(df_live, df),
+        primary_key_columns,
+        float_change_rules=float_change_rules,
+    )
+
+
+def write_state_manifest(  # noqa: PLR0913
+    engine: sqlalchemy.engine.Engine,
+    table_name: str,
+    df: pl.DataFrame,
+    *,
+    df_previous_hashes: pl.DataFrame,
+    df_delta: pl.DataFrame,
+    float_change_rules: Mapping[str, FloatChangeRule] | None = None,
+    table_hash: str,
+) -> None:
+    """Store the row hashes of the live table, just after `df` was pushed.
+
+    The hashes are `df_previous_hashes`, updated with the rows of `df` which were
+    upserted (`df_delta`), and without the pruned rows. Unchanged rows keep their
+    previous hashes, as float values within tolerance were not written. The live
+    table is only read if the row count doesn't add up. `table_hash` is the Dolt
+    content hash of the pushed table.
+    """
+    table = sqlalchemy.Table(table_name, sqlalchemy.MetaData(), autoload_with=engine)
+    primary_key_columns = [c.name for c in table.primary_key.columns]
+
+    df_written_hashes = compute_row_hashes(
+        df.join(
+            df_delta.select(primary_key_columns).unique(),
+            on=primary_key_columns,
+            nulls_equal=True,
+            how="semi",
+        ),
+        primary_key_columns,
+        float_change_rules=float_change_rules,
+    )
+    df_hashes = pl.concat(
+        [
+            df_previous_hashes.join(
+                df_written_hashes.select(primary_key_columns),
+                on=primary_key_columns,
+                nulls_equal=True,
+                how="anti",
+            ),
+            df_written_hashes,
+        ],
+        how="vertical_relaxed",
+    )
+    live_row_count = _get_live_row_count(engine, table)
+    if df_hashes.height != live_row_count:
+        # Rows not in `df` were pruned.
+        df_hashes = df_hashes.join(
+            df.select(primary_key_columns),
+            on=primary_key_columns,
+            nulls_equal=True,
+            how="semi",
+        )
+    if df_hashes.height != live_row_count:
+        logger.warning(f'Unexpected row count in "{table_name}". Reading the table.')
+        df_hashes = read_live_row_hashes(
+            engine, table_name, df, float_change_rules=float_change_rules
+        )
+
+    info = {
+        "table_hash": table_hash,
+        "columns": df.columns,
+        "float_change_rules": _serialize_rules(float_change_rules),
+        "polars_version": pl.__version__,  # Row hashes are only stable per version.
+    }
+    dolt_state_manifest_folder.mkdir(parents=True, exist_ok=True)
+    df_hashes.write_parquet(
+        _get_manifest_path(table_name),
+        metadata={STATE_MANIFEST_METADATA_KEY: orjson.dumps(info).decode()},
+    )
+    logger.info(f'Wrote state manifest of "{table_name}" at table hash {table_hash}.')
+
+
+def read_state_manifest(
+    table_name: str,
+    df: pl.DataFrame,
+    *,
+    float_change_rules: Mapping[str, FloatChangeRule] | None = None,
+) -> tuple[pl.DataFrame, str] | None:
+    """Read the row hashes and table hash of a manifest, without verifying them.
+
+    Returns None if the manifest is missing, or was written for other columns, other
+    change rules, or another Polars version than `df` would be hashed with (or by an
+    older version without a table hash).
+    """
+    manifest_path = _get_manifest_path(table_name)
+    if not manifest_path.is_file():
+        return None
+
+    info = orjson.loads(
+        pl.read_parquet_metadata(manifest_path)[STATE_MANIFEST_METADATA_KEY]
+    )
+    if (
+        "table_hash" not in info
+        or info["columns"] != df.columns
+        or info.get("float_change_rules") != _serialize_rules(float_change_rules)
+        or info["polars_version"] != pl.__version__
+    ):
+        return None
+    return pl.read_parquet(manifest_path), info["table_hash"]
+
+
+def read_verified_state_manifest(  # noqa: PLR0913
+    engine: sqlalchemy.engine.Engine,
+    table_name: str,
+    df: pl.DataFrame,
+    *,
+    live_table_hash: str,
+    float_change_rules: Mapping[str, FloatChangeRule] | None = None,
+    sample_size: int = 100,
+) -> pl.DataFrame | None:
+    """Read the row hashes of the live table from its manifest, if it's still valid.
+
+    Returns None (so that callers read the live table instead) if the manifest is
+    missing, was written for other columns, other change rules, another Polars
+    version, or another table hash than `live_table_hash` (see
+    `DoltDatabaseUpdater.get_table_hash()`), or if a sample of live rows doesn't
+    match it.
+
+    Has unit test.
+    """
+    manifest = read_state_manifest(
+        table_name, df, float_change_rules=float_change_rules
+    )
+    if manifest is None:
+        logger.info(f'No usable state manifest for "{table_name}". Reading table.')
+        return None
+
+    df_hashes, table_hash = manifest
+    if table_hash != live_table_hash:
+        logger.info(
+            f'State manifest of "{table_name}" is for table hash {table_hash}, '
+            f"but the live table hash is {live_table_hash}. Reading the live table."
+        )
+        return None
+
+    if not _is_sample_matching(
+        engine, table_name, df, df_hashes, float_change_rules, sample_size
+    ):
+        logger.warning(
+            f'State manifest of "{table_name}" does not match the live table. '
+            "Reading the live table."
+        )
+        return None
+
+    logger.info(f'Using state manifest of "{table_name}" ({df_hashes.height:,} rows).')
+    return df_hashes
+
+
+def _get_live_row_count(
+    engine: sqlalchemy.engine.Engine, table: sqlalchemy.Table
+) -> int:
+    with engine.connect() as conn:
+        return conn.execute(
+            sqlalchemy.select(sqlalchemy.func.count()).select_from(table)
+        ).scalar_one()
+
+
+def _is_sample_matching(  # noqa: PLR0913
+    engine: sqlalchemy.engine.Engine,
+    table_name: str,
+    df: pl.DataFrame,
+    df_hashes: pl.DataFrame,
+    float_change_rules: Mapping[str, FloatChangeRule] | None,
+    sample_size: int,
+) -> bool:
+    """Check the live row count, and the hashes of a random sample of live rows."""
+    table = sqlalchemy.Table(table_name, sqlalchemy.MetaData(), autoload_with=engine)
+    primary_key_columns = [c.name for c in table.primary_key.columns]
+
+    if _get_live_row_count(engine, table) != df_hashes.height:
+        return False
+
+    df_sample_hashes = df_hashes.sample(min(sample_size, df_hashes.height))
+    df_live_sample = read_rows_by_primary_key(
+        engine, table, df_sample_hashes.select(primary_key_columns)
+    )
+    df_live_hashes = compute_row_hashes(
+        _cast_like(df_live_sample, df),
+        primary_key_columns,
+        float_change_rules=float_change_rules,
+    )
+    return df_live_hashes.height == df_sample_hashes.height and (
+        df_sample_hashes.join(
+            df_live_hashes,
+            on=df_sample_hashes.columns,  # Also compare float values exactly.
+            nulls_equal=True,
+            how="anti",
+        ).height
+        == 0
+    )
@@ -8,11 +8,40 @@ import time
 from contextlib import AbstractContextManager
 from pathlib import Path
 from types import TracebackType
+from typing import Any, Literal
 
+import backoff
 import polars as pl
 import sqlalchemy
+from backoff.types import Details
 from loguru import logger
 
+from coin_profitability_scraper.run_metrics import record_duration, record_metric
+
+
+def record_dolt_retry(details: Details) -> None:
+    """Log and record a retried Dolt operation (as `on_backoff` handler).
+
+    Labelled by the retried phase (e.g., "clone", "push", or "execute_batch").
+    """
+    phase = details["target"].__name__.removeprefix("_")
+    logger.warning(f"Retrying Dolt {phase}: {details}")
+    record_metric("dolt_retries", 1, unit="count", label=phase)
+
+
+# Dolt's (Git-like) messages when a push is rejected as non-fast-forward. Other
+# rejections (e.g., permissions) must not trigger a pull.
+_NON_FAST_FORWARD_MESSAGES = (
+    "(non-fast-forward)",
+    "updates were rejected because the tip of your current branch is behind",
+)
+
+
+def _is_non_fast_forward(push_output: str) -> bool:
+    """Check if a failed `dolt push` was rejected as non-fast-forward."""
+    output = push_output.lower()
+    return any(message in output for message in _NON_FAST_FORWARD_MESSAGES)
+
 
 class DoltDatabaseUpdater(AbstractContextManager["DoltDatabaseUpdater"]):
     """Context manager for temporarily cloning a Dolt database to update it.
@@ -21,10 +50,33 @@ class DoltDatabaseUpdater(AbstractContextManager["DoltDatabaseUpdater"]):
     committing/pushing changes.
     """
 
-    def __init__(self, repo_url: str, *, use_shallow_clone: bool = True) -> None:
-        """Initialize the context manager."""
+    def __init__(
+        self,
+        repo_url: str,
+        *,
+        use_shallow_clone: bool = True,
+        pool_size: int = 5,
+        branch: str | None = None,
+        start_sql_server: bool = True,
+    ) -> None:
+        """Initialize the context manager.
+
+        Args:
+            repo_url: URL of the Dolt repository to clone.
+            use_shallow_clone: Only clone the latest commit.
+            pool_size: Number of pooled SQL connections (for concurrent writes).
+            branch: New branch (from `main`) to commit and push to, instead of
+                `main` itself.
+            start_sql_server: Start the SQL server on enter. If False, only the
+                Dolt CLI is usable (e.g., `import_table()`), until
+                `start_sql_server()` is called.
+
+        """
         self.repo_url: str = repo_url
         self.use_shallow_clone: bool = use_shallow_clone
+        self.pool_size: int = pool_size
+        self.branch: str | None = branch
+        self._start_sql_server_on_enter: bool = start_sql_server
 
         self._dolt_sql_username: str = "root"
         self._dolt_sql_host: str = "127.0.0.1"
@@ -44,6 +96,34 @@ class DoltDatabaseUpdater(AbstractContextManager["DoltDatabaseUpdater"]):
         self.dolt_clone_dir.mkdir(parents=False, exist_ok=False)
 
         # Step 2: Clone the Dolt repo.
+        with record_duration("dolt_clone_time", label=self._dolt_sql_database_name):
+            self._clone()
+
+        if self.branch is not None:
+            subprocess.run(  # noqa: S603
+                [self._dolt_command_path, "checkout", "-b", self.branch],
+                cwd=self.dolt_clone_dir,
+                check=True,
+            )
+
+        if self._start_sql_server_on_enter:
+            self.start_sql_server()
+
+        return self
+
+    @backoff.on_exception(
+        backoff.expo,
+        subprocess.CalledProcessError,
+        max_tries=5,
+        on_backoff=record_dolt_retry,
+    )
+    def _clone(self) -> None:
+        """Clone the Dolt repo into the (empty) clone folder."""
+        if any(self.dolt_clone_dir.iterdir()):
+            # Clean up a partial clone from a failed try.
+            shutil.rmtree(self.dolt_clone_dir)
+            self.dolt_clone_dir.mkdir(parents=False, exist_ok=False)
+
         depth_cmd_part: list[str] = ["--depth=1"] if self.use_shallow_clone else []
         subprocess.run(  # noqa: S603
             [
@@ -56,6 +136,12 @@ class DoltDatabaseUpdater(AbstractContextManager["DoltDatabaseUpdater"]):
             check=True,
         )
 
+    def start_sql_server(self) -> None:
+        """Start the Dolt SQL server, and wait until it accepts connections."""
+        with record_duration("dolt_start_time", label=self._dolt_sql_database_name):
+            self._start_sql_server()
+
+    def _start_sql_server(self) -> None:
         # Step 3: Start Dolt SQL server on a random port
         self._proc = subprocess.Popen(  # noqa: S603
             [
@@ -76,7 +162,7 @@ class DoltDatabaseUpdater(AbstractContextManager["DoltDatabaseUpdater"]):
 
         # Step 4: Create SQLAlchemy engine.
         conn_str = f"mysql+pymysql://{self._dolt_sql_username}@{self._dolt_sql_host}:{self.dolt_sql_port}/{self._dolt_sql_database_name}"
-        self.engine = sqlalchemy.create_engine(conn_str)
+        self.engine = sqlalchemy.create_engine(conn_str, pool_size=self.pool_size)
 
         # Test connection.
         number_of_tries = 10
@@ -90,7 +176,49 @@ class DoltDatabaseUpdater(AbstractContextManager["DoltDatabaseUpdater"]):
                     raise
                 time.sleep(0.5)
 
-        return self
+    def import_table(
+        self,
+        table_name: str,
+        file_path: Path,
+        *,
+        mode: Literal["replace", "update"],
+    ) -> None:
+        """Import a CSV/Parquet file into an existing table, with `dolt table import`.
+
+        Must be called before the SQL server is started. In "replace" mode, the
+        table contents are replaced by the file. In "update" mode, the file rows are
+        inserted, or overwrite existing rows by primary key.
+        """
+        if self._proc is not None:
+            msg = "Dolt table import must run before the SQL server is started."
+            raise RuntimeError(msg)
+
+        mode_flag = {"replace": "-r", "update": "-u"}[mode]
+        with record_duration("dolt_import_time", label=table_name):
+            subprocess.run(  # noqa: S603
+                [
+                    self._dolt_command_path,
+                    "table",
+                    "import",
+                    mode_flag,
+                    table_name,
+                    file_path.resolve(),
+                ],
+                cwd=self.dolt_clone_dir,
+                check=True,
+            )
+
+    def run_sql(self, query: str) -> None:
+        """Run a SQL query with the Dolt CLI (before the SQL server is started)."""
+        if self._proc is not None:
+            msg = "Use the engine to run SQL while the SQL server is running."
+            raise RuntimeError(msg)
+
+        subprocess.run(  # noqa: S603
+            [self._dolt_command_path, "sql", "-q", query],
+            cwd=self.dolt_clone_dir,
+            check=True,
+        )
 
     def read_table_to_polars(self, table_name: str) -> pl.DataFrame:
         """Read a Dolt table into a Polars DataFrame."""
@@ -101,14 +229,54 @@ class DoltDatabaseUpdater(AbstractContextManager["DoltDatabaseUpdater"]):
         )
         return df
 
-    def read_query_to_polars(self, query: str) -> pl.DataFrame:
-        """Read a Dolt table into a Polars DataFrame."""
+    def read_query_to_polars(
+        self, query: str, parameters: dict[str, Any] | None = None
+    ) -> pl.DataFrame:
+        """Read a Dolt query (with bound `:parameters`) into a Polars DataFrame."""
         return pl.read_database(
-            query,
+            sqlalchemy.text(query),
             connection=self.engine,
             infer_schema_length=None,  # Use all rows.
+            execute_options={"parameters": parameters or {}},
         )
 
+    def get_table_hash(self, table_name: str) -> str:
+        """Get the content hash of a table (in the working set).
+
+        Unlike a commit hash, it's the same on every branch and commit with the same
+        table contents (e.g., after a write branch is merged into `main`).
+        """
+        with self.engine.connect() as conn:
+            table_hash = conn.execute(
+                sqlalchemy.text("SELECT DOLT_HASHOF_TABLE(:table_name)"),
+                {"table_name": table_name},
+            ).scalar_one()
+        return str(table_hash)
+
+    def fetch_and_fast_forward(self) -> bool:
+        """Fetch from the remote, and fast-forward the checked-out branch to it.
+
+        For long-lived, read-only sessions (without local commits). Cheap when the
+        remote is unchanged. Returns True if HEAD moved.
+        """
+        remote_ref = f"origin/{self.branch or 'main'}"
+        with self.engine.connect() as conn:
+            conn.execute(sqlalchemy.text("CALL DOLT_FETCH('origin')"))
+            (head_hash, remote_hash) = conn.execute(
+                sqlalchemy.text("SELECT HASHOF('HEAD'), HASHOF(:remote_ref)"),
+                {"remote_ref": remote_ref},
+            ).one()
+            if head_hash == remote_hash:
+                return False
+
+            logger.info(f"Fast-forwarding from {head_hash} to {remote_hash}.")
+            conn.execute(
+                sqlalchemy.text("CALL DOLT_MERGE(:remote_ref)"),
+                {"remote_ref": remote_ref},
+            )
+            conn.commit()
+        return True
+
     def dolt_commit_and_push(self, commit_message: str) -> None:
         """Stage, commit, and push changes to the Dolt remote.
 
@@ -156,16 +324,100 @@ class DoltDatabaseUpdater(AbstractContextManager["DoltDatabaseUpdater"]):
             commit_proc.check_returncode()
 
         # Push to remote.
-        subprocess.run(  # noqa: S603
-            [self._dolt_command_path, "push"], cwd=self.dolt_clone_dir, check=True
+        with record_duration("dolt_push_time", label=self._dolt_sql_database_name):
+            self.push()
+
+    @backoff.on_exception(
+        backoff.expo,
+        subprocess.CalledProcessError,
+        max_tries=5,
+        on_backoff=record_dolt_retry,
+    )
+    def push(self) -> None:
+        """Push to the remote. If rejected as non-fast-forward, pull (merge) first.
+
+        Only the push is retried, so that the clone and upserts are kept. A new
+        `branch` is pushed with its upstream set, and never pulled (it has no new
+        remote commits to merge).
+        """
+        branch_cmd_part: list[str] = (
+            ["--set-upstream", "origin", self.branch] if self.branch else []
         )
+        push_proc = subprocess.run(  # noqa: S603
+            [self._dolt_command_path, "push", *branch_cmd_part],
+            check=False,
+            cwd=self.dolt_clone_dir,
+            capture_output=True,
+            text=True,
+        )
+        if push_proc.returncode == 0:
+            return
+
+        logger.warning(f"Dolt push failed: {push_proc.stderr or push_proc.stdout}")
+        if self.branch is None and _is_non_fast_forward(
+            push_proc.stdout + push_proc.stderr
+        ):
+            # Another job pushed first. Merge its commits, then push again.
+            logger.info("Remote has new commits. Pulling them before pushing again.")
+            subprocess.run(  # noqa: S603
+                [self._dolt_command_path, "pull"], cwd=self.dolt_clone_dir, check=True
+            )
+        push_proc.check_returncode()
+
+    def merge_remote_branches(self, prefix: str) -> list[str]:
+        """Fetch, and merge all remote branches starting with `prefix`, in name order.
+
+        Requires a full (non-shallow) clone, to find the merge bases. Raises if a
+        merge has conflicts. Returns the merged branch names (without `origin/`).
+        """
+        with self.engine.connect() as conn:
+            conn.execute(sqlalchemy.text("CALL DOLT_FETCH('origin')"))
+            branch_names = sorted(
+                str(name).removeprefix("remotes/origin/")
+                for name in conn.execute(
+                    sqlalchemy.text(
+                        "SELECT name FROM dolt_remote_branches WHERE name LIKE :pattern"
+                    ),
+                    {"pattern": f"remotes/origin/{prefix}%"},
+                ).scalars()
+            )
+            for branch_name in branch_names:
+                logger.info(f"Merging Dolt branch {branch_name} into main.")
+                merge_result = conn.execute(
+                    sqlalchemy.text("CALL DOLT_MERGE(:branch, '-m', :message)"),
+                    {
+                        "branch": f"origin/{branch_name}",
+                        "message": f"Merge branch {branch_name}",
+                    },
+                ).one()
+                if merge_result.conflicts:
+                    msg = f"Merging Dolt branch {branch_name} has conflicts."
+                    raise RuntimeError(msg)
+            conn.commit()
+        return branch_names
+
+    def delete_remote_branches(self, branch_names: list[str]) -> None:
+        """Delete branches from the remote (e.g., after merging them)."""
+        for branch_name in branch_names:
+            delete_proc = subprocess.run(  # noqa: S603
+                [self._dolt_command_path, "push", "origin", f":{branch_name}"],
+                check=False,
+                cwd=self.dolt_clone_dir,
+                capture_output=True,
+                text=True,
+            )
+            if delete_proc.returncode != 0:
+                logger.warning(
+                    f"Could not delete remote Dolt branch {branch_name}: "
+                    f"{delete_proc.stderr or delete_proc.stdout}"
+                )
 
     def __exit__(
         self,
         exc_type: type[BaseException] | None,
         exc_val: BaseException | None,
         exc_tb: TracebackType | None,
-    ) -> bool:
+    ) -> Literal[False]:
         """End the context manager."""
         # Step 6: Stop the Dolt SQL server
         if self._proc:
@@ -1,84 +1,408 @@
 """Utilities for managing the Dolt database connection."""
 
 import math
+from collections.abc import Mapping, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any
 
+import backoff
 import polars as pl
 import sqlalchemy
 import sqlalchemy.dialects.mysql
+import sqlalchemy.dialects.sqlite
+import sqlalchemy.exc
 from loguru import logger
 from tqdm import tqdm
 
+from coin_profitability_scraper.dolt_updater import record_dolt_retry
+from coin_profitability_scraper.float_change_rules import FloatChangeRule
+from coin_profitability_scraper.run_metrics import (
+    bind_current_step,
+    record_duration,
+    record_metric,
+)
+
 DOLT_DATABASE_NAME = "cryptocurrency-coin-algo-data"
 DOLT_REPO_URL = (
     "https://www.dolthub.com/repositories/recranger/cryptocurrency-coin-algo-data"
 )
 
+# Prefix of the per-job write branches (see `get_dolt_write_branch()`).
+DOLT_WRITE_BRANCH_PREFIX = "auto/"
 
-def upsert_polars_rows(
-    engine: sqlalchemy.engine.Engine,
-    table_name: str,
+
+def _get_applicable_rules(
+    float_change_rules: Mapping[str, FloatChangeRule] | None, *dfs: pl.DataFrame
+) -> dict[str, FloatChangeRule]:
+    """Get the change rules of the columns present in all of `dfs`."""
+    return {
+        col: rule
+        for col, rule in (float_change_rules or {}).items()
+        if all(col in df.columns for df in dfs)
+    }
+
+
+def _is_any_rule_changed_expr(rules: Mapping[str, FloatChangeRule]) -> pl.Expr:
+    """Compare each rule's column to its `{col}__current` counterpart."""
+    return pl.any_horizontal(
+        pl.lit(value=False),
+        *(
+            rule.is_changed_expr(pl.col(col), pl.col(f"{col}__current"))
+            for col, rule in rules.items()
+        ),
+    )
+
+
+def find_changed_rows(
     df: pl.DataFrame,
+    df_current: pl.DataFrame,
     *,
-    batch_size: int = 1000,
     exclude_float_columns_in_change_assessment: bool = True,
-) -> None:
-    """Upsert all rows from a Polars DataFrame into the given SQL table.
+    float_change_rules: Mapping[str, FloatChangeRule] | None = None,
+) -> pl.DataFrame:
+    """Get the rows of `df` which are new or changed compared to `df_current`.
+
+    Has unit test.
 
     Args:
-        engine: SQLAlchemy Engine
-        table_name (str): Name of the SQL table
-        df (pl.DataFrame): Polars DataFrame
-        batch_size (int): Size of each upsert operation.
+        df (pl.DataFrame): New content of the table.
+        df_current (pl.DataFrame): Current content of the table (as read from SQL).
         exclude_float_columns_in_change_assessment (bool): Whether to exclude
-            float columns from the change assessment. Float cols ALWAYS show as
-            changed.
+            float columns without a change rule from the change assessment. Float
+            cols ALWAYS show as changed.
+        float_change_rules (Mapping[str, FloatChangeRule] | None): Tolerance-aware
+            change rules of float columns (see `get_float_change_rules()`).
 
     """
-    # Filter the dataframe to updates only.
-    # TODO: There may be a more efficient way relying on database features.
-    df_current = pl.read_database(
-        query=f"SELECT * FROM {table_name}",  # noqa: S608
-        connection=engine,
-        infer_schema_length=None,  # Use all rows.
-    )
     # Cast so that join works, especially in case `df_current` is empty (brand new
     # table).
     df_current = df_current.cast(
         {col: dtype for col, dtype in df.schema.items() if col in df_current}
     )
-    join_cols = sorted(set(df.columns) & set(df_current.columns))
+    rules = _get_applicable_rules(float_change_rules, df, df_current)
+    join_cols = sorted((set(df.columns) & set(df_current.columns)) - rules.keys())
     if exclude_float_columns_in_change_assessment:
         join_cols = [
             col
             for col in join_cols
             if df_current[col].dtype not in {pl.Float64, pl.Float32}
         ]
-    df_update = df.join(
-        df_current,
-        on=join_cols,
-        nulls_equal=True,  # Important.
-        how="anti",
+    if not rules:
+        return df.join(
+            df_current,
+            on=join_cols,
+            nulls_equal=True,  # Important.
+            how="anti",
+        )
+
+    # Match each row to its current version (if otherwise unchanged), then apply the
+    # change rules to the float columns.
+    return (
+        df.join(
+            df_current.select(
+                *join_cols,
+                *(pl.col(col).alias(f"{col}__current") for col in rules),
+                _is_current=pl.lit(value=True),
+            ),
+            on=join_cols,
+            nulls_equal=True,  # Important.
+            how="left",
+            maintain_order="left",
+        )
+        .filter(pl.col("_is_current").is_null() | _is_any_rule_changed_expr(rules))
+        .select(df.columns)
+    )
+
+
+def compute_row_hashes(
+    df: pl.DataFrame,
+    primary_key_columns: Sequence[str],
+    *,
+    exclude_float_columns_in_change_assessment: bool = True,
+    float_change_rules: Mapping[str, FloatChangeRule] | None = None,
+) -> pl.DataFrame:
+    """Get the primary key, and a 64-bit hash of the other columns, of each row.
+
+    Columns are hashed in name order. Float columns are excluded like in
+    `find_changed_rows()`, as are the automatic `created_at`/`updated_at` columns.
+    Float columns with a change rule are kept as-is next to the hash, as tolerances
+    can't be compared by hash.
+
+    Has unit test.
+    """
+    df = df.with_columns(
+        (pl.selectors.enum() | pl.selectors.categorical()).cast(pl.String)
+    )
+    rules = _get_applicable_rules(float_change_rules, df)
+    hashed_columns = sorted(
+        col
+        for col, dtype in df.schema.items()
+        if col not in primary_key_columns
+        and col not in rules
+        and col not in {"created_at", "updated_at"}
+        and not (
+            exclude_float_columns_in_change_assessment
+            and dtype in {pl.Float64, pl.Float32}
+        )
+    )
+    return df.select(
+        *primary_key_columns,
+        *sorted(rules),
+        row_hash=(
+            pl.struct(hashed_columns).hash(seed=0)
+            if hashed_columns
+            else pl.lit(0, dtype=pl.UInt64)
+        ),
+    )
+
+
+def find_changed_rows_by_hash(
+    df: pl.DataFrame,
+    df_current_hashes: pl.DataFrame,
+    primary_key_columns: Sequence[str],
+    *,
+    exclude_float_columns_in_change_assessment: bool = True,
+    float_change_rules: Mapping[str, FloatChangeRule] | None = None,
+) -> pl.DataFrame:
+    """Get the rows of `df` which are new or changed compared to the current hashes.
+
+    Same result as `find_changed_rows()`, but only needs the primary key and row hash
+    of the current rows (see `compute_row_hashes()`), not the full current rows.
+
+    Has unit test.
+    """
+    rules = _get_applicable_rules(float_change_rules, df, df_current_hashes)
+    df_changed_keys = (
+        compute_row_hashes(
+            df,
+            primary_key_columns,
+            exclude_float_columns_in_change_assessment=(
+                exclude_float_columns_in_change_assessment
+            ),
+            float_change_rules=rules,
+        )
+        .join(
+            df_current_hashes.select(
+                *primary_key_columns,
+                *(pl.col(col).alias(f"{col}__current") for col in rules),
+                row_hash__current="row_hash",
+            ),
+            on=primary_key_columns,
+            nulls_equal=True,
+            how="left",
+        )
+        .filter(
+            pl.col("row_hash__current").is_null()
+            | (pl.col("row_hash") != pl.col("row_hash__current"))
+            | _is_any_rule_changed_expr(rules)
+        )
+    )
+    return df.join(
+        df_changed_keys.select(primary_key_columns),
+        on=list(primary_key_columns),
+        nulls_equal=True,
+        how="semi",
+    )
+
+
+def read_rows_by_primary_key(
+    engine: sqlalchemy.engine.Engine,
+    table: sqlalchemy.Table,
+    df_keys: pl.DataFrame,
+    *,
+    batch_size: int = 1000,
+) -> pl.DataFrame:
+    """Read the rows of the given SQL table whose primary key is in `df_keys`."""
+    return read_query_where_in(
+        engine,
+        sqlalchemy.select(table),
+        sqlalchemy.tuple_(*table.primary_key.columns),
+        df_keys,
+        batch_size=batch_size,
+    )
+
+
+def read_query_where_in(
+    engine: sqlalchemy.engine.Engine,
+    query: sqlalchemy.Select[Any],
+    column: sqlalchemy.ColumnElement[Any],
+    df_values: pl.DataFrame,
+    *,
+    batch_size: int = 1000,
+) -> pl.DataFrame:
+    """Read the rows of `query` where `column` is in `df_values`, in batches.
+
+    Bounds the number of bound parameters per statement. For a `sqlalchemy.tuple_()`
+    `column` (e.g., over an index), `df_values` has one column per tuple element.
+    Rows may be repeated across batches (e.g., with `DISTINCT`).
+
+    Has unit test.
+    """
+    df_chunks = [
+        pl.read_database(
+            query=query.where(
+                column.in_(
+                    df_chunk.rows()
+                    if isinstance(column, sqlalchemy.Tuple)
+                    else df_chunk.to_series().to_list()
+                )
+            ),
+            connection=engine,
+            infer_schema_length=None,  # Use all rows.
+        )
+        for df_chunk in df_values.iter_slices(batch_size)
+    ]
+    if not df_chunks:
+        return pl.read_database(query=query.limit(0), connection=engine)
+    return pl.concat(df_chunks, how="vertical_relaxed")
+
+
+def upsert_polars_rows(  # noqa: PLR0913
+    engine: sqlalchemy.engine.Engine,
+    table_name: str,
+    df: pl.DataFrame,
+    *,
+    batch_size: int = 1000,
+    exclude_float_columns_in_change_assessment: bool = True,
+    float_change_rules: Mapping[str, FloatChangeRule] | None = None,
+    df_current_hashes: pl.DataFrame | None = None,
+    max_connections: int = 1,
+) -> pl.DataFrame:
+    """Upsert all rows from a Polars DataFrame into the given SQL table.
+
+    Returns the upsert delta: the new version of each changed or added row, plus the
+    previous version of each changed row (as currently in the table).
+
+    Args:
+        engine: SQLAlchemy Engine
+        table_name (str): Name of the SQL table
+        df (pl.DataFrame): Polars DataFrame
+        batch_size (int): Size of each upsert operation.
+        exclude_float_columns_in_change_assessment (bool): Whether to exclude
+            float columns without a change rule from the change assessment. Float
+            cols ALWAYS show as changed.
+        float_change_rules (Mapping[str, FloatChangeRule] | None): Tolerance-aware
+            change rules of float columns (see `get_float_change_rules()`).
+        df_current_hashes (pl.DataFrame | None): Row hashes of the current table
+            (see `compute_row_hashes()`), e.g., from a verified state manifest. If
+            given, only the previous versions of changed rows are read from SQL,
+            instead of the whole table.
+        max_connections (int): Number of pooled connections to split the batches
+            across. Each gets a disjoint range of rows, in its own transaction
+            (Dolt merges concurrent transactions which touch different rows).
+
+    """
+    # Enum/Categorical columns are plain strings in SQL.
+    df = df.with_columns(
+        (pl.selectors.enum() | pl.selectors.categorical()).cast(pl.String)
     )
+
+    meta = sqlalchemy.MetaData()
+    table = sqlalchemy.Table(table_name, meta, autoload_with=engine)
+    primary_key_columns = [c.name for c in table.primary_key.columns]
+
+    # Filter the dataframe to updates only.
+    if df_current_hashes is None:
+        df_current = pl.read_database(
+            query=f"SELECT * FROM {table_name}",  # noqa: S608
+            connection=engine,
+            infer_schema_length=None,  # Use all rows.
+        )
+        current_row_count = df_current.height
+        df_update = find_changed_rows(
+            df,
+            df_current,
+            exclude_float_columns_in_change_assessment=(
+                exclude_float_columns_in_change_assessment
+            ),
+            float_change_rules=float_change_rules,
+        )
+    else:
+        current_row_count = df_current_hashes.height
+        df_update = find_changed_rows_by_hash(
+            df,
+            df_current_hashes,
+            primary_key_columns,
+            exclude_float_columns_in_change_assessment=(
+                exclude_float_columns_in_change_assessment
+            ),
+            float_change_rules=float_change_rules,
+        )
+        # Only read the previous versions of the changed rows.
+        df_current = read_rows_by_primary_key(
+            engine, table, df_update.select(primary_key_columns), batch_size=batch_size
+        )
+    record_metric("rows_in", df.height, unit="rows", label=table_name)
+    record_metric("rows_upserted", df_update.height, unit="rows", label=table_name)
     del df  # Ensure we always use `df_update` now.
     logger.info(
         f'Upsert to "{table_name}". '
-        f"{df_current.height:,} rows currently. "
+        f"{current_row_count:,} rows currently. "
         f"Updating and adding {df_update.height:,} rows. "
-        f"Skipping {df_current.height - df_update.height:,} unchanged rows."
+        f"Skipping {current_row_count - df_update.height:,} unchanged rows."
     )
 
     if df_update.height == 0:
-        return
+        return df_update
 
-    meta = sqlalchemy.MetaData()
-    table = sqlalchemy.Table(table_name, meta, autoload_with=engine)
+    df_delta = pl.concat(
+        [
+            df_update,
+            df_current.cast(
+                {
+                    col: dtype
+                    for col, dtype in df_update.schema.items()
+                    if col in df_current
+                }
+            )
+            .join(
+                df_update.select(primary_key_columns),
+                on=primary_key_columns,
+                how="semi",
+            )
+            .select(df_update.columns),
+        ]
+    )
 
-    # Create an INSERT ... ON DUPLICATE KEY UPDATE statement.
-    stmt = sqlalchemy.dialects.mysql.insert(table)
+    stmt = _get_upsert_statement(engine, table)
+
+    # Split the rows (disjoint keys) across connections, one transaction each.
+    partition_size = math.ceil(df_update.height / max_connections)
+    df_partitions = list(df_update.iter_slices(partition_size))
+    with (
+        record_duration("upsert_time", label=table_name),
+        ThreadPoolExecutor(max_workers=len(df_partitions)) as executor,
+    ):
+        list(
+            executor.map(
+                bind_current_step(
+                    lambda df_partition: _execute_upsert_batches(
+                        engine,
+                        stmt,
+                        df_partition,
+                        batch_size=batch_size,
+                        desc=f'Upserting {df_partition.height} rows to "{table_name}"',
+                    )
+                ),
+                df_partitions,
+            )
+        )
+
+    return df_delta
+
+
+def _get_upsert_statement(
+    engine: sqlalchemy.engine.Engine, table: sqlalchemy.Table
+) -> sqlalchemy.Insert:
+    """Create an INSERT which updates the existing row on a duplicate primary key.
 
+    Uses `ON DUPLICATE KEY UPDATE` (MySQL/Dolt), or `ON CONFLICT` on SQLite (tests).
+    """
     # Define what to do on duplicate key.
-    update_dict = {
-        c.name: stmt.inserted[c.name]
+    update_columns = [
+        c.name
         for c in table.columns
         if (
             not c.primary_key
@@ -86,15 +410,178 @@ def upsert_polars_rows(
             and c.name not in {"created_at"}
             # Disable: `and c.name in df_update.columns` (`updated_at` doesn't update).
         )
-    }
-    stmt = stmt.on_duplicate_key_update(**update_dict)
+    ]
+    if engine.dialect.name == "sqlite":
+        sqlite_stmt = sqlalchemy.dialects.sqlite.insert(table)
+        return sqlite_stmt.on_conflict_do_update(
+            index_elements=list(table.primary_key.columns),
+            set_={col: sqlite_stmt.excluded[col] for col in update_columns},
+        )
 
-    # Iterate over rows from Polars and update.
+    # Create an INSERT ... ON DUPLICATE KEY UPDATE statement.
+    stmt = sqlalchemy.dialects.mysql.insert(table)
+    return stmt.on_duplicate_key_update(
+        {col: stmt.inserted[col] for col in update_columns}
+    )
+
+
+def _execute_upsert_batches(
+    engine: sqlalchemy.engine.Engine,
+    stmt: sqlalchemy.Insert,
+    df: pl.DataFrame,
+    *,
+    batch_size: int,
+    desc: str,
+) -> None:
+    """Execute the upsert statement for all rows, in batches."""
+    for df_chunk in tqdm(
+        df.iter_slices(batch_size),
+        desc=desc,
+        unit="batch",
+        total=math.ceil(df.height / batch_size),
+    ):
+        _execute_batch(engine, stmt, df_chunk.to_dicts())
+
+
+@backoff.on_exception(
+    backoff.expo,
+    (sqlalchemy.exc.OperationalError, sqlalchemy.exc.InterfaceError),
+    max_tries=5,
+    on_backoff=record_dolt_retry,
+)
+def _execute_batch(
+    engine: sqlalchemy.engine.Engine,
+    statement: sqlalchemy.Executable,
+    parameters: list[dict[str, Any]] | None = None,
+) -> None:
+    """Execute one (idempotent) batch in its own transaction.
+
+    On a connection error, only this batch is retried (on a fresh connection), and
+    the batches already committed are kept.
+    """
     with engine.begin() as conn:
-        for df_chunk in tqdm(
-            df_update.iter_slices(batch_size),
-            desc=f'Upserting {df_update.height} rows to "{table_name}"',
-            unit="batch",
-            total=math.floor(df_update.height / batch_size),
-        ):
-            conn.execute(stmt, df_chunk.to_dicts())
+        conn.execute(statement, parameters)
+
+
+def delete_rows_not_in_polars(
+    engine: sqlalchemy.engine.Engine,
+    table_name: str,
+    df: pl.DataFrame,
+    *,
+    batch_size: int = 1000,
+    df_current_hashes: pl.DataFrame | None = None,
+) -> int:
+    """Delete all rows from the given SQL table whose primary key is not in `df`.
+
+    Supports composite primary keys. The keys to delete are found with an anti-join
+    in Polars (against the current keys only), then deleted in bounded batches.
+
+    Args:
+        engine: SQLAlchemy Engine
+        table_name (str): Name of the SQL table
+        df (pl.DataFrame): Polars DataFrame with all rows to keep.
+        batch_size (int): Number of keys per DELETE statement.
+        df_current_hashes (pl.DataFrame | None): Row hashes of the current table
+            (see `compute_row_hashes()`). If given, the current keys are taken from
+            it instead of being read from SQL.
+
+    Returns:
+        Number of deleted rows.
+
+    """
+    if df.height == 0:
+        msg = f'Refusing to delete all rows from "{table_name}" (empty DataFrame).'
+        raise ValueError(msg)
+
+    meta = sqlalchemy.MetaData()
+    table = sqlalchemy.Table(table_name, meta, autoload_with=engine)
+    primary_key_columns = [c.name for c in table.primary_key.columns]
+    if not primary_key_columns:
+        msg = f'Table "{table_name}" has no primary key.'
+        raise ValueError(msg)
+
+    # Enum/Categorical columns are plain strings in SQL.
+    df_keys = df.select(primary_key_columns).with_columns(
+        (pl.selectors.enum() | pl.selectors.categorical()).cast(pl.String)
+    )
+    df_current_keys = (
+        pl.read_database(
+            query=sqlalchemy.select(*table.primary_key.columns),
+            connection=engine,
+            infer_schema_length=None,  # Use all rows.
+        )
+        if df_current_hashes is None
+        else df_current_hashes.select(primary_key_columns)
+    ).cast(dict(df_keys.schema.items()))
+
+    df_delete = df_current_keys.join(
+        df_keys, on=primary_key_columns, nulls_equal=True, how="anti"
+    )
+    logger.info(
+        f'Prune "{table_name}". '
+        f"{df_current_keys.height:,} rows currently. "
+        f"Deleting {df_delete.height:,} rows no longer present."
+    )
+    record_metric("rows_deleted", df_delete.height, unit="rows", label=table_name)
+    if df_delete.height == 0:
+        return 0
+
+    primary_key_tuple = sqlalchemy.tuple_(*table.primary_key.columns)
+    for df_chunk in df_delete.iter_slices(batch_size):
+        _execute_batch(
+            engine,
+            sqlalchemy.delete(table).where(primary_key_tuple.in_(df_chunk.rows())),
+        )
+
+    return df_delete.height
+
+
+def write_import_csv(
+    df: pl.DataFrame, csv_path: Path, *, imported_at: datetime
+) -> None:
+    """Write a frame as a CSV file for `dolt table import`.
+
+    Enum/Categorical columns become strings, bools become 0/1, and datetimes are
+    written in UTC, in the SQL `DATETIME` format. The `created_at`/`updated_at`
+    columns are set to `imported_at`, and restored for existing rows by the
+    `get_timestamp_fixup_sql()` query.
+
+    Has unit test.
+    """
+    df = df.with_columns(
+        (pl.selectors.enum() | pl.selectors.categorical()).cast(pl.String),
+        pl.selectors.boolean().cast(pl.Int8),
+        pl.selectors.datetime(time_zone="*")
+        .dt.convert_time_zone("UTC")
+        .dt.replace_time_zone(None),
+        created_at=pl.lit(imported_at.replace(tzinfo=None), dtype=pl.Datetime("us")),
+        updated_at=pl.lit(imported_at.replace(tzinfo=None), dtype=pl.Datetime("us")),
+    )
+    df.write_csv(csv_path, datetime_format="%Y-%m-%d %H:%M:%S")
+
+
+def get_timestamp_fixup_sql(
+    table_name: str, columns: Sequence[str], primary_key_columns: Sequence[str]
+) -> str:
+    """Get the query restoring `created_at`/`updated_at` after a `dolt table import`.
+
+    Rows which existed at HEAD keep their `created_at`, and also their `updated_at`
+    if none of their other `columns` changed (like an upsert would leave them).
+
+    Has unit test.
+    """
+    join_condition = " AND ".join(
+        f"t.`{col}` = prev.`{col}`" for col in primary_key_columns
+    )
+    unchanged_condition = " AND ".join(
+        f"t.`{col}` <=> prev.`{col}`"
+        for col in columns
+        if col not in primary_key_columns and col not in {"created_at", "updated_at"}
+    )
+    return (  # Table and column names come from the schemas, not from user input.
+        f"UPDATE `{table_name}` AS t "  # noqa: S608
+        f"JOIN `{table_name}` AS OF 'HEAD' AS prev ON {join_condition} "
+        "SET t.`created_at` = prev.`created_at`, "
+        f"t.`updated_at` = IF({unchanged_condition or 'TRUE'}, "
+        "prev.`updated_at`, t.`updated_at`)"
+    )
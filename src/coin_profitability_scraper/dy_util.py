@@ -0,0 +1,84 @@
+"""Utilities for writing and reading Dataframely-validated Parquet files.
+
+Validated frames are written with a "validation stamp" in the Parquet key-value
+metadata: a fingerprint of the schema, plus a hash of the content. Readers skip the
+(potentially expensive) re-validation when the stamp still matches.
+"""
+
+import hashlib
+from pathlib import Path
+
+import dataframely as dy
+import orjson
+import polars as pl
+from loguru import logger
+
+from coin_profitability_scraper import is_strict_validation
+from coin_profitability_scraper.run_metrics import record_metric
+
+VALIDATION_STAMP_METADATA_KEY = "coin_profitability_scraper.validation_stamp"
+
+
+def schema_fingerprint(schema: type[dy.Schema]) -> str:
+    """Get a fingerprint of a Dataframely schema (columns, rules, and lib versions)."""
+    return hashlib.sha256(schema.serialize().encode()).hexdigest()
+
+
+def content_hash(df: pl.DataFrame) -> str:
+    """Get a hash of the content (column names, dtypes, and all values) of a frame."""
+    rows_hash: int = df.hash_rows(seed=0).implode().hash(seed=0).item()
+    header = [[col, str(dtype)] for col, dtype in df.schema.items()]
+    return hashlib.sha256(orjson.dumps([header, df.height, rows_hash])).hexdigest()
+
+
+def write_validated_parquet[S: dy.Schema](
+    df: dy.DataFrame[S], schema: type[S], path: Path
+) -> None:
+    """Write an already-validated frame to Parquet, with a validation stamp."""
+    stamp = {
+        "schema_fingerprint": schema_fingerprint(schema),
+        "content_hash": content_hash(df),
+    }
+    schema.write_parquet(
+        df,
+        path,
+        metadata={VALIDATION_STAMP_METADATA_KEY: orjson.dumps(stamp).decode()},
+    )
+    record_metric("rows_written", df.height, unit="rows", label=path.name)
+
+
+def _read_validation_stamp(path: Path) -> dict[str, str] | None:
+    stamp_str = pl.read_parquet_metadata(path).get(VALIDATION_STAMP_METADATA_KEY)
+    if stamp_str is None:
+        return None
+    return orjson.loads(stamp_str)
+
+
+def read_validated_parquet[S: dy.Schema](
+    path: Path, schema: type[S], *, strict: bool | None = None
+) -> dy.DataFrame[S]:
+    """Read a Parquet file, only validating it if its validation stamp doesn't match.
+
+    Args:
+        path: Parquet file to read.
+        schema: Schema to validate against.
+        strict: Always run full validation. Defaults to `is_strict_validation()`.
+
+    """
+    if strict is None:
+        strict = is_strict_validation()
+
+    df = pl.read_parquet(path)
+    record_metric("rows_read", df.height, unit="rows", label=path.name)
+
+    stamp = None if strict else _read_validation_stamp(path)
+    if (
+        stamp is not None
+        and stamp.get("schema_fingerprint") == schema_fingerprint(schema)
+        and stamp.get("content_hash") == content_hash(df)
+    ):
+        logger.debug(f"Validation stamp matches. Skipping validation of {path.name}")
+        return schema.cast(df)
+
+    logger.debug(f"Running full validation of {path.name}")
+    return schema.validate(df, cast=True)
@@ -0,0 +1,68 @@
+"""Tolerance-aware change rules for float columns, declared in the column metadata.
+
+Float columns (prices, hashrates, market caps, etc.) change slightly on almost every
+scrape. Without a rule, they are ignored when deciding which rows to upsert (see
+`dolt_util.find_changed_rows()`). With a rule, a row is upserted when the column
+changed materially: by more than the absolute or relative tolerance, after rounding
+to the declared precision.
+"""
+
+from dataclasses import asdict, dataclass
+from typing import Any
+
+import dataframely as dy
+import polars as pl
+
+# Column metadata key: the `FloatChangeRule` (as a dict) of a float column.
+FLOAT_CHANGE_RULE_METADATA_KEY = "float_change_rule"
+
+
+@dataclass(frozen=True, kw_only=True)
+class FloatChangeRule:
+    """When a float value counts as changed. Tolerances are inclusive."""
+
+    abs_tolerance: float = 0.0
+    rel_tolerance: float = 0.0  # Relative to the larger of both absolute values.
+    decimals: int | None = None  # Round both values first.
+
+    def is_changed_expr(self, new: pl.Expr, current: pl.Expr) -> pl.Expr:
+        """Get an expression which is True where `new` changed from `current`.
+
+        Has unit test.
+        """
+        if self.decimals is not None:
+            new = new.round(self.decimals)
+            current = current.round(self.decimals)
+        tolerance = pl.max_horizontal(
+            pl.lit(self.abs_tolerance),
+            self.rel_tolerance * pl.max_horizontal(new.abs(), current.abs()),
+        )
+        return (new.is_null() != current.is_null()) | (
+            ((new - current).abs() > tolerance).fill_null(value=False)
+        )
+
+
+def float_change_rule(
+    *,
+    abs_tolerance: float = 0.0,
+    rel_tolerance: float = 0.0,
+    decimals: int | None = None,
+) -> dict[str, Any]:
+    """Get the column metadata declaring a `FloatChangeRule`.
+
+    Use as: `dy.Float64(nullable=False, metadata=float_change_rule(...))`.
+    """
+    rule = FloatChangeRule(
+        abs_tolerance=abs_tolerance, rel_tolerance=rel_tolerance, decimals=decimals
+    )
+    # Stored as a plain dict, so that the schema stays serializable.
+    return {FLOAT_CHANGE_RULE_METADATA_KEY: asdict(rule)}
+
+
+def get_float_change_rules(schema: type[dy.Schema]) -> dict[str, FloatChangeRule]:
+    """Get the change rules declared on the columns of a schema."""
+    return {
+        col_name: FloatChangeRule(**column.metadata[FLOAT_CHANGE_RULE_METADATA_KEY])
+        for col_name, column in schema.columns().items()
+        if column.metadata and FLOAT_CHANGE_RULE_METADATA_KEY in column.metadata
+    }
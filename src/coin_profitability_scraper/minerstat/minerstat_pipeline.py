@@ -11,6 +11,7 @@ from coin_profitability_scraper.minerstat import (
     step_2b_scrape_each_coin_page,
     step_3b_ingest_each_coin_page,
 )
+from coin_profitability_scraper.run_metrics import collect_run_metrics
 
 
 def main_minerstat_pipeline() -> None:
@@ -29,4 +30,5 @@ def main_minerstat_pipeline() -> None:
 
 
 if __name__ == "__main__":
-    main_minerstat_pipeline()
+    with collect_run_metrics("minerstat_pipeline"):
+        main_minerstat_pipeline()
@@ -6,6 +6,7 @@ import polars as pl
 from bs4 import BeautifulSoup
 from loguru import logger
 
+from coin_profitability_scraper.run_metrics import metered_step
 from coin_profitability_scraper.util import download_as_bytes, write_tables
 
 step_1a_output_folder_path = Path("./out/minerstat/") / Path(__file__).stem
@@ -95,6 +96,7 @@ def transform_add_extra_columns(df: pl.DataFrame) -> pl.DataFrame:
     return df  # noqa: RET504
 
 
+@metered_step
 def main() -> None:
     """Fetch and process Minerstat algorithm data."""
     logger.info(f"Starting {Path(__file__).name} main()")
@@ -16,6 +16,7 @@ import orjson
 import polars as pl
 from loguru import logger
 
+from coin_profitability_scraper.run_metrics import metered_step
 from coin_profitability_scraper.util import (
     download_as_bytes,
     get_datetime_str,
@@ -77,6 +78,7 @@ def summarize_by_algo(df_coins: pl.DataFrame) -> pl.DataFrame:
     return df_algos
 
 
+@metered_step
 def main() -> None:
     """Generate a report summarizing the parsed coin data."""
     logger.info(f"Starting {Path(__file__).name} main()")
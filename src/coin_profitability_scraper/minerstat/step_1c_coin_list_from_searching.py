@@ -15,6 +15,7 @@ Example response (search for "0x"):
 """
 
 import itertools
+import time
 from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any
@@ -27,16 +28,23 @@ import requests
 from loguru import logger
 from tqdm import tqdm
 
+from coin_profitability_scraper.run_metrics import bind_current_step, metered_step
+from coin_profitability_scraper.util import (
+    record_http_response_metrics,
+    record_http_retry,
+)
+
 step_1c_output_folder = Path("./out/minerstat/") / Path(__file__).stem
 
 
 @backoff.on_exception(
     backoff.expo,
     (requests.exceptions.RequestException,),
-    on_backoff=lambda details: logger.debug(f"Backing off: {details}"),
+    on_backoff=record_http_retry,
     max_tries=5,
 )
 def _fetch_coins_for_search(search_term: str) -> list[dict[str, Any]]:
+    start_time = time.perf_counter()
     response = requests.post(
         "https://minerstat.com/coins",
         # Didn't work - data={"search": search_term},
@@ -57,6 +65,9 @@ def _fetch_coins_for_search(search_term: str) -> list[dict[str, Any]]:
         },
         timeout=15,
     )
+    record_http_response_metrics(
+        response, elapsed_seconds=time.perf_counter() - start_time
+    )
     response.raise_for_status()
 
     if response.content in {b"", b"null"}:
@@ -80,7 +91,7 @@ def _search_all_coins(max_workers: int = 32) -> list[dict[str, Any]]:
 
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
         for result in tqdm(
-            executor.map(_fetch_coins_for_search, search_terms),
+            executor.map(bind_current_step(_fetch_coins_for_search), search_terms),
             total=len(search_terms),
         ):
             coin_list.extend(result)
@@ -92,6 +103,7 @@ def _search_all_coins(max_workers: int = 32) -> list[dict[str, Any]]:
     return coin_list
 
 
+@metered_step
 def main() -> None:
     """Generate a report summarizing the parsed coin data."""
     logger.info(f"Starting {Path(__file__).name} main()")
@@ -9,11 +9,13 @@ from tqdm import tqdm
 from coin_profitability_scraper.minerstat.step_1a_algo_list import (
     step_1a_output_folder_path,
 )
+from coin_profitability_scraper.run_metrics import metered_step
 from coin_profitability_scraper.util import download_as_bytes
 
 step_2a_output_folder_path = Path("./out/minerstat/") / Path(__file__).stem
 
 
+@metered_step
 def main() -> None:
     """Scrape each algorithm page from Minerstat."""
     logger.info(f"Starting {Path(__file__).name} main()")
@@ -9,11 +9,13 @@ from tqdm import tqdm
 from coin_profitability_scraper.minerstat.step_1c_coin_list_from_searching import (
     step_1c_output_folder,
 )
+from coin_profitability_scraper.run_metrics import metered_step
 from coin_profitability_scraper.util import download_as_bytes
 
 step_2b_output_folder_path = Path("./out/minerstat/") / Path(__file__).stem
 
 
+@metered_step
 def main() -> None:
     """Scrape each coin page from Minerstat.
 
@@ -10,11 +10,15 @@ from loguru import logger
 from tqdm import tqdm
 
 from coin_profitability_scraper.data_util import pl_df_all_common_str_cleaning
+from coin_profitability_scraper.dy_util import write_validated_parquet
 from coin_profitability_scraper.minerstat.step_2b_scrape_each_coin_page import (
     step_2b_output_folder_path,
 )
+from coin_profitability_scraper.run_metrics import metered_step
+from coin_profitability_scraper.step_cache import cached_step
 
 step_3b_output_folder = Path("./out/minerstat/") / Path(__file__).stem
+output_parquet_path = step_3b_output_folder / "minerstat_coins.parquet"
 
 _default_string_kwargs: dict[Literal["min_length", "max_length"], int] = {
     "min_length": 1,
@@ -94,6 +98,8 @@ def _ingest_coin_page(html_content: str, *, coin_slug: str) -> dict[str, Any]:
     } | {"reported_" + k: v for k, v in _extract_key_value_pairs(soup=soup).items()}
 
 
+@metered_step
+@cached_step(inputs=[step_2b_output_folder_path], outputs=[output_parquet_path])
 def main() -> None:
     """Ingest each coin page from Minerstat."""
     logger.info(f"Starting {Path(__file__).name} main()")
@@ -127,7 +133,7 @@ def main() -> None:
     df = DySchemaMinerstatCoins.validate(df, cast=True)
 
     step_3b_output_folder.mkdir(parents=True, exist_ok=True)
-    df.write_parquet(step_3b_output_folder / "minerstat_coins.parquet")
+    write_validated_parquet(df, DySchemaMinerstatCoins, output_parquet_path)
 
     logger.info(f"Finished {Path(__file__).name} main(). Final shape: {df.shape}")
 
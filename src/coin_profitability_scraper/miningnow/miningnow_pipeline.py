@@ -7,6 +7,7 @@ from coin_profitability_scraper.miningnow import (
     step_2b_algo_list,
     step_2c_asic_list,
 )
+from coin_profitability_scraper.run_metrics import collect_run_metrics
 
 
 def main_miningnow_pipeline() -> None:
@@ -22,4 +23,5 @@ def main_miningnow_pipeline() -> None:
 
 
 if __name__ == "__main__":
-    main_miningnow_pipeline()
+    with collect_run_metrics("miningnow_pipeline"):
+        main_miningnow_pipeline()
@@ -14,6 +14,7 @@ from bs4 import BeautifulSoup
 from loguru import logger
 from tqdm import tqdm
 
+from coin_profitability_scraper.run_metrics import metered_step
 from coin_profitability_scraper.util import download_as_bytes
 
 miningnow_step1_output_path = Path("./out/miningnow/") / Path(__file__).stem
@@ -152,6 +153,7 @@ def _scrape_and_parse_lists_from_page(
     logger.success(f"{page_name.capitalize()} list scraping completed.")
 
 
+@metered_step
 def main() -> None:
     """Scrape and parse all lists on all pages."""
     miningnow_step1_output_path.mkdir(parents=True, exist_ok=True)
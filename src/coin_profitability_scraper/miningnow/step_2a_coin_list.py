@@ -8,9 +8,13 @@ import polars as pl
 from loguru import logger
 
 from coin_profitability_scraper.data_util import pl_df_all_common_str_cleaning
+from coin_profitability_scraper.dy_util import write_validated_parquet
+from coin_profitability_scraper.float_change_rules import float_change_rule
 from coin_profitability_scraper.miningnow.step_1_scrape_data import (
     miningnow_step1_output_path,
 )
+from coin_profitability_scraper.run_metrics import metered_step
+from coin_profitability_scraper.step_cache import cached_step
 
 output_parquet_path = Path("./out/miningnow/") / "miningnow_coins.parquet"
 
@@ -25,10 +29,12 @@ class DySchemaMiningnowCoins(dy.Schema):
     ticker = dy.String(nullable=False, min_length=1, max_length=50)
     reported_founded = dy.String(nullable=True, min_length=1, max_length=100)
     algorithm = dy.String(nullable=True, min_length=1, max_length=100)
-    price_usd = dy.Float(nullable=True)
+    price_usd = dy.Float(nullable=True, metadata=float_change_rule(rel_tolerance=0.01))
     market_cap_usd = dy.UInt64(nullable=True)
     volume_usd = dy.UInt64(nullable=True)
-    change_24h = dy.Float64(nullable=True)
+    change_24h = dy.Float64(
+        nullable=True, metadata=float_change_rule(abs_tolerance=0.5)
+    )
     founded_date = dy.Date(nullable=True)
     chart_svg_url = dy.String(nullable=True, min_length=25, max_length=1000)
     chart_json_url = dy.String(nullable=True, min_length=25, max_length=1000)
@@ -82,6 +88,11 @@ def _fetch_coins_data_json_df() -> pl.DataFrame:
     return df
 
 
+@metered_step
+@cached_step(
+    inputs=[miningnow_step1_output_path / "coins_data.json"],
+    outputs=[output_parquet_path],
+)
 def main() -> None:
     """Prepare coin list from MiningNow.com."""
     output_parquet_path.parent.mkdir(parents=True, exist_ok=True)
@@ -93,7 +104,7 @@ def main() -> None:
 
     df = DySchemaMiningnowCoins.validate(df, cast=True)
 
-    df.write_parquet(output_parquet_path)
+    write_validated_parquet(df, DySchemaMiningnowCoins, output_parquet_path)
     logger.info(f"Wrote coin list: {df.shape}")
 
 
@@ -8,9 +8,12 @@ import polars as pl
 from loguru import logger
 
 from coin_profitability_scraper.data_util import pl_df_all_common_str_cleaning
+from coin_profitability_scraper.dy_util import write_validated_parquet
 from coin_profitability_scraper.miningnow.step_1_scrape_data import (
     miningnow_step1_output_path,
 )
+from coin_profitability_scraper.run_metrics import metered_step
+from coin_profitability_scraper.step_cache import cached_step
 
 output_parquet_path = Path("./out/miningnow/") / "miningnow_algorithms.parquet"
 
@@ -44,6 +47,11 @@ def _fetch_algos_data_json_df() -> pl.DataFrame:
     return df
 
 
+@metered_step
+@cached_step(
+    inputs=[miningnow_step1_output_path / "algos_data.json"],
+    outputs=[output_parquet_path],
+)
 def main() -> None:
     """Prepare algorithms list from MiningNow.com."""
     output_parquet_path.parent.mkdir(parents=True, exist_ok=True)
@@ -53,7 +61,7 @@ def main() -> None:
 
     df = DySchemaMiningnowAlgorithms.validate(df, cast=True)
 
-    df.write_parquet(output_parquet_path)
+    write_validated_parquet(df, DySchemaMiningnowAlgorithms, output_parquet_path)
     logger.info(f"Wrote algorithm list: {df.shape}")
 
 
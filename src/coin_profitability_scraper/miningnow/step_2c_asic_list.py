@@ -8,9 +8,13 @@ import polars as pl
 from loguru import logger
 
 from coin_profitability_scraper.data_util import pl_df_all_common_str_cleaning
+from coin_profitability_scraper.dy_util import write_validated_parquet
+from coin_profitability_scraper.float_change_rules import float_change_rule
 from coin_profitability_scraper.miningnow.step_1_scrape_data import (
     miningnow_step1_output_path,
 )
+from coin_profitability_scraper.run_metrics import metered_step
+from coin_profitability_scraper.step_cache import cached_step
 
 output_parquet_path = Path("./out/miningnow/") / "miningnow_asics.parquet"
 
@@ -32,10 +36,10 @@ class DySchemaMiningnowAsics(dy.Schema):
     title = dy.String(nullable=True, min_length=1, max_length=200)
     description = dy.String(nullable=True, min_length=1, max_length=1000)
     algo_id = dy.String(nullable=True, min_length=1, max_length=200)
-    hash_rate = dy.Float64(nullable=True)
+    hash_rate = dy.Float64(nullable=True, metadata=float_change_rule(decimals=3))
     hash_rate_type_id = dy.String(nullable=True, min_length=1, max_length=200)
-    power_watts = dy.Float64(nullable=True)
-    weight_kg = dy.Float64(nullable=True)
+    power_watts = dy.Float64(nullable=True, metadata=float_change_rule(decimals=3))
+    weight_kg = dy.Float64(nullable=True, metadata=float_change_rule(decimals=3))
     announcement_date = dy.String(nullable=True, min_length=1, max_length=200)
     launch_date = dy.String(nullable=True, min_length=1, max_length=200)
     price_index_enable = dy.Bool(nullable=True)
@@ -43,8 +47,10 @@ class DySchemaMiningnowAsics(dy.Schema):
     reported_updated_at = dy.String(nullable=True, min_length=1, max_length=200)
     note = dy.String(nullable=True, min_length=1, max_length=200)
     cooling = dy.String(nullable=True, min_length=1, max_length=200)
-    best_price_usd = dy.Float64(nullable=True)
-    efficiency_value = dy.Float64(nullable=True)
+    best_price_usd = dy.Float64(
+        nullable=True, metadata=float_change_rule(rel_tolerance=0.01)
+    )
+    efficiency_value = dy.Float64(nullable=True, metadata=float_change_rule(decimals=3))
     efficiency_unit = dy.String(nullable=True, min_length=1, max_length=200)
 
     # Images.
@@ -111,6 +117,11 @@ def _fetch_products_data_json_df() -> pl.DataFrame:
     return df
 
 
+@metered_step
+@cached_step(
+    inputs=[miningnow_step1_output_path / "products_data.json"],
+    outputs=[output_parquet_path],
+)
 def main() -> None:
     """Prepare asic list from MiningNow.com."""
     output_parquet_path.parent.mkdir(parents=True, exist_ok=True)
@@ -120,7 +131,7 @@ def main() -> None:
 
     df = DySchemaMiningnowAsics.validate(df, cast=True)
 
-    df.write_parquet(output_parquet_path)
+    write_validated_parquet(df, DySchemaMiningnowAsics, output_parquet_path)
     logger.info(f"Wrote asic list: {df.shape}")
 
 
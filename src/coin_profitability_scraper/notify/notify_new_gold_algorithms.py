@@ -3,27 +3,31 @@
 import argparse
 import os
 import time
+from datetime import datetime
 from pathlib import Path
-from typing import Literal
 
 import arrow
 import dataframely as dy
 import polars as pl
-import requests
 from loguru import logger
 
 from coin_profitability_scraper import is_dry_run
+from coin_profitability_scraper.dolt_reader import read_dolt_tables
 from coin_profitability_scraper.dolt_updater import DoltDatabaseUpdater
 from coin_profitability_scraper.dolt_util import DOLT_REPO_URL
+from coin_profitability_scraper.dy_util import write_validated_parquet
+from coin_profitability_scraper.notify.ntfy_dispatcher import NtfyDispatcher
 
 NTFY_URL = "https://ntfy.sh/{topic_name}"
 
+# New algorithms with their own message (after the intro message).
+MAX_NEW_ALGORITHM_NOTIFICATIONS = 5
+
 store_folder = Path(__file__).parent / "out"
 preview_folder = store_folder / "preview"
+ntfy_outbox_path = store_folder / "ntfy_outbox.json"
 preview_folder.mkdir(exist_ok=True, parents=True)
 
-logger.add(store_folder / "app.log", rotation="10 MB")
-
 
 class DySchemaNotifyLogNewAlgorithms(dy.Schema):
     """Schema `notify_log_new_algorithms` table."""
@@ -33,32 +37,27 @@ class DySchemaNotifyLogNewAlgorithms(dy.Schema):
     )
 
 
-def fetch_table_by_name(table_name: Literal["gold_algorithms"]) -> pl.DataFrame:
-    """Fetch a table by its name from the DoltHub repository."""
-    res = requests.get(
-        f"https://www.dolthub.com/csv/recranger/cryptocurrency-coin-algo-data/main/{table_name}",
-        timeout=30,
-    )
-    res.raise_for_status()
-    return pl.read_csv(res.content)
-
-
 def notify_new_algorithms(df: pl.DataFrame) -> None:
     """Send a notification via ntfy.sh about newly discovered algorithms."""
-    max_notifications = 5
+    max_notifications = MAX_NEW_ALGORITHM_NOTIFICATIONS
     if df.is_empty():
         logger.info(f"No new algorithms to notify. Shape: {df.shape}")
         return
 
+    # Keyed by idempotency key, so that the same algorithms are only notified once.
+    messages: dict[str, str] = {}
+
     intro_message = f"🧠 Detected {len(df)} new algorithms! See following messages!"
     if df.height > max_notifications:
         intro_message += f" (only showing first {max_notifications} of {df.height})"
-    send_ntfy_notification(intro_message)
+    messages[f"new-algorithms:{','.join(sorted(df['algo_name']))}"] = intro_message
     del intro_message
 
     indent4 = " " * 4
 
-    for idx, row in enumerate(df.head(5).iter_rows(named=True), start=1):
+    for idx, row in enumerate(
+        df.head(max_notifications).iter_rows(named=True), start=1
+    ):
         message = f"🧠 New algorithm (#{idx}/{df.height}): ✨ {row['algo_name']} ✨\n"
         message += f"{indent4}- Tracked since {row['duration_since_algo_created']}.\n"
         if row.get("asic_count"):
@@ -79,26 +78,33 @@ def notify_new_algorithms(df: pl.DataFrame) -> None:
                 else:
                     message += f"{indent4}- {key}: {val}\n"
 
-        send_ntfy_notification(message)
+        messages[f"new-algorithm:{row['algo_name']}"] = message
 
+    send_ntfy_notifications(messages)
 
-def send_ntfy_notification(message: str) -> None:
-    """Send a notification via ntfy.sh."""
-    logger.debug(f"Notification message ({len(message):,} bytes):\n{message}")
+
+def send_ntfy_notifications(messages: dict[str, str]) -> None:
+    """Send notifications via ntfy.sh, through the persistent outbox.
+
+    Args:
+        messages: Messages, keyed by idempotency key (see `NtfyDispatcher`).
+
+    """
+    for message in messages.values():
+        logger.debug(f"Notification message ({len(message):,} bytes):\n{message}")
     if is_dry_run():
         logger.info("Dry run mode: not sending notification.")
         return
 
-    try:
-        res = requests.post(
-            NTFY_URL.format(topic_name=os.environ["NTFY_TOPIC_NAME"]),
-            data=message.encode(),
-            timeout=25,
-        )
-        res.raise_for_status()
-        logger.info(f"Notification sent: {res.status_code}. {len(message):,} bytes.")
-    except Exception as e:  # noqa: BLE001
-        logger.error(f"Failed to send notification: {e}")
+    dispatcher = NtfyDispatcher(
+        NTFY_URL.format(topic_name=os.environ["NTFY_TOPIC_NAME"]),
+        outbox_path=ntfy_outbox_path,
+        # The intro and each new algorithm's message are sent individually.
+        max_individual_messages=MAX_NEW_ALGORITHM_NOTIFICATIONS + 1,
+    )
+    for idempotency_key, message in messages.items():
+        dispatcher.enqueue(message, idempotency_key=idempotency_key)
+    dispatcher.flush()  # Also sends the messages left over by earlier runs.
 
 
 def _transform_gold_algorithms_df(df: pl.DataFrame) -> pl.DataFrame:
@@ -134,12 +140,9 @@ def check_and_send_notifications() -> None:
     Main function to call in a loop.
     """
     logger.info("Starting data fetch...")
-    with DoltDatabaseUpdater(DOLT_REPO_URL) as dolt:
-        df = dolt.read_table_to_polars("gold_algorithms")
-        df_known_algos = dolt.read_table_to_polars("notify_log_new_algorithms")
-
-    assert isinstance(df, pl.DataFrame)  # pyright: ignore[reportPossiblyUnboundVariable]
-    assert isinstance(df_known_algos, pl.DataFrame)  # pyright: ignore[reportPossiblyUnboundVariable]
+    tables = read_dolt_tables(("gold_algorithms", "notify_log_new_algorithms"))
+    df = tables["gold_algorithms"]
+    df_known_algos = tables["notify_log_new_algorithms"]
 
     df = _transform_gold_algorithms_df(df)
 
@@ -150,22 +153,44 @@ def check_and_send_notifications() -> None:
     # Load previously known algorithms.
     known_algos: set[str] = set(df_known_algos["algo_name"].unique().to_list())
 
+    _notify_and_store_algorithms(
+        df_newest_algos,
+        known_algos=known_algos,
+        current_algos=set(df["algo_name"].to_list()),
+    )
+
+
+def _notify_and_store_algorithms(
+    df_candidates: pl.DataFrame, *, known_algos: set[str], current_algos: set[str]
+) -> None:
+    """Notify about the candidate algorithms not known yet, and store the current ones.
+
+    Args:
+        df_candidates: Transformed rows of the algorithms which may be new, newest
+            first (see `_transform_gold_algorithms_df()`).
+        known_algos: Algorithms already notified about.
+        current_algos: All algorithms currently in `gold_algorithms`.
+
+    """
     # Detect new algorithms.
-    current_algos = set(df["algo_name"].to_list())
-    new_algos = sorted(current_algos - known_algos)
+    new_algos = sorted(set(df_candidates["algo_name"].to_list()) - known_algos)
 
     if new_algos:
         logger.info(f"Detected {len(new_algos)} new algorithms: {new_algos}")
         notify_new_algorithms(
-            df_newest_algos.filter(pl.col("algo_name").is_in(new_algos))
+            df_candidates.filter(pl.col("algo_name").is_in(new_algos))
         )
     else:
         logger.info("No new algorithms detected.")
 
     # Save the full current list for future runs.
-    df = df.select("algo_name")
+    df = pl.DataFrame({"algo_name": sorted(current_algos)})
     df = DySchemaNotifyLogNewAlgorithms.validate(df, cast=True)
-    df.write_parquet(store_folder / "notify_log_new_algorithms.parquet")
+    write_validated_parquet(
+        df,
+        DySchemaNotifyLogNewAlgorithms,
+        store_folder / "notify_log_new_algorithms.parquet",
+    )
     logger.info("Stored updated algorithm list.")
 
     # Call the dolt pushing tool.
@@ -176,10 +201,107 @@ def check_and_send_notifications() -> None:
     dolt_write_main(("notify_log_new_algorithms",))
 
 
+def _get_last_gold_commit(dolt: DoltDatabaseUpdater) -> tuple[str, datetime] | None:
+    """Get the hash and date of the last commit which changed `gold_algorithms`."""
+    df = dolt.read_query_to_polars(
+        "SELECT commit_hash, date FROM dolt_diff "
+        "WHERE table_name = 'gold_algorithms' ORDER BY date DESC LIMIT 1"
+    )
+    if df.is_empty():
+        return None
+    return (str(df["commit_hash"][0]), df["date"][0])
+
+
+def select_added_rows(df_diff: pl.DataFrame) -> pl.DataFrame:
+    """Get the latest added version of each row, from `dolt_diff_<table>` rows.
+
+    Has unit test.
+    """
+    to_columns = [
+        col
+        for col in df_diff.columns
+        if col.startswith("to_") and col not in {"to_commit", "to_commit_date"}
+    ]
+    return (
+        df_diff.filter(pl.col("diff_type") == "added")
+        .sort("to_commit_date", descending=True, maintain_order=True)
+        .unique("to_algo_name", keep="first", maintain_order=True)
+        .select(to_columns)
+        .rename({col: col.removeprefix("to_") for col in to_columns})
+    )
+
+
+def _check_added_gold_algorithms(
+    dolt: DoltDatabaseUpdater, *, since: datetime | None
+) -> None:
+    """Notify about the algorithms added to `gold_algorithms` in commits after `since`.
+
+    Only reads the added rows (from `dolt_diff_gold_algorithms`), and the names of the
+    current and known algorithms.
+    """
+    df_diff = dolt.read_query_to_polars(
+        "SELECT * FROM dolt_diff_gold_algorithms "
+        "WHERE diff_type = 'added' AND to_commit != 'WORKING' "
+        "AND (:since IS NULL OR to_commit_date > :since)",
+        {"since": since},
+    )
+    current_algos = set(
+        dolt.read_query_to_polars("SELECT algo_name FROM gold_algorithms")[
+            "algo_name"
+        ].to_list()
+    )
+    known_algos = set(
+        dolt.read_query_to_polars("SELECT algo_name FROM notify_log_new_algorithms")[
+            "algo_name"
+        ].to_list()
+    )
+    df_added = _transform_gold_algorithms_df(
+        select_added_rows(df_diff).filter(pl.col("algo_name").is_in(current_algos))
+    ).sort("created_at", descending=True)
+    _notify_and_store_algorithms(
+        df_added, known_algos=known_algos, current_algos=current_algos
+    )
+
+
+def watch_and_send_notifications(*, poll_interval_seconds: float) -> None:
+    """Poll for new algorithms in one live Dolt session, and send notifications.
+
+    Each poll only fetches, and compares commit hashes. `gold_algorithms` is only
+    read (as its added rows) when the last commit changing it is new. On an error,
+    the session is restarted, with a full check to catch up.
+    """
+    while True:
+        try:
+            with DoltDatabaseUpdater(DOLT_REPO_URL, use_shallow_clone=False) as dolt:
+                last_gold_commit = _get_last_gold_commit(dolt)
+                check_and_send_notifications()  # Catch up with the session's start.
+
+                while True:
+                    time.sleep(poll_interval_seconds)
+                    if not dolt.fetch_and_fast_forward():
+                        logger.debug("No new Dolt commits.")
+                        continue
+
+                    gold_commit = _get_last_gold_commit(dolt)
+                    if gold_commit is None or gold_commit == last_gold_commit:
+                        logger.debug("New Dolt commits, but gold_algorithms unchanged.")
+                        continue
+
+                    logger.info(f"gold_algorithms changed in commit {gold_commit[0]}.")
+                    _check_added_gold_algorithms(
+                        dolt,
+                        since=last_gold_commit[1] if last_gold_commit else None,
+                    )
+                    last_gold_commit = gold_commit
+        except Exception as e:  # noqa: BLE001
+            logger.error(f"Error during watch: {e}. Restarting the Dolt session.")
+            time.sleep(poll_interval_seconds)
+
+
 def main() -> None:
     """Run main entry point."""
     parser = argparse.ArgumentParser(
-        description="Check and send notifications (once or as a daemon)."
+        description="Check and send notifications (once, as a daemon, or watching)."
     )
     parser.add_argument(
         "-d",
@@ -187,9 +309,25 @@ def main() -> None:
         action="store_true",
         help="Run continuously in a loop instead of once.",
     )
+    parser.add_argument(
+        "-w",
+        "--watch",
+        action="store_true",
+        help="Run continuously, polling a live Dolt session for new commits.",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=60,
+        help="Seconds between polls in watch mode (default: 60).",
+    )
     args = parser.parse_args()
 
-    if args.daemon:
+    logger.add(store_folder / "app.log", rotation="10 MB")
+
+    if args.watch:
+        watch_and_send_notifications(poll_interval_seconds=args.poll_interval)
+    elif args.daemon:
         while True:
             try:
                 check_and_send_notifications()
@@ -0,0 +1,232 @@
+"""Dispatcher for ntfy notifications, with a persistent outbox.
+
+Messages are first written to an outbox file, then sent concurrently. A message is
+only removed from the pending messages once ntfy accepted it, so a crashed or failed
+send is retried on the next flush (also by the next process). Each message has an
+idempotency key: enqueueing a key which is already pending or was sent recently is
+a no-op, so that re-detecting the same event after a crash doesn't notify twice.
+
+Bursts (more than `max_individual_messages` pending messages at a flush) are
+coalesced into digest messages, each within ntfy's message size limit.
+"""
+
+import asyncio
+import hashlib
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+import backoff
+import orjson
+import requests
+from loguru import logger
+
+from coin_profitability_scraper.util import record_http_retry
+
+# ntfy turns longer messages into attachments.
+NTFY_MAX_MESSAGE_BYTES = 4096
+
+_DIGEST_SEPARATOR = "\n\n---\n\n"
+
+
+@dataclass(kw_only=True)
+class OutboxMessage:
+    """A notification in the outbox."""
+
+    idempotency_key: str
+    message: str
+    title: str | None = None
+    enqueued_at: str  # ISO format.
+    attempts: int = 0  # Flushes which tried to send it (each with retries).
+    sent_at: str | None = None  # ISO format. None while pending.
+
+
+class NtfyDispatcher:
+    """Enqueue notifications to a persistent outbox, and flush them to ntfy."""
+
+    def __init__(  # noqa: PLR0913
+        self,
+        topic_url: str,
+        *,
+        outbox_path: Path,
+        max_individual_messages: int = 3,
+        max_concurrent_sends: int = 4,
+        max_tries: int = 5,
+        backoff_factor: float = 1.0,
+        sent_retention: timedelta = timedelta(days=30),
+    ) -> None:
+        """Initialize the dispatcher, and load the outbox.
+
+        Args:
+            topic_url: URL of the ntfy topic (e.g., `https://ntfy.sh/<topic>`).
+            outbox_path: JSON file of the pending and recently-sent messages.
+            max_individual_messages: Above this many pending messages, a flush
+                coalesces them into digest messages.
+            max_concurrent_sends: Number of messages sent at the same time.
+            max_tries: Tries per message and flush. Messages which still fail stay
+                pending, for the next flush.
+            backoff_factor: Base delay (in seconds) of the exponential backoff.
+            sent_retention: How long sent messages are kept, to ignore duplicates.
+
+        """
+        self.topic_url: str = topic_url
+        self.outbox_path: Path = outbox_path
+        self.max_individual_messages: int = max_individual_messages
+        self.max_concurrent_sends: int = max_concurrent_sends
+        self.max_tries: int = max_tries
+        self.backoff_factor: float = backoff_factor
+        self.sent_retention: timedelta = sent_retention
+
+        self._messages: list[OutboxMessage] = []
+        if outbox_path.is_file():
+            self._messages = [
+                OutboxMessage(**item)
+                for item in orjson.loads(outbox_path.read_bytes())["messages"]
+            ]
+
+    def _save(self) -> None:
+        """Write the outbox atomically, without the sent messages past retention."""
+        min_sent_at = (datetime.now(UTC) - self.sent_retention).isoformat()
+        self._messages = [
+            m for m in self._messages if m.sent_at is None or m.sent_at >= min_sent_at
+        ]
+        self.outbox_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.outbox_path.with_suffix(".tmp")
+        tmp_path.write_bytes(
+            orjson.dumps(
+                {"messages": [asdict(m) for m in self._messages]},
+                option=orjson.OPT_INDENT_2,
+            )
+        )
+        tmp_path.replace(self.outbox_path)
+
+    def get_pending_messages(self) -> list[OutboxMessage]:
+        """Get the messages not sent yet, oldest first."""
+        return [m for m in self._messages if m.sent_at is None]
+
+    def enqueue(
+        self,
+        message: str,
+        *,
+        idempotency_key: str | None = None,
+        title: str | None = None,
+    ) -> bool:
+        """Add a message to the outbox (without sending it).
+
+        Args:
+            message: Message body.
+            idempotency_key: Key of the event being notified about (e.g.,
+                `new-algorithm:<name>`). Defaults to a hash of the message.
+            title: Optional title of the notification.
+
+        Returns:
+            False if a message with this key is already pending or was sent.
+
+        """
+        if idempotency_key is None:
+            idempotency_key = hashlib.sha256(message.encode()).hexdigest()
+        if any(m.idempotency_key == idempotency_key for m in self._messages):
+            logger.info(f"Skipping duplicate notification: {idempotency_key}")
+            return False
+
+        self._messages.append(
+            OutboxMessage(
+                idempotency_key=idempotency_key,
+                message=message,
+                title=title,
+                enqueued_at=datetime.now(UTC).isoformat(),
+            )
+        )
+        self._save()
+        return True
+
+    def flush(self) -> int:
+        """Send all pending messages (coalescing bursts). Returns the number sent.
+
+        Has unit test.
+        """
+        return asyncio.run(self._flush_async())
+
+    async def _flush_async(self) -> int:
+        pending = self.get_pending_messages()
+        if not pending:
+            return 0
+
+        batches = (
+            [[m] for m in pending]
+            if len(pending) <= self.max_individual_messages
+            else _group_into_digests(pending)
+        )
+        semaphore = asyncio.Semaphore(self.max_concurrent_sends)
+        results = await asyncio.gather(
+            *(self._send_batch(batch, semaphore) for batch in batches)
+        )
+        sent_count = sum(len(b) for b, ok in zip(batches, results, strict=True) if ok)
+        if sent_count < len(pending):
+            logger.error(
+                f"{len(pending) - sent_count} notifications could not be sent. "
+                "They stay in the outbox for the next flush."
+            )
+        return sent_count
+
+    async def _send_batch(
+        self, batch: list[OutboxMessage], semaphore: asyncio.Semaphore
+    ) -> bool:
+        """Send one message (or one digest of several messages), with retries."""
+        if len(batch) == 1:
+            (title, message) = (batch[0].title, batch[0].message)
+        else:
+            title = f"{len(batch)} notifications"
+            message = _DIGEST_SEPARATOR.join(m.message for m in batch)
+
+        send_with_retries = backoff.on_exception(
+            backoff.expo,
+            requests.exceptions.RequestException,
+            max_tries=self.max_tries,
+            factor=self.backoff_factor,
+            on_backoff=record_http_retry,
+        )(self._post)
+
+        async with semaphore:
+            try:
+                await send_with_retries(message, title)
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Failed to send notification: {e}")
+                success = False
+            else:
+                success = True
+
+        # Recorded after each send, so that a crash doesn't lose the progress.
+        sent_at = datetime.now(UTC).isoformat()
+        for m in batch:
+            m.attempts += 1
+            if success:
+                m.sent_at = sent_at
+        self._save()
+        return success
+
+    async def _post(self, message: str, title: str | None) -> None:
+        headers = {"Title": title.encode()} if title else {}
+        res = await asyncio.to_thread(
+            requests.post,
+            self.topic_url,
+            data=message.encode(),
+            headers=headers,
+            timeout=25,
+        )
+        res.raise_for_status()
+        logger.info(f"Notification sent: {res.status_code}. {len(message):,} bytes.")
+
+
+def _group_into_digests(messages: list[OutboxMessage]) -> list[list[OutboxMessage]]:
+    """Group messages (in order) into digests within ntfy's message size limit."""
+    digests: list[list[OutboxMessage]] = []
+    digest_bytes = 0
+    for m in messages:
+        message_bytes = len(m.message.encode()) + len(_DIGEST_SEPARATOR)
+        if not digests or digest_bytes + message_bytes > NTFY_MAX_MESSAGE_BYTES:
+            digests.append([])
+            digest_bytes = 0
+        digests[-1].append(m)
+        digest_bytes += message_bytes
+    return digests
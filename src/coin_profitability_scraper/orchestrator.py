@@ -0,0 +1,298 @@
+"""Run all pipelines in one process, running independent steps concurrently.
+
+Steps form a dependency graph (DAG). A step starts once all its dependencies have
+succeeded and a slot of its resource type (network or CPU) is free. Steps whose
+dependencies failed are skipped.
+
+After all bronze (per-source) steps, the Dolt write of all successful sources runs as
+a single fan-in, followed by the reports pipeline.
+"""
+
+import graphlib
+from collections import Counter
+from collections.abc import Callable, Mapping, Sequence
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Literal
+
+from loguru import logger
+
+from coin_profitability_scraper import step_9_dolt_write
+from coin_profitability_scraper.crypto51 import step_1_scrape_main_page
+from coin_profitability_scraper.crypto_slate import (
+    step_1_scrape,
+    step_2_parse_scrape,
+    step_3_algo_report,
+)
+from coin_profitability_scraper.cryptodelver import (
+    step_1_scrape_coins_lists,
+    step_3_ingest_coins_lists,
+)
+from coin_profitability_scraper.minerstat import (
+    step_1a_algo_list,
+    step_1c_coin_list_from_searching,
+    step_2a_scrape_each_algo_page,
+    step_2b_scrape_each_coin_page,
+    step_3b_ingest_each_coin_page,
+)
+from coin_profitability_scraper.miningnow import (
+    step_1_scrape_data,
+    step_2a_coin_list,
+    step_2b_algo_list,
+    step_2c_asic_list,
+)
+from coin_profitability_scraper.reports.reports_pipeline import main_reports_pipeline
+from coin_profitability_scraper.run_metrics import collect_run_metrics
+from coin_profitability_scraper.tables import TableNameLiteral
+from coin_profitability_scraper.whattomine import (
+    step_1_api_fetch,
+    step_2_ingest_coins_api,
+    step_3_ingest_miners_apis,
+)
+
+StepResourceLiteral = Literal["network", "cpu"]
+StepStatusLiteral = Literal["succeeded", "failed", "skipped"]
+
+
+@dataclass(frozen=True, kw_only=True)
+class PipelineStep:
+    """A single step of a pipeline, as a node in the dependency graph."""
+
+    name: str
+    func: Callable[[], object]
+    resource: StepResourceLiteral
+    depends_on: tuple[str, ...] = ()
+
+
+DEFAULT_RESOURCE_SLOTS: dict[StepResourceLiteral, int] = {"network": 6, "cpu": 2}
+
+# The steps of the enabled per-source pipelines (e.g., not wheretomine, which shut
+# down in 2026-05).
+BRONZE_STEPS: tuple[PipelineStep, ...] = (
+    PipelineStep(
+        name="crypto51.step_1", func=step_1_scrape_main_page.main, resource="network"
+    ),
+    PipelineStep(
+        name="crypto_slate.step_1", func=step_1_scrape.main, resource="network"
+    ),
+    PipelineStep(
+        name="crypto_slate.step_2",
+        func=step_2_parse_scrape.main,
+        resource="cpu",
+        depends_on=("crypto_slate.step_1",),
+    ),
+    PipelineStep(
+        name="crypto_slate.step_3",
+        func=step_3_algo_report.main,
+        resource="cpu",
+        depends_on=("crypto_slate.step_2",),
+    ),
+    PipelineStep(
+        name="cryptodelver.step_1",
+        func=step_1_scrape_coins_lists.main,
+        resource="network",
+    ),
+    PipelineStep(
+        name="cryptodelver.step_3",
+        func=step_3_ingest_coins_lists.main,
+        resource="cpu",
+        depends_on=("cryptodelver.step_1",),
+    ),
+    PipelineStep(
+        name="minerstat.step_1a", func=step_1a_algo_list.main, resource="network"
+    ),
+    PipelineStep(
+        name="minerstat.step_1c",
+        func=step_1c_coin_list_from_searching.main,
+        resource="network",
+    ),
+    PipelineStep(
+        name="minerstat.step_2a",
+        func=step_2a_scrape_each_algo_page.main,
+        resource="network",
+        depends_on=("minerstat.step_1a",),
+    ),
+    PipelineStep(
+        name="minerstat.step_2b",
+        func=step_2b_scrape_each_coin_page.main,
+        resource="network",
+        depends_on=("minerstat.step_1c",),
+    ),
+    PipelineStep(
+        name="minerstat.step_3b",
+        func=step_3b_ingest_each_coin_page.main,
+        resource="cpu",
+        depends_on=("minerstat.step_2b",),
+    ),
+    PipelineStep(
+        name="miningnow.step_1", func=step_1_scrape_data.main, resource="network"
+    ),
+    PipelineStep(
+        name="miningnow.step_2a",
+        func=step_2a_coin_list.main,
+        resource="cpu",
+        depends_on=("miningnow.step_1",),
+    ),
+    PipelineStep(
+        name="miningnow.step_2b",
+        func=step_2b_algo_list.main,
+        resource="cpu",
+        depends_on=("miningnow.step_1",),
+    ),
+    PipelineStep(
+        name="miningnow.step_2c",
+        func=step_2c_asic_list.main,
+        resource="cpu",
+        depends_on=("miningnow.step_1",),
+    ),
+    PipelineStep(
+        name="whattomine.step_1", func=step_1_api_fetch.main, resource="network"
+    ),
+    PipelineStep(
+        name="whattomine.step_2",
+        func=step_2_ingest_coins_api.main,
+        resource="cpu",
+        depends_on=("whattomine.step_1",),
+    ),
+    PipelineStep(
+        name="whattomine.step_3",
+        func=step_3_ingest_miners_apis.main,
+        resource="cpu",
+        depends_on=("whattomine.step_1",),
+    ),
+)
+
+# The step which produces each bronze table (written to Dolt if it succeeded).
+BRONZE_TABLE_TO_STEP_NAME: dict[TableNameLiteral, str] = {
+    "crypto51_coins": "crypto51.step_1",
+    "cryptoslate_coins": "crypto_slate.step_2",
+    "cryptodelver_coins": "cryptodelver.step_3",
+    "minerstat_coins": "minerstat.step_3b",
+    "miningnow_coins": "miningnow.step_2a",
+    "miningnow_algorithms": "miningnow.step_2b",
+    "miningnow_asics": "miningnow.step_2c",
+    "whattomine_coins": "whattomine.step_2",
+    "whattomine_miners": "whattomine.step_3",
+}
+
+
+def _validate_pipeline_steps(
+    steps: Sequence[PipelineStep],
+    resource_slots: Mapping[StepResourceLiteral, int],
+) -> None:
+    step_names = {step.name for step in steps}
+    for step in steps:
+        if resource_slots.get(step.resource, 0) < 1:
+            msg = f"No {step.resource} resource slots for step {step.name}."
+            raise ValueError(msg)
+        for dependency in step.depends_on:
+            if dependency not in step_names:
+                msg = f"Step {step.name} depends on unknown step {dependency}."
+                raise ValueError(msg)
+
+
+def _collect_ready_step_names(
+    sorter: graphlib.TopologicalSorter[str],
+    steps_by_name: Mapping[str, PipelineStep],
+    statuses: dict[str, StepStatusLiteral],
+) -> list[str]:
+    """Get the ready steps. Steps whose dependencies didn't succeed are skipped."""
+    ready_step_names: list[str] = []
+    while newly_ready_step_names := sorter.get_ready():
+        for step_name in newly_ready_step_names:
+            if all(
+                statuses[dependency] == "succeeded"
+                for dependency in steps_by_name[step_name].depends_on
+            ):
+                ready_step_names.append(step_name)
+            else:
+                logger.warning(f"Skipping {step_name}: a dependency did not succeed.")
+                statuses[step_name] = "skipped"
+                sorter.done(step_name)
+    return ready_step_names
+
+
+def run_pipeline_steps(
+    steps: Sequence[PipelineStep],
+    *,
+    resource_slots: Mapping[StepResourceLiteral, int] = DEFAULT_RESOURCE_SLOTS,
+) -> dict[str, StepStatusLiteral]:
+    """Run the steps concurrently, respecting dependencies and resource slots.
+
+    A failing step does not stop other steps; only the steps depending on it (directly
+    or indirectly) are skipped.
+
+    Returns the status of each step.
+
+    Has unit test.
+    """
+    _validate_pipeline_steps(steps, resource_slots)
+    steps_by_name = {step.name: step for step in steps}
+
+    sorter = graphlib.TopologicalSorter({step.name: step.depends_on for step in steps})
+    sorter.prepare()  # Raises `graphlib.CycleError` on cycles.
+
+    statuses: dict[str, StepStatusLiteral] = {}
+    pending_step_names: list[str] = []
+    running: dict[Future[object], str] = {}
+    used_slots: Counter[StepResourceLiteral] = Counter()
+
+    with ThreadPoolExecutor(max_workers=sum(resource_slots.values())) as executor:
+        while sorter.is_active():
+            pending_step_names.extend(
+                _collect_ready_step_names(sorter, steps_by_name, statuses)
+            )
+
+            # Start pending steps which have a free resource slot (in order).
+            for step_name in list(pending_step_names):
+                step = steps_by_name[step_name]
+                if used_slots[step.resource] < resource_slots[step.resource]:
+                    logger.info(f"Starting {step_name} ({step.resource}).")
+                    pending_step_names.remove(step_name)
+                    used_slots[step.resource] += 1
+                    running[executor.submit(step.func)] = step_name
+
+            if not running:
+                continue
+
+            done_futures, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done_futures:
+                step_name = running.pop(future)
+                used_slots[steps_by_name[step_name].resource] -= 1
+                if (exc := future.exception()) is not None:
+                    logger.opt(exception=exc).error(f"Step {step_name} failed.")
+                    statuses[step_name] = "failed"
+                else:
+                    logger.info(f"Step {step_name} succeeded.")
+                    statuses[step_name] = "succeeded"
+                sorter.done(step_name)
+
+    return statuses
+
+
+def main() -> None:
+    """Run all bronze pipelines concurrently, then the Dolt write, then reports."""
+    statuses = run_pipeline_steps(BRONZE_STEPS)
+
+    # Fan-in: write the tables of all successful bronze steps.
+    step_9_dolt_write.main(
+        [
+            table_name
+            for table_name, step_name in BRONZE_TABLE_TO_STEP_NAME.items()
+            if statuses[step_name] == "succeeded"
+        ]
+    )
+
+    main_reports_pipeline()
+
+    failed_step_names = [
+        name for name, status in statuses.items() if status != "succeeded"
+    ]
+    if failed_step_names:
+        msg = f"Steps failed or were skipped: {', '.join(failed_step_names)}"
+        raise RuntimeError(msg)
+
+
+if __name__ == "__main__":
+    with collect_run_metrics("orchestrator"):
+        main()
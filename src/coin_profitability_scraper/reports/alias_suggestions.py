@@ -0,0 +1,164 @@
+"""Suggest likely algorithm name aliases (near-duplicates) to add in aliases.py.
+
+Candidate pairs are found with a character trigram blocking index (names sharing
+enough trigrams), so only a small number of pairs are compared in detail, instead of
+all O(n^2) pairs.
+"""
+
+import re
+from collections.abc import Sequence
+
+import polars as pl
+
+from coin_profitability_scraper.reports.aliases import ALGORITHM_ALIASES
+
+_SUGGESTION_SCHEMA = {
+    "standard_name": pl.String,
+    "alias": pl.String,
+    "score": pl.Float64,
+    "reason": pl.String,
+}
+
+
+def _compact_form(name: str) -> str:
+    """Lowercase, with all non-alphanumeric characters removed."""
+    return re.sub(r"[^a-z0-9]", "", name.lower())
+
+
+def _sorted_tokens_form(name: str) -> str:
+    """Sorted lowercase tokens. Catches "Blake2b Sha3" vs "SHA3 Blake2b"."""
+    return " ".join(sorted(re.findall(r"[a-z]+|\d+", name.lower())))
+
+
+def _strip_version_suffix(name: str) -> str:
+    """Remove a trailing version suffix, like "v2" or "version"."""
+    return re.sub(r"(?:v\d+|version\d*)$", "", _compact_form(name))
+
+
+def _strip_digits(name: str) -> str:
+    return re.sub(r"\d", "", name)
+
+
+def _levenshtein_distance(a: str, b: str) -> int:
+    previous_row = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current_row = [i]
+        for j, char_b in enumerate(b, start=1):
+            current_row.append(
+                min(
+                    previous_row[j] + 1,  # Deletion.
+                    current_row[j - 1] + 1,  # Insertion.
+                    previous_row[j - 1] + (char_a != char_b),  # Substitution.
+                )
+            )
+        previous_row = current_row
+    return previous_row[-1]
+
+
+def _score_pair(name_a: str, name_b: str) -> tuple[float, str] | None:
+    """Score how likely two names are aliases of each other. None if unlikely."""
+    compact_a, compact_b = _compact_form(name_a), _compact_form(name_b)
+    if compact_a == compact_b:
+        return (1.0, "same when lowercased and stripped")
+    if _sorted_tokens_form(name_a) == _sorted_tokens_form(name_b):
+        return (0.95, "same tokens, reordered")
+    if _strip_digits(compact_a) == _strip_digits(compact_b):
+        # Numeric variants (e.g., "Cuckatoo31" vs "Cuckatoo32") are distinct.
+        return None
+
+    edit_similarity = 1 - _levenshtein_distance(compact_a, compact_b) / max(
+        len(compact_a), len(compact_b)
+    )
+    if edit_similarity >= 0.85:  # noqa: PLR2004
+        return (round(0.9 * edit_similarity, 4), "small edit distance")
+
+    if _strip_version_suffix(name_a) == _strip_version_suffix(name_b):
+        return (0.5, "differ by version suffix")
+    return None
+
+
+def _find_candidate_pairs(
+    names: Sequence[str], *, min_dice: float, max_block_size: int
+) -> pl.DataFrame:
+    """Find candidate name pairs via a character trigram blocking index.
+
+    Trigrams shared by more than `max_block_size` names (e.g., "ash" in "...Hash")
+    are not used for blocking, as they would re-introduce the quadratic blow-up.
+    """
+    df_grams = (
+        pl.DataFrame({"name": names}, schema={"name": pl.String})
+        .with_columns(
+            padded=(
+                "#"
+                + pl.col("name").str.to_lowercase().str.replace_all(r"[^a-z0-9]", "")
+                + "#"
+            )
+        )
+        .with_columns(offset=pl.int_ranges(0, pl.col("padded").str.len_chars() - 2))
+        .explode("offset")
+        .drop_nulls("offset")
+        .select("name", gram=pl.col("padded").str.slice(pl.col("offset"), 3))
+        .unique()
+    )
+    df_gram_counts = df_grams.group_by("name").agg(gram_count=pl.len())
+
+    df_blocks = df_grams.filter(pl.len().over("gram") <= max_block_size)
+    return (
+        df_blocks.join(df_blocks, on="gram", suffix="_b")
+        .filter(pl.col("name") < pl.col("name_b"))
+        .group_by("name", "name_b")
+        .agg(shared_gram_count=pl.len())
+        .join(df_gram_counts, on="name")
+        .join(df_gram_counts, left_on="name_b", right_on="name", suffix="_b")
+        .filter(
+            2 * pl.col("shared_gram_count")
+            >= min_dice * (pl.col("gram_count") + pl.col("gram_count_b"))
+        )
+        .select("name", "name_b")
+        .sort("name", "name_b")
+    )
+
+
+def suggest_algorithm_aliases(
+    algo_names: Sequence[str],
+    *,
+    min_dice: float = 0.5,
+    max_block_size: int = 50,
+) -> pl.DataFrame:
+    """Suggest ranked candidate merges of algorithm names, for `ALGORITHM_ALIASES`.
+
+    Near-duplicates are found by: lowercasing and stripping, token reordering, edit
+    distance, and version suffixes. Names which differ only in their digits (e.g.,
+    "Cuckatoo31" and "Cuckatoo32") are distinct algorithms, and are not suggested.
+
+    Returns a frame with columns `standard_name`, `alias`, `score`, and `reason`,
+    sorted by descending `score`. The `standard_name` is the name already in
+    `ALGORITHM_ALIASES` (if either is).
+
+    Has unit test.
+    """
+    df_pairs = _find_candidate_pairs(
+        sorted(set(algo_names)), min_dice=min_dice, max_block_size=max_block_size
+    )
+
+    suggestions: list[dict[str, str | float]] = []
+    for name_a, name_b in df_pairs.iter_rows():
+        scored = _score_pair(name_a, name_b)
+        if scored is None:
+            continue
+
+        standard_name, alias = (
+            (name_b, name_a) if name_b in ALGORITHM_ALIASES else (name_a, name_b)
+        )
+        suggestions.append(
+            {
+                "standard_name": standard_name,
+                "alias": alias,
+                "score": scored[0],
+                "reason": scored[1],
+            }
+        )
+
+    return pl.DataFrame(suggestions, schema=_SUGGESTION_SCHEMA).sort(
+        ["score", "standard_name", "alias"], descending=[True, False, False]
+    )
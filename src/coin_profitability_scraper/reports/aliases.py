@@ -1,6 +1,14 @@
 """Store aliases for names across datasets."""
 
+import hashlib
+import inspect
+from pathlib import Path
+
+import orjson
 import polars as pl
+from loguru import logger
+
+algorithm_name_cache_folder = Path("./out/reports/") / Path(__file__).stem
 
 ALGORITHM_ALIASES: dict[str, list[str]] = {
     "Blake256": ["Blake 256", "Blake256", "BLAKE256"],
@@ -103,3 +111,136 @@ def normalize_algorithm_names(expr: pl.Expr) -> pl.Expr:
     x = pre_mapping_normalize_algorithm_names(expr)
     x = x.replace(ALGORITHM_MAPPINGS)
     return post_mapping_normalize_algorithm_names(x)
+
+
+def _algorithm_aliases_fingerprint() -> str:
+    """Fingerprint the aliases and normalization code, to invalidate the cache."""
+    return hashlib.sha256(
+        orjson.dumps(ALGORITHM_ALIASES, option=orjson.OPT_SORT_KEYS)
+        + inspect.getsource(pre_mapping_normalize_algorithm_names).encode()
+        + inspect.getsource(post_mapping_normalize_algorithm_names).encode()
+    ).hexdigest()[:16]
+
+
+def resolve_algorithm_names(reported_algo_names: pl.Series) -> pl.DataFrame:
+    """Map distinct reported algorithm names to normalized names.
+
+    Resolved names are cached in a Parquet file keyed by a fingerprint of
+    `ALGORITHM_ALIASES` (and the normalization code), so only names never seen before
+    go through `normalize_algorithm_names()`. The cache is in `./out/reports/`, which
+    isn't kept between CI runs, so it only helps local and repeated runs (each CI run
+    resolves all names once).
+
+    Returns a frame with columns `reported_algo_name` and `algo_name`.
+
+    Has unit test.
+    """
+    cache_path = (
+        algorithm_name_cache_folder
+        / f"algorithm_name_cache_{_algorithm_aliases_fingerprint()}.parquet"
+    )
+    if cache_path.exists():
+        df_cache = pl.read_parquet(cache_path)
+    else:
+        df_cache = pl.DataFrame(
+            schema={"reported_algo_name": pl.String, "algo_name": pl.String}
+        )
+
+    df_new = (
+        reported_algo_names.cast(pl.String)
+        .unique()
+        .to_frame("reported_algo_name")
+        .join(df_cache, on="reported_algo_name", how="anti", nulls_equal=True)
+        .with_columns(algo_name=normalize_algorithm_names(pl.col("reported_algo_name")))
+    )
+    if df_new.height > 0:
+        logger.debug(f"Resolved {df_new.height:,} new algorithm names.")
+        df_cache = pl.concat([df_cache, df_new]).sort(
+            "reported_algo_name", nulls_last=True
+        )
+
+        # Drop caches for outdated versions of the aliases.
+        algorithm_name_cache_folder.mkdir(parents=True, exist_ok=True)
+        for old_cache_path in algorithm_name_cache_folder.glob(
+            "algorithm_name_cache_*.parquet"
+        ):
+            old_cache_path.unlink()
+        df_cache.write_parquet(cache_path)
+
+    return df_cache
+
+
+def add_normalized_algorithm_name_column(
+    lf: pl.LazyFrame, *, reported_algo_name_col: str, algo_name_col: str
+) -> pl.LazyFrame:
+    """Add a column with the normalized name of each reported algorithm name.
+
+    The normalization runs on the distinct names only (see
+    `resolve_algorithm_names()`), and is joined back onto every row. Stays within
+    the lazy plan, so the sources of `lf` are only scanned once.
+
+    Has unit test.
+    """
+    lf_name_map = (
+        lf.select(pl.col(reported_algo_name_col).cast(pl.String))
+        .unique()
+        .map_batches(
+            lambda df: resolve_algorithm_names(df.to_series()).rename(
+                {
+                    "reported_algo_name": reported_algo_name_col,
+                    "algo_name": algo_name_col,
+                }
+            ),
+            schema={reported_algo_name_col: pl.String, algo_name_col: pl.String},
+        )
+    )
+    return lf.join(
+        lf_name_map,
+        on=reported_algo_name_col,
+        how="left",
+        nulls_equal=True,
+        validate="m:1",
+        maintain_order="left",
+    )
+
+
+def add_canonical_name_column(
+    lf: pl.LazyFrame, *, name_col: str, canonical_name_col: str
+) -> pl.LazyFrame:
+    """Add a column with the canonical spelling of each name in `name_col`.
+
+    Groups by lowercased names with characters stripped (boring form), then picks
+    the first name in sorted order as the canonical name for each group. Done as a
+    group/min/join over the distinct names only.
+
+    Has unit test.
+    """
+    lf_names = (
+        lf.select(name_col)
+        .unique()
+        .with_columns(
+            _boring_name=(
+                pl.col(name_col).str.to_lowercase().str.replace_all(r"[^A-Za-z0-9]", "")
+            )
+        )
+    )
+    lf_canonical_names = lf_names.group_by("_boring_name").agg(
+        _canonical_name=pl.col(name_col).min()
+    )
+    lf_name_map = lf_names.join(
+        lf_canonical_names, on="_boring_name", how="left", nulls_equal=True
+    ).select(
+        name_col,
+        pl.when(pl.col("_canonical_name").is_null() | (pl.col("_canonical_name") == ""))
+        .then(pl.col(name_col))  # Fallback to original name.
+        .otherwise(pl.col("_canonical_name"))
+        .alias(canonical_name_col),
+    )
+    return lf.join(
+        lf_name_map,
+        on=name_col,
+        how="left",
+        nulls_equal=True,
+        validate="m:1",
+        maintain_order="left",
+    )
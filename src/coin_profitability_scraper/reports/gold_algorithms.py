@@ -1,20 +1,41 @@
 """Summarize all algorithms into `gold_algorithms` table."""
 
+from collections.abc import Mapping, Sequence
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 import dataframely as dy
-import orjson
 import polars as pl
+import sqlalchemy
 from loguru import logger
 
+from coin_profitability_scraper.canonical import dy_json_string
+from coin_profitability_scraper.data_util import pl_expr_json_encode
+from coin_profitability_scraper.dolt_reader import read_dolt_tables
 from coin_profitability_scraper.dolt_updater import DoltDatabaseUpdater
-from coin_profitability_scraper.dolt_util import DOLT_REPO_URL
+from coin_profitability_scraper.dolt_util import DOLT_REPO_URL, read_query_where_in
+from coin_profitability_scraper.dy_util import (
+    read_validated_parquet,
+    write_validated_parquet,
+)
+from coin_profitability_scraper.float_change_rules import float_change_rule
+from coin_profitability_scraper.reports.alias_suggestions import (
+    suggest_algorithm_aliases,
+)
+from coin_profitability_scraper.reports.aliases import add_canonical_name_column
+from coin_profitability_scraper.reports.silver_coin_entities import (
+    DySchemaSilverCoinEntities,
+)
 from coin_profitability_scraper.reports.silver_stacked_coins import (
     DySchemaSilverStackedCoins,
 )
 from coin_profitability_scraper.reports.silver_stacked_miners import (
     DySchemaSilverStackedMiners,
 )
+from coin_profitability_scraper.run_metrics import metered_step
+
+if TYPE_CHECKING:
+    from coin_profitability_scraper.tables import TableNameLiteral
 
 output_folder = Path("./out/reports/") / Path(__file__).stem
 
@@ -25,8 +46,12 @@ class DySchemaGoldAlgorithms(dy.Schema):
     algo_name = dy.String(
         primary_key=True, nullable=False, min_length=1, max_length=100
     )
-    source_sites_json = dy.String(nullable=False, min_length=2, max_length=1000)
-    source_tables_json = dy.String(nullable=False, min_length=2, max_length=1000)
+    source_sites_json = dy_json_string(
+        nullable=False, min_length=2, max_length=1000, sort_arrays=True
+    )
+    source_tables_json = dy_json_string(
+        nullable=False, min_length=2, max_length=1000, sort_arrays=True
+    )
     coin_count = dy.UInt32(nullable=False)
 
     earliest_coin_created_at = dy.Date(nullable=False)
@@ -35,8 +60,12 @@ class DySchemaGoldAlgorithms(dy.Schema):
     earliest_coin = dy.String(nullable=False, min_length=1, max_length=100)
     latest_coin = dy.String(nullable=False, min_length=1, max_length=100)
 
-    volume_24h_usd = dy.Float64(nullable=True)
-    market_cap_usd = dy.Float64(nullable=True)
+    volume_24h_usd = dy.Float64(
+        nullable=True, metadata=float_change_rule(rel_tolerance=0.01)
+    )
+    market_cap_usd = dy.Float64(
+        nullable=True, metadata=float_change_rule(rel_tolerance=0.01)
+    )
 
     asic_count = dy.UInt32(nullable=True)
     earliest_asic_announcement_date = dy.Date(nullable=True)
@@ -44,15 +73,22 @@ class DySchemaGoldAlgorithms(dy.Schema):
     earliest_asic_created_at = dy.Date(nullable=True)
     latest_asic_created_at = dy.Date(nullable=True)
 
-    reported_aliases_json = dy.String(nullable=False, min_length=2, max_length=1000)
+    reported_aliases_json = dy_json_string(
+        nullable=False, min_length=2, max_length=1000, sort_arrays=True
+    )
 
-    coin_names_json = dy.String(nullable=False, min_length=2, max_length=10_000)
+    coin_names_json = dy_json_string(
+        nullable=False, min_length=2, max_length=10_000, sort_arrays=True
+    )
 
     @dy.rule()
     def reported_aliases_json_is_not_empty_list(cls) -> pl.Expr:
         """Ensure reported_aliases_json is not an empty list."""
-        return pl.col("reported_aliases_json").map_elements(
-            lambda x: len(orjson.loads(x)) > 0, return_dtype=pl.Boolean
+        return (
+            pl.col("reported_aliases_json")
+            .str.json_decode(pl.List(pl.String))
+            .list.len()
+            > 0
         )
 
 
@@ -65,67 +101,84 @@ def _fetch_dolt_tables() -> None:
     output_folder.mkdir(parents=True, exist_ok=True)
     logger.info("Starting fetching dolt tables.")
 
-    with DoltDatabaseUpdater(DOLT_REPO_URL) as dolt:
-        for table_name in table_to_path_and_schema:
-            if not table_name.startswith("silver_"):
-                continue
-
-            logger.debug(f"Loading {table_name}")
-            df = dolt.read_table_to_polars(table_name)
-            logger.info(f"Loaded {table_name}: {df.shape}")
+    table_names = [
+        table_name
+        for table_name in table_to_path_and_schema
+        if table_name.startswith("silver_")
+    ]
+    for table_name, df in read_dolt_tables(table_names).items():
+        df.write_parquet(output_folder / f"src_{table_name}.parquet")
 
-            df.write_parquet(output_folder / f"src_{table_name}.parquet")
-
-        logger.info("Done fetching all tables.")
+    logger.info("Done fetching all tables.")
 
 
 def _transform_coin_list_to_gold_algorithms(
     df_silver_stacked_coins: dy.DataFrame[DySchemaSilverStackedCoins],
+    df_silver_coin_entities: dy.DataFrame[DySchemaSilverCoinEntities],
 ) -> pl.DataFrame:
-    """Transform coin list to algorithm list."""
+    """Transform coin list to algorithm list.
+
+    Coins reported by several sources (same `coin_entity_id`) are counted once, and
+    their market cap and volume are the median of the reports.
+    """
     df = (
         df_silver_stacked_coins.filter(pl.col("algo_name").is_not_null())
+        .join(
+            df_silver_coin_entities.select(
+                "source_site", "coin_unique_source_id", "coin_entity_id"
+            ),
+            on=["source_site", "coin_unique_source_id"],
+            how="left",
+            validate="1:1",
+        )
+        .with_columns(
+            # Coins not (yet) resolved are their own entity.
+            coin_entity_id=pl.coalesce(
+                "coin_entity_id",
+                pl.concat_str("source_site", pl.lit(":"), "coin_unique_source_id"),
+            )
+        )
+        .with_columns(
+            entity_market_cap_usd=(
+                pl.col("market_cap_usd").median().over("algo_name", "coin_entity_id")
+            ),
+            entity_volume_24h_usd=(
+                pl.col("volume_24h_usd").median().over("algo_name", "coin_entity_id")
+            ),
+            is_first_entity_report=(
+                pl.col("coin_entity_id").is_first_distinct().over("algo_name")
+            ),
+        )
         .sort(["coin_created_at"])
         .group_by(["algo_name"], maintain_order=True)
         .agg(
-            source_sites=pl.col("source_site").unique().sort(),
-            source_tables=pl.col("source_table").unique().sort(),
+            source_sites=pl.col("source_site").cast(pl.String).unique().sort(),
+            source_tables=pl.col("source_table").cast(pl.String).unique().sort(),
             earliest_coin_created_at=pl.col("coin_created_at").first(),
             latest_coin_created_at=pl.col("coin_created_at").last(),
-            # `coin_count` is approximate as names lack normalization.
-            coin_count=pl.col("coin_name").n_unique(),
-            earliest_coin=(
-                (pl.col("coin_name") + pl.lit(" @ ") + pl.col("source_site")).first()
+            coin_count=pl.col("coin_entity_id").n_unique(),
+            earliest_coin=(pl.format("{} @ {}", "coin_name", "source_site").first()),
+            latest_coin=(pl.format("{} @ {}", "coin_name", "source_site").last()),
+            # TODO: Could add a "first_founded_coin" and "first_founded_coin_date".
+            market_cap_usd=(
+                pl.col("entity_market_cap_usd")
+                .filter(pl.col("is_first_entity_report"))
+                .sum()
             ),
-            latest_coin=(
-                (pl.col("coin_name") + pl.lit(" @ ") + pl.col("source_site")).last()
+            volume_24h_usd=(
+                pl.col("entity_volume_24h_usd")
+                .filter(pl.col("is_first_entity_report"))
+                .sum()
             ),
-            # TODO: Could add a "first_founded_coin" and "first_founded_coin_date".
-            # FIXME: These sum across ALL coin reports (including duplicate reports from
-            # different sources for the same coin). Good enough heuristic though.
-            market_cap_usd=pl.col("market_cap_usd").sum(),
-            volume_24h_usd=pl.col("volume_24h_usd").sum(),
             reported_aliases_from_coins=pl.col("reported_algo_name").unique().sort(),
             coin_names=pl.col("coin_name").unique().sort(),
         )
     )
 
     df = df.with_columns(
-        source_sites_json=(
-            pl.col("source_sites")
-            .map_elements(lambda x: orjson.dumps(x.to_list()), pl.Binary)
-            .cast(pl.String)
-        ),
-        source_tables_json=(
-            pl.col("source_tables")
-            .map_elements(lambda x: orjson.dumps(x.to_list()), pl.Binary)
-            .cast(pl.String)
-        ),
-        coin_names_json=(
-            pl.col("coin_names")
-            .map_elements(lambda x: orjson.dumps(x.to_list()), pl.Binary)
-            .cast(pl.String)
-        ),
+        source_sites_json=pl_expr_json_encode(pl.col("source_sites")),
+        source_tables_json=pl_expr_json_encode(pl.col("source_tables")),
+        coin_names_json=pl_expr_json_encode(pl.col("coin_names")),
     ).drop("source_sites", "source_tables", "coin_names")
 
     logger.info(f"Transformed coin list to algorithm list with {df.height:,} entries.")
@@ -137,19 +190,27 @@ def _transform_stacked_miners_to_gold_algorithms(
 ) -> pl.DataFrame:
     """Transform asic list to algorithm list."""
     df = (
-        df_stacked_miners.filter(pl.col("algo_name").is_not_null())
+        df_stacked_miners.lazy()
+        .filter(pl.col("algo_name").is_not_null())
         .filter(  # TODO: Add info about GPUs as well.
             pl.col("miner_type") == pl.lit("ASIC")
         )
+        # Count differently-spelled reports of the same miner once.
+        .pipe(
+            add_canonical_name_column,
+            name_col="miner_name",
+            canonical_name_col="canonical_miner_name",
+        )
         .group_by(["algo_name"], maintain_order=True)
         .agg(
-            asic_count=pl.col("miner_name").n_unique(),
+            asic_count=pl.col("canonical_miner_name").n_unique(),
             earliest_asic_announcement_date=pl.col("announcement_date").min(),
             earliest_asic_launch_date=pl.col("launch_date").min(),
             earliest_asic_created_at=pl.col("miner_created_at").min(),
             latest_asic_created_at=pl.col("miner_created_at").max(),
             reported_aliases_from_asics=pl.col("reported_algo_name").unique().sort(),
         )
+        .collect()
     )
     logger.info(f"Transformed asic list to algorithm list with {df.height:,} entries.")
     return df
@@ -158,62 +219,42 @@ def _transform_stacked_miners_to_gold_algorithms(
 def _warn_about_algo_mapping_opportunities(
     gold_algorithms_df: dy.DataFrame[DySchemaGoldAlgorithms],
 ) -> None:
-    """Warn about potential mapping opportunities (e.g., same name when lowercase).
+    """Report potential mapping opportunities (e.g., same name when lowercase).
+
+    Uses `suggest_algorithm_aliases()`, which catches: same name when lowercased and
+    stripped, reordered tokens, small edit distances, and version suffixes.
 
-    Features:
-        1. Lowercases.
-        2. Removes all non-alphanumeric characters.
+    Writes all ranked suggestions to `algo_alias_suggestions.parquet`. They are
+    suggestions for review (not problems), so they are logged at INFO level.
     """
-    df = gold_algorithms_df.select(
-        algo_name_normalized=(
-            pl.col("algo_name").str.to_lowercase().str.replace_all(r"[^A-Za-z0-9]", "")
-        ),
-        algo_name_in_gold=pl.col("algo_name"),
-    )
-    df = df.group_by("algo_name_normalized").agg(
-        algo_names_in_gold=pl.col("algo_name_in_gold").unique().sort(),
-        count=pl.col("algo_name_in_gold").n_unique(),
-    )
-    df = df.filter(pl.col("count") > 1)
+    df = suggest_algorithm_aliases(gold_algorithms_df["algo_name"].to_list())
+    output_folder.mkdir(parents=True, exist_ok=True)
+    report_path = output_folder / "algo_alias_suggestions.parquet"
+    df.write_parquet(report_path)
+
     if df.height > 0:
-        logger.warning(
+        logger.info(
             f"Found {df.height} potential algorithm name mapping opportunities "
-            "(add in aliases.py):"
+            f"(add in aliases.py). Written to: {report_path}"
         )
         for row in df.iter_rows(named=True):
-            logger.warning(
-                f"Potential algorithm name mapping opportunity for "
-                f"{row['algo_name_normalized']}: {row['algo_names_in_gold']}"
+            logger.info(
+                f"Potential algorithm name mapping opportunity "
+                f"({row['reason']}, score={row['score']}): "
+                f"{row['standard_name']} <- {row['alias']}"
             )
 
 
-def main() -> None:
-    """Summarize all algorithms."""
-    _fetch_dolt_tables()
-
-    df_silver_stacked_coins = pl.read_parquet(
-        output_folder / "src_silver_stacked_coins.parquet"
-    )
-    df_silver_stacked_coins = DySchemaSilverStackedCoins.validate(
-        df_silver_stacked_coins, cast=True
-    )
-    logger.info(
-        f"Loaded silver stacked coins with {df_silver_stacked_coins.height:,} entries."
-    )
-
-    df_silver_stacked_miners = pl.read_parquet(
-        output_folder / "src_silver_stacked_miners.parquet"
-    )
-    df_silver_stacked_miners = DySchemaSilverStackedMiners.validate(
-        df_silver_stacked_miners, cast=True
-    )
-    logger.info(
-        f"Loaded silver stacked miners with {df_silver_stacked_miners.height:,} "
-        "entries."
+def _compute_gold_algorithms(
+    df_silver_stacked_coins: dy.DataFrame[DySchemaSilverStackedCoins],
+    df_silver_coin_entities: dy.DataFrame[DySchemaSilverCoinEntities],
+    df_silver_stacked_miners: dy.DataFrame[DySchemaSilverStackedMiners],
+) -> dy.DataFrame[DySchemaGoldAlgorithms]:
+    """Compute the `gold_algorithms` rows for all algorithms in the silver tables."""
+    df_algorithms = _transform_coin_list_to_gold_algorithms(
+        df_silver_stacked_coins, df_silver_coin_entities
     )
 
-    df_algorithms = _transform_coin_list_to_gold_algorithms(df_silver_stacked_coins)
-
     df_algorithms_from_asics = _transform_stacked_miners_to_gold_algorithms(
         df_silver_stacked_miners
     )
@@ -227,7 +268,7 @@ def main() -> None:
 
     # Merge the reported aliases from coins and asics.
     df_algorithms = df_algorithms.with_columns(
-        reported_aliases_json=(
+        reported_aliases_json=pl_expr_json_encode(
             pl.concat_list(
                 pl.col("reported_aliases_from_coins").fill_null(
                     pl.lit([], pl.List(pl.String))
@@ -238,18 +279,199 @@ def main() -> None:
             )
             .list.unique()
             .list.sort()
-            .map_elements(lambda x: orjson.dumps(x.to_list()), pl.Binary)
-            .cast(pl.String)
         )
     ).drop("reported_aliases_from_coins", "reported_aliases_from_asics")
 
     # Cast all datetime cols to dates.
     df_algorithms = df_algorithms.with_columns(pl.selectors.datetime().dt.date())
 
-    df_algorithms = DySchemaGoldAlgorithms.validate(df_algorithms, cast=True)
+    return DySchemaGoldAlgorithms.validate(df_algorithms, cast=True)
+
+
+def _get_affected_algo_names(
+    dolt: DoltDatabaseUpdater, silver_deltas: Mapping["TableNameLiteral", pl.DataFrame]
+) -> list[str]:
+    """Get the algorithms whose `gold_algorithms` row may change, from silver deltas.
+
+    A silver delta contains both the new and previous version of each changed row, so
+    rows moving from one algorithm to another affect both algorithms.
+    """
+    algo_names = pl.concat(
+        [
+            silver_deltas["silver_stacked_coins"].get_column("algo_name"),
+            silver_deltas["silver_stacked_miners"].get_column("algo_name"),
+        ]
+    )
+
+    # Entity changes affect the algorithm of the coin they belong to.
+    df_entities_delta = silver_deltas["silver_coin_entities"]
+    if df_entities_delta.height > 0:
+        coins = sqlalchemy.Table(
+            "silver_stacked_coins", sqlalchemy.MetaData(), autoload_with=dolt.engine
+        )
+        algo_names_from_entities = read_query_where_in(
+            dolt.engine,
+            sqlalchemy.select(coins.c.algo_name).distinct(),
+            sqlalchemy.tuple_(coins.c.source_site, coins.c.coin_unique_source_id),
+            df_entities_delta.select(
+                pl.col("source_site").cast(pl.String), "coin_unique_source_id"
+            ).unique(),
+        ).get_column("algo_name")
+        algo_names = pl.concat(
+            [algo_names.cast(pl.String), algo_names_from_entities.cast(pl.String)]
+        )
+
+    return algo_names.cast(pl.String).drop_nulls().unique().sort().to_list()
+
+
+def _patch_gold_algorithms(
+    df_gold_current: dy.DataFrame[DySchemaGoldAlgorithms],
+    df_gold_recomputed: dy.DataFrame[DySchemaGoldAlgorithms],
+    affected_algo_names: Sequence[str],
+) -> dy.DataFrame[DySchemaGoldAlgorithms]:
+    """Replace the affected algorithms' rows with their recomputed rows.
+
+    Affected algorithms missing from `df_gold_recomputed` (e.g., no more coins) are
+    dropped.
+
+    Has unit test.
+    """
+    return DySchemaGoldAlgorithms.validate(
+        pl.concat(
+            [
+                df_gold_current.filter(
+                    pl.col("algo_name").is_in(affected_algo_names).not_()
+                ),
+                df_gold_recomputed,
+            ]
+        ).sort("algo_name"),
+        cast=True,
+    )
+
+
+def _compute_gold_algorithms_incrementally(
+    silver_deltas: Mapping["TableNameLiteral", pl.DataFrame],
+) -> dy.DataFrame[DySchemaGoldAlgorithms]:
+    """Recompute only the `gold_algorithms` rows affected by the silver deltas.
+
+    Only the silver rows of the affected algorithms are read from Dolt. Note that
+    changes to the gold logic itself require a full recompute.
+    """
+    with DoltDatabaseUpdater(DOLT_REPO_URL) as dolt:
+        df_gold_current = DySchemaGoldAlgorithms.validate(
+            dolt.read_table_to_polars("gold_algorithms"), cast=True
+        )
+
+        affected_algo_names = _get_affected_algo_names(dolt, silver_deltas)
+        logger.info(
+            f"Silver deltas affect {len(affected_algo_names):,} of "
+            f"{df_gold_current.height:,} algorithms."
+        )
+        if len(affected_algo_names) == 0:
+            return df_gold_current
+
+        metadata = sqlalchemy.MetaData()
+        (coins, entities, miners) = (
+            sqlalchemy.Table(table_name, metadata, autoload_with=dolt.engine)
+            for table_name in (
+                "silver_stacked_coins",
+                "silver_coin_entities",
+                "silver_stacked_miners",
+            )
+        )
+        df_algo_names = pl.DataFrame(
+            {"algo_name": affected_algo_names}, schema={"algo_name": pl.String}
+        )
+        df_silver_stacked_coins = DySchemaSilverStackedCoins.validate(
+            read_query_where_in(
+                dolt.engine, sqlalchemy.select(coins), coins.c.algo_name, df_algo_names
+            ),
+            cast=True,
+        )
+        df_silver_coin_entities = DySchemaSilverCoinEntities.validate(
+            read_query_where_in(
+                dolt.engine,
+                sqlalchemy.select(entities).join(
+                    coins,
+                    sqlalchemy.and_(
+                        entities.c.source_site == coins.c.source_site,
+                        entities.c.coin_unique_source_id
+                        == coins.c.coin_unique_source_id,
+                    ),
+                ),
+                coins.c.algo_name,
+                df_algo_names,
+            ),
+            cast=True,
+        )
+        df_silver_stacked_miners = DySchemaSilverStackedMiners.validate(
+            read_query_where_in(
+                dolt.engine,
+                sqlalchemy.select(miners),
+                miners.c.algo_name,
+                df_algo_names,
+            ),
+            cast=True,
+        )
+
+    df_gold_recomputed = _compute_gold_algorithms(
+        df_silver_stacked_coins, df_silver_coin_entities, df_silver_stacked_miners
+    )
+    return _patch_gold_algorithms(
+        df_gold_current, df_gold_recomputed, affected_algo_names
+    )
+
+
+@metered_step
+def main(
+    silver_deltas: Mapping["TableNameLiteral", pl.DataFrame] | None = None,
+) -> None:
+    """Summarize all algorithms.
+
+    Args:
+        silver_deltas: Upsert deltas of the silver tables (from `step_9_dolt_write`).
+            If given, only the algorithms affected by these deltas are recomputed.
+            Otherwise, all algorithms are recomputed.
+
+    """
+    if silver_deltas is not None:
+        df_algorithms = _compute_gold_algorithms_incrementally(silver_deltas)
+
+    else:
+        _fetch_dolt_tables()
+
+        df_silver_stacked_coins = read_validated_parquet(
+            output_folder / "src_silver_stacked_coins.parquet",
+            DySchemaSilverStackedCoins,
+        )
+        logger.info(
+            "Loaded silver stacked coins with "
+            f"{df_silver_stacked_coins.height:,} entries."
+        )
+
+        df_silver_stacked_miners = read_validated_parquet(
+            output_folder / "src_silver_stacked_miners.parquet",
+            DySchemaSilverStackedMiners,
+        )
+        logger.info(
+            f"Loaded silver stacked miners with {df_silver_stacked_miners.height:,} "
+            "entries."
+        )
+
+        df_silver_coin_entities = read_validated_parquet(
+            output_folder / "src_silver_coin_entities.parquet",
+            DySchemaSilverCoinEntities,
+        )
+
+        df_algorithms = _compute_gold_algorithms(
+            df_silver_stacked_coins, df_silver_coin_entities, df_silver_stacked_miners
+        )
+
     _warn_about_algo_mapping_opportunities(df_algorithms)
 
-    df_algorithms.write_parquet(output_folder / "gold_algorithms.parquet")
+    write_validated_parquet(
+        df_algorithms, DySchemaGoldAlgorithms, output_folder / "gold_algorithms.parquet"
+    )
 
 
 if __name__ == "__main__":
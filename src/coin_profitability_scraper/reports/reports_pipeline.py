@@ -1,22 +1,28 @@
 """Run the whole reports pipeline."""
 
-from coin_profitability_scraper import step_9_dolt_write
+from coin_profitability_scraper import is_incremental_gold, step_9_dolt_write
 from coin_profitability_scraper.reports import (
     gold_algorithms,
+    silver_coin_entities,
     silver_stacked_coins,
     silver_stacked_miners,
 )
+from coin_profitability_scraper.run_metrics import collect_run_metrics
 
 
 def main_reports_pipeline() -> None:
     """Run the whole reports pipeline."""
     silver_stacked_coins.main()
+    silver_coin_entities.main()
     silver_stacked_miners.main()
-    step_9_dolt_write.main(("silver_stacked_coins", "silver_stacked_miners"))
+    silver_deltas = step_9_dolt_write.main(
+        ("silver_stacked_coins", "silver_coin_entities", "silver_stacked_miners")
+    )
 
-    gold_algorithms.main()
+    gold_algorithms.main(silver_deltas if is_incremental_gold() else None)
     step_9_dolt_write.main(("gold_algorithms",))
 
 
 if __name__ == "__main__":
-    main_reports_pipeline()
+    with collect_run_metrics("reports_pipeline"):
+        main_reports_pipeline()
@@ -0,0 +1,149 @@
+"""Create `silver_coin_entities` table, linking the same coin across sources.
+
+Each row of `silver_stacked_coins` is mapped to a `coin_entity_id`. Rows are linked
+when they share a blocking key:
+    1. Same normalized coin name (and same algorithm, if the name is reported with
+        multiple different algorithms).
+    2. Same coin symbol and same algorithm.
+
+Entities are the connected components of these links. They are found by repeatedly
+propagating the minimum record key within each block (vectorized, no pairwise
+comparisons), so it runs in near-linear time.
+"""
+
+from pathlib import Path
+
+import dataframely as dy
+import polars as pl
+from loguru import logger
+
+from coin_profitability_scraper.categories import SOURCE_SITES, dy_enum_string
+from coin_profitability_scraper.dy_util import (
+    read_validated_parquet,
+    write_validated_parquet,
+)
+from coin_profitability_scraper.reports import silver_stacked_coins
+from coin_profitability_scraper.reports.silver_stacked_coins import (
+    DySchemaSilverStackedCoins,
+)
+from coin_profitability_scraper.run_metrics import metered_step
+
+output_folder = Path("./out/reports/") / Path(__file__).stem
+
+_BLOCK_KEY_COLUMNS = ("name_block_key", "symbol_block_key")
+
+
+class DySchemaSilverCoinEntities(dy.Schema):
+    """Schema for `silver_coin_entities` table."""
+
+    source_site = dy_enum_string(
+        SOURCE_SITES, primary_key=True, nullable=False, max_length=100
+    )
+    coin_unique_source_id = dy.String(
+        primary_key=True, nullable=False, min_length=1, max_length=100
+    )
+    # `coin_entity_id`: The "{source_site}:{coin_unique_source_id}" of the smallest
+    # record in the entity.
+    coin_entity_id = dy.String(nullable=False, min_length=3, max_length=250)
+    coin_entity_name = dy.String(nullable=False, min_length=1, max_length=200)
+    coin_entity_symbol = dy.String(nullable=True, min_length=1, max_length=100)
+    coin_entity_record_count = dy.UInt32(nullable=False, min=1)
+
+
+def _add_block_key_columns(lf: pl.LazyFrame) -> pl.LazyFrame:
+    """Add the blocking key columns. Null keys never link records."""
+    name_key = pl.col("coin_name").str.to_lowercase().str.replace_all(r"[^a-z0-9]", "")
+    return lf.with_columns(
+        name_key=pl.when(name_key != "").then(name_key),
+    ).with_columns(
+        name_block_key=(
+            pl.when(pl.col("algo_name").drop_nulls().n_unique().over("name_key") <= 1)
+            .then(pl.col("name_key"))
+            # Same name, different algorithms (e.g., forks): split by algorithm.
+            .otherwise(pl.concat_str("name_key", pl.lit("|"), "algo_name"))
+        ),
+        symbol_block_key=pl.concat_str(
+            pl.col("coin_symbol").str.to_uppercase(), pl.lit("|"), "algo_name"
+        ),
+    )
+
+
+def resolve_coin_entities(
+    df_coins: dy.DataFrame[DySchemaSilverStackedCoins],
+) -> dy.DataFrame[DySchemaSilverCoinEntities]:
+    """Link the same coin across sources into entities.
+
+    Has unit test.
+    """
+    df = (
+        df_coins.lazy()
+        .select(
+            "source_site",
+            "coin_unique_source_id",
+            "coin_name",
+            "coin_symbol",
+            "algo_name",
+            coin_entity_id=pl.concat_str(
+                "source_site", pl.lit(":"), "coin_unique_source_id"
+            ),
+        )
+        .pipe(_add_block_key_columns)
+        .collect()
+    )
+
+    # Propagate the minimum id within each block until stable (connected components).
+    iteration_count = 0
+    while True:
+        iteration_count += 1
+        df_next = df.with_columns(
+            coin_entity_id=pl.min_horizontal(
+                "coin_entity_id",
+                *(
+                    pl.when(pl.col(block_key).is_not_null()).then(
+                        pl.col("coin_entity_id").min().over(block_key)
+                    )
+                    for block_key in _BLOCK_KEY_COLUMNS
+                ),
+            )
+        )
+        if df_next["coin_entity_id"].equals(df["coin_entity_id"]):
+            break
+        df = df_next
+    logger.debug(f"Coin entity resolution converged in {iteration_count} iterations.")
+
+    df_entity_info = df.group_by("coin_entity_id").agg(
+        # Most commonly-reported value. Ties broken alphabetically.
+        coin_entity_name=pl.col("coin_name").mode().sort().first(),
+        coin_entity_symbol=(
+            pl.col("coin_symbol").drop_nulls().str.to_uppercase().mode().sort().first()
+        ),
+        coin_entity_record_count=pl.len(),
+    )
+    df = df.join(df_entity_info, on="coin_entity_id", how="left", validate="m:1")
+
+    logger.info(
+        f"Resolved {df.height:,} coin records into "
+        f"{df_entity_info.height:,} coin entities."
+    )
+    return DySchemaSilverCoinEntities.validate(
+        df.select(DySchemaSilverCoinEntities.column_names()), cast=True
+    )
+
+
+@metered_step
+def main() -> None:
+    """Resolve coin entities from the `silver_stacked_coins` output."""
+    output_folder.mkdir(parents=True, exist_ok=True)
+
+    df_coins = read_validated_parquet(
+        silver_stacked_coins.output_folder / "silver_stacked_coins.parquet",
+        DySchemaSilverStackedCoins,
+    )
+    df = resolve_coin_entities(df_coins)
+    write_validated_parquet(
+        df, DySchemaSilverCoinEntities, output_folder / "silver_coin_entities.parquet"
+    )
+
+
+if __name__ == "__main__":
+    main()
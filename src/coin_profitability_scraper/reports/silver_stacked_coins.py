@@ -1,15 +1,26 @@
 """Create `silver_stacked_coins` table."""
 
-from collections.abc import Sequence
 from pathlib import Path
 
 import dataframely as dy
 import polars as pl
 from loguru import logger
 
-from coin_profitability_scraper.dolt_updater import DoltDatabaseUpdater
-from coin_profitability_scraper.dolt_util import DOLT_REPO_URL
-from coin_profitability_scraper.reports.aliases import normalize_algorithm_names
+from coin_profitability_scraper.categories import (
+    SOURCE_SITE_DTYPE,
+    SOURCE_SITES,
+    SOURCE_TABLE_DTYPE,
+    SOURCE_TABLES,
+    dy_categorical_string,
+    dy_enum_string,
+)
+from coin_profitability_scraper.dolt_reader import read_dolt_tables
+from coin_profitability_scraper.dy_util import write_validated_parquet
+from coin_profitability_scraper.reports.aliases import (
+    add_canonical_name_column,
+    add_normalized_algorithm_name_column,
+)
+from coin_profitability_scraper.run_metrics import metered_step
 
 output_folder = Path("./out/reports/") / Path(__file__).stem
 
@@ -17,9 +28,8 @@ output_folder = Path("./out/reports/") / Path(__file__).stem
 class DySchemaSilverStackedCoins(dy.Schema):
     """Schema for `silver_stacked_coins` table."""
 
-    # TODO: Use enum for source_site and source_table.
-    source_site = dy.String(
-        primary_key=True, nullable=False, min_length=1, max_length=100
+    source_site = dy_enum_string(
+        SOURCE_SITES, primary_key=True, nullable=False, max_length=100
     )
     # `coin_unique_source_id`: Should be the name if the name is unique, otherwise it is
     # the slug.
@@ -28,11 +38,11 @@ class DySchemaSilverStackedCoins(dy.Schema):
     )
     coin_name = dy.String(nullable=False, min_length=1, max_length=200)
     reported_coin_name = dy.String(nullable=False, min_length=1, max_length=200)
-    algo_name = dy.String(nullable=True, min_length=1, max_length=100)
+    algo_name = dy_categorical_string(nullable=True, min_length=1, max_length=100)
     reported_algo_name = dy.String(nullable=True, min_length=1, max_length=100)
 
     coin_url = dy.String(nullable=True, min_length=1, max_length=500)
-    source_table = dy.String(nullable=False, min_length=1, max_length=100)
+    source_table = dy_enum_string(SOURCE_TABLES, nullable=False, max_length=100)
     coin_symbol = dy.String(nullable=True, min_length=1, max_length=100)
     market_cap_usd = dy.UInt64(nullable=True)
     volume_24h_usd = dy.UInt64(nullable=True)
@@ -49,71 +59,27 @@ def _fetch_dolt_tables() -> None:
     output_folder.mkdir(parents=True, exist_ok=True)
     logger.info("Starting fetching dolt tables.")
 
-    with DoltDatabaseUpdater(DOLT_REPO_URL) as dolt:
-        for table_name in table_to_path_and_schema:
-            if table_name.startswith(("gold_", "silver_")):
-                continue
-
-            logger.debug(f"Loading {table_name}")
-            df = dolt.read_table_to_polars(table_name)
-            logger.info(f"Loaded {table_name}: {df.shape}")
+    table_names = [
+        table_name
+        for table_name in table_to_path_and_schema
+        if not table_name.startswith(("gold_", "silver_"))
+    ]
+    for table_name, df in read_dolt_tables(table_names).items():
+        df.write_parquet(output_folder / f"src_{table_name}.parquet")
 
-            df.write_parquet(output_folder / f"src_{table_name}.parquet")
+    logger.info("Done fetching all tables.")
 
-        logger.info("Done fetching all tables.")
 
+def _silver_stacked_coins() -> dy.DataFrame[DySchemaSilverStackedCoins]:
+    """Stack all coin datasets into a normalized coin list.
 
-def _create_coin_name_normalization_map(
-    all_coin_names: Sequence[str],
-) -> dict[str, str]:
-    """Create a normalization map for reported_coin_name to coin_name.
-
-    Groups by lowercased names with characters stripped (boring form), then picks
-    a specific case for each group.
+    Built as one lazy plan, so that only the needed columns are read from each source.
     """
-    df = pl.DataFrame({"reported_coin_name": all_coin_names}).unique()
-    input_unique_coin_name_list = set(df["reported_coin_name"].to_list())
-    df = df.with_columns(
-        coin_name_normalized=(
-            pl.col("reported_coin_name")
-            .str.to_lowercase()
-            .str.replace_all(r"[^A-Za-z0-9]", "")
-        )
-    )
-    df = df.group_by("coin_name_normalized").agg(
-        coin_names_in_group=pl.col("reported_coin_name").unique().sort(),
-        count=pl.col("reported_coin_name").n_unique(),
-    )
-    normalization_map: dict[str, str] = {}
-    for row in df.iter_rows(named=True):
-        # Pick the first name in sorted order as the canonical name.
-        canonical_name = row["coin_names_in_group"][0]
-        for name in row["coin_names_in_group"]:
-            # Logical assert. Should not happen.
-            assert name not in normalization_map, (
-                f"Duplicate mapping for {name}: "
-                f"{normalization_map[name]} vs {canonical_name}"
-            )
-
-            if canonical_name not in {None, ""}:
-                normalization_map[name] = canonical_name
-            else:
-                normalization_map[name] = name  # Fallback to original name.
-
-    assert set(normalization_map.keys()) == input_unique_coin_name_list, (
-        "Normalization map keys do not match input unique coin name list."
-    )
-
-    return normalization_map
-
-
-def _silver_stacked_coins() -> pl.DataFrame:
-    """Stack all coin datasets into a normalized coin list."""
-    df = pl.concat(
+    lf = pl.concat(
         [
-            pl.read_parquet(output_folder / "src_crypto51_coins.parquet").select(
-                source_site=pl.lit("crypto51"),
-                source_table=pl.lit("crypto51_coins"),
+            pl.scan_parquet(output_folder / "src_crypto51_coins.parquet").select(
+                source_site=pl.lit("crypto51", SOURCE_SITE_DTYPE),
+                source_table=pl.lit("crypto51_coins", SOURCE_TABLE_DTYPE),
                 coin_unique_source_id=pl.col("coin_name"),
                 reported_coin_name=pl.col("coin_name"),
                 coin_symbol=pl.col("coin_symbol"),
@@ -126,9 +92,9 @@ def _silver_stacked_coins() -> pl.DataFrame:
                 founded_date=pl.lit(None, pl.Date),
                 coin_created_at=pl.col("created_at"),
             ),
-            pl.read_parquet(output_folder / "src_cryptodelver_coins.parquet").select(
-                source_site=pl.lit("cryptodelver"),
-                source_table=pl.lit("cryptodelver_coins"),
+            pl.scan_parquet(output_folder / "src_cryptodelver_coins.parquet").select(
+                source_site=pl.lit("cryptodelver", SOURCE_SITE_DTYPE),
+                source_table=pl.lit("cryptodelver_coins", SOURCE_TABLE_DTYPE),
                 coin_unique_source_id=pl.col("coin_slug"),
                 reported_coin_name=pl.col("coin_name"),
                 coin_symbol=pl.lit(None, pl.String),
@@ -139,9 +105,9 @@ def _silver_stacked_coins() -> pl.DataFrame:
                 founded_date=pl.lit(None, pl.Date),
                 coin_created_at=pl.col("created_at"),
             ),
-            pl.read_parquet(output_folder / "src_cryptoslate_coins.parquet").select(
-                source_site=pl.lit("cryptoslate"),
-                source_table=pl.lit("cryptoslate_coins"),
+            pl.scan_parquet(output_folder / "src_cryptoslate_coins.parquet").select(
+                source_site=pl.lit("cryptoslate", SOURCE_SITE_DTYPE),
+                source_table=pl.lit("cryptoslate_coins", SOURCE_TABLE_DTYPE),
                 coin_unique_source_id=pl.col("coin_slug"),
                 reported_coin_name=pl.col("coin_name"),
                 coin_symbol=pl.col("coin_slug"),
@@ -155,9 +121,9 @@ def _silver_stacked_coins() -> pl.DataFrame:
                 ),
                 coin_created_at=pl.col("created_at"),
             ),
-            pl.read_parquet(output_folder / "src_minerstat_coins.parquet").select(
-                source_site=pl.lit("minerstat"),
-                source_table=pl.lit("minerstat_coins"),
+            pl.scan_parquet(output_folder / "src_minerstat_coins.parquet").select(
+                source_site=pl.lit("minerstat", SOURCE_SITE_DTYPE),
+                source_table=pl.lit("minerstat_coins", SOURCE_TABLE_DTYPE),
                 coin_unique_source_id=pl.col("coin_slug"),
                 reported_coin_name=pl.col("coin_slug"),
                 coin_symbol=pl.col("coin_slug"),
@@ -168,9 +134,9 @@ def _silver_stacked_coins() -> pl.DataFrame:
                 founded_date=pl.date(pl.col("reported_founded").cast(pl.UInt32), 1, 1),
                 coin_created_at=pl.col("created_at"),
             ),
-            pl.read_parquet(output_folder / "src_miningnow_coins.parquet").select(
-                source_site=pl.lit("miningnow"),
-                source_table=pl.lit("miningnow_coins"),
+            pl.scan_parquet(output_folder / "src_miningnow_coins.parquet").select(
+                source_site=pl.lit("miningnow", SOURCE_SITE_DTYPE),
+                source_table=pl.lit("miningnow_coins", SOURCE_TABLE_DTYPE),
                 coin_unique_source_id=pl.col("coin_name"),
                 reported_coin_name=pl.col("coin_name"),
                 coin_symbol=pl.col("ticker"),
@@ -183,9 +149,9 @@ def _silver_stacked_coins() -> pl.DataFrame:
                 founded_date=pl.col("founded_date"),
                 coin_created_at=pl.col("created_at"),
             ),
-            pl.read_parquet(output_folder / "src_whattomine_coins.parquet").select(
-                source_site=pl.lit("whattomine"),
-                source_table=pl.lit("whattomine_coins"),
+            pl.scan_parquet(output_folder / "src_whattomine_coins.parquet").select(
+                source_site=pl.lit("whattomine", SOURCE_SITE_DTYPE),
+                source_table=pl.lit("whattomine_coins", SOURCE_TABLE_DTYPE),
                 coin_unique_source_id=pl.concat_str(
                     pl.col("whattomine_id").cast(pl.UInt32).cast(pl.String),
                     pl.col("coin_name"),
@@ -202,9 +168,9 @@ def _silver_stacked_coins() -> pl.DataFrame:
                 founded_date=pl.lit(None, pl.Date),
                 coin_created_at=pl.col("created_at"),
             ),
-            pl.read_parquet(output_folder / "src_wheretomine_coins.parquet").select(
-                source_site=pl.lit("wheretomine"),
-                source_table=pl.lit("wheretomine_coins"),
+            pl.scan_parquet(output_folder / "src_wheretomine_coins.parquet").select(
+                source_site=pl.lit("wheretomine", SOURCE_SITE_DTYPE),
+                source_table=pl.lit("wheretomine_coins", SOURCE_TABLE_DTYPE),
                 coin_unique_source_id=pl.col("coin_name"),
                 reported_coin_name=pl.col("coin_name"),
                 coin_symbol=pl.col("coin_abbreviation"),
@@ -221,22 +187,18 @@ def _silver_stacked_coins() -> pl.DataFrame:
         ]
     )
 
-    coin_name_mapping = _create_coin_name_normalization_map(
-        df["reported_coin_name"].to_list()
+    lf = add_canonical_name_column(
+        lf, name_col="reported_coin_name", canonical_name_col="coin_name"
     )
-
-    df = df.with_columns(
-        algo_name=normalize_algorithm_names(pl.col("reported_algo_name")),
-        coin_name=(
-            pl.col("reported_coin_name").replace_strict(
-                coin_name_mapping, return_dtype=pl.String
-            )
-        ),
+    lf = add_normalized_algorithm_name_column(
+        lf, reported_algo_name_col="reported_algo_name", algo_name_col="algo_name"
     )
 
-    # Apply schema.
-    height_before = df.height
-    df, failure_info = DySchemaSilverStackedCoins.filter(df, cast=True)
+    # Apply schema. Collects the whole plan with the streaming engine.
+    with pl.Config() as cfg:
+        cfg.set_engine_affinity("streaming")
+        df, failure_info = DySchemaSilverStackedCoins.filter(lf, cast=True)
+    height_before = df.height + len(failure_info)
     failure_info.write_parquet(
         output_folder / "silver_stacked_coins_schema_failures.parquet"
     )
@@ -257,14 +219,16 @@ def _silver_stacked_coins() -> pl.DataFrame:
     return df
 
 
+@metered_step
 def main() -> None:
     """Summarize all algorithms."""
     _fetch_dolt_tables()
 
-    df = _silver_stacked_coins()
-    df = DySchemaSilverStackedCoins.validate(df, cast=True)
+    df = _silver_stacked_coins()  # Already filtered to the schema.
     logger.info(f"Loaded silver stacked coins with {df.height:,} entries.")
-    df.write_parquet(output_folder / "silver_stacked_coins.parquet")
+    write_validated_parquet(
+        df, DySchemaSilverStackedCoins, output_folder / "silver_stacked_coins.parquet"
+    )
 
 
 if __name__ == "__main__":
@@ -6,9 +6,21 @@ import dataframely as dy
 import polars as pl
 from loguru import logger
 
-from coin_profitability_scraper.dolt_updater import DoltDatabaseUpdater
-from coin_profitability_scraper.dolt_util import DOLT_REPO_URL
-from coin_profitability_scraper.reports.aliases import normalize_algorithm_names
+from coin_profitability_scraper.categories import (
+    SOURCE_SITE_DTYPE,
+    SOURCE_SITES,
+    SOURCE_TABLE_DTYPE,
+    SOURCE_TABLES,
+    dy_categorical_string,
+    dy_enum_string,
+)
+from coin_profitability_scraper.dolt_reader import read_dolt_tables
+from coin_profitability_scraper.dy_util import write_validated_parquet
+from coin_profitability_scraper.float_change_rules import float_change_rule
+from coin_profitability_scraper.reports.aliases import (
+    add_normalized_algorithm_name_column,
+)
+from coin_profitability_scraper.run_metrics import metered_step
 
 output_folder = Path("./out/reports/") / Path(__file__).stem
 
@@ -16,25 +28,27 @@ output_folder = Path("./out/reports/") / Path(__file__).stem
 class DySchemaSilverStackedMiners(dy.Schema):
     """Schema for the `silver_stacked_miners` table."""
 
-    source_site = dy.String(
-        primary_key=True, nullable=False, min_length=4, max_length=100
+    source_site = dy_enum_string(
+        SOURCE_SITES, primary_key=True, nullable=False, max_length=100
     )
     miner_name = dy.String(
         primary_key=True, nullable=False, min_length=2, max_length=200
     )
-    algo_name = dy.String(
+    algo_name = dy_categorical_string(
         primary_key=True, nullable=False, min_length=2, max_length=100
     )
     reported_algo_name = dy.String(nullable=False, min_length=2, max_length=100)
     miner_type = dy.Enum(["ASIC", "GPU"], nullable=False)
 
-    source_table = dy.String(nullable=False, min_length=4, max_length=100)
+    source_table = dy_enum_string(SOURCE_TABLES, nullable=False, max_length=100)
 
     hashrate_hashes_per_second = dy.UInt64(nullable=False)
     cooling_type = dy.String(nullable=True, min_length=1, max_length=200)
-    price_usd = dy.Float64(nullable=True)
-    power_watts = dy.Float64(nullable=True)
-    weight_kg = dy.Float64(nullable=True)
+    price_usd = dy.Float64(
+        nullable=True, metadata=float_change_rule(rel_tolerance=0.01)
+    )
+    power_watts = dy.Float64(nullable=True, metadata=float_change_rule(decimals=3))
+    weight_kg = dy.Float64(nullable=True, metadata=float_change_rule(decimals=3))
 
     announcement_date = dy.Date(nullable=True)
     launch_date = dy.Date(nullable=True)
@@ -46,18 +60,11 @@ def _fetch_dolt_tables() -> None:
     output_folder.mkdir(parents=True, exist_ok=True)
     logger.info("Starting fetching dolt tables.")
 
-    with DoltDatabaseUpdater(DOLT_REPO_URL) as dolt:
-        for table_name in ("miningnow_asics", "whattomine_miners"):
-            if table_name.startswith(("gold_", "silver_")):
-                continue
-
-            logger.debug(f"Loading {table_name}")
-            df = dolt.read_table_to_polars(table_name)
-            logger.info(f"Loaded {table_name}: {df.shape}")
-
-            df.write_parquet(output_folder / f"src_{table_name}.parquet")
+    tables = read_dolt_tables(("miningnow_asics", "whattomine_miners"))
+    for table_name, df in tables.items():
+        df.write_parquet(output_folder / f"src_{table_name}.parquet")
 
-        logger.info("Done fetching all tables.")
+    logger.info("Done fetching all tables.")
 
 
 def _get_silver_stacked_miners() -> pl.DataFrame:
@@ -72,8 +79,8 @@ def _get_silver_stacked_miners() -> pl.DataFrame:
         [
             pl.read_parquet(output_folder / "src_miningnow_asics.parquet")
             .select(
-                source_site=pl.lit("miningnow"),
-                source_table=pl.lit("miningnow_asics"),
+                source_site=pl.lit("miningnow", SOURCE_SITE_DTYPE),
+                source_table=pl.lit("miningnow_asics", SOURCE_TABLE_DTYPE),
                 miner_type=pl.lit("ASIC"),
                 miner_name=pl.col("title"),
                 reported_algo_name=pl.col("algo_title"),
@@ -119,8 +126,8 @@ def _get_silver_stacked_miners() -> pl.DataFrame:
             ),
             # Source: whattomine_miners.
             pl.read_parquet(output_folder / "src_whattomine_miners.parquet").select(
-                source_site=pl.lit("whattomine"),
-                source_table=pl.lit("whattomine_miners"),
+                source_site=pl.lit("whattomine", SOURCE_SITE_DTYPE),
+                source_table=pl.lit("whattomine_miners", SOURCE_TABLE_DTYPE),
                 miner_type=pl.col("miner_type"),
                 miner_name=pl.col("miner_name"),
                 reported_algo_name=pl.col("algorithm_name"),
@@ -138,14 +145,17 @@ def _get_silver_stacked_miners() -> pl.DataFrame:
         ]
     )
 
-    df = df.with_columns(
-        algo_name=normalize_algorithm_names(pl.col("reported_algo_name")),
-    )
+    df = add_normalized_algorithm_name_column(
+        df.lazy(),
+        reported_algo_name_col="reported_algo_name",
+        algo_name_col="algo_name",
+    ).collect()
 
     logger.info(f"Stacked miner list with {df.height:,} entries.")
     return df
 
 
+@metered_step
 def main() -> None:
     """Summarize all algorithms."""
     _fetch_dolt_tables()
@@ -154,7 +164,9 @@ def main() -> None:
     df = DySchemaSilverStackedMiners.validate(df, cast=True)
 
     logger.info(f"Loaded silver stacked miners with {df.height:,} entries.")
-    df.write_parquet(output_folder / "silver_stacked_miners.parquet")
+    write_validated_parquet(
+        df, DySchemaSilverStackedMiners, output_folder / "silver_stacked_miners.parquet"
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,258 @@
+"""Collect performance metrics of each pipeline step, and write them per run.
+
+Steps (decorated with `metered_step`) record their wall time, peak RSS, and whether
+they failed. Shared helpers (downloads, Parquet reads/writes, Dolt upserts, etc.)
+record into the step currently running in their thread. At the end of a run,
+`collect_run_metrics()` writes all metrics to `<run id>.parquet` (long format: one
+row per step, metric, and label). Each run writes its own file, so that regressions
+can be tracked across scheduled runs.
+"""
+
+import contextvars
+import functools
+import inspect
+import resource
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Literal
+
+import dataframely as dy
+import polars as pl
+from loguru import logger
+
+from coin_profitability_scraper import PACKAGE_ROOT
+
+MetricAggregationLiteral = Literal["sum", "max"]
+
+run_metrics_output_folder = Path("./out/run_metrics/")
+
+# Step name used for metrics recorded outside of any `metered_step`.
+UNATTRIBUTED_STEP_NAME = "unattributed"
+
+_current_step_name: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "current_step_name", default=UNATTRIBUTED_STEP_NAME
+)
+
+
+class DySchemaRunMetrics(dy.Schema):
+    """Schema for the metrics of a single run."""
+
+    run_id = dy.String(nullable=False, min_length=1, max_length=200)
+    pipeline_name = dy.String(nullable=False, min_length=1, max_length=100)
+    run_started_at = dy.Datetime(nullable=False, time_zone="UTC")
+    step_name = dy.String(primary_key=True, min_length=1, max_length=200)
+    metric_name = dy.String(primary_key=True, min_length=1, max_length=100)
+    label = dy.String(primary_key=True, max_length=200)  # Empty if not applicable.
+    value = dy.Float64(nullable=False)
+    unit = dy.String(nullable=False, min_length=1, max_length=20)
+
+
+@dataclass(kw_only=True)
+class _MetricValue:
+    value: float
+    unit: str
+
+
+_metrics_lock = threading.Lock()
+_metrics: dict[tuple[str, str, str], _MetricValue] = {}
+
+
+def get_step_name(func: Callable[..., object]) -> str:
+    """Get a stable name for a step, even when its module is run as `__main__`.
+
+    Decorators (e.g., `step_cache.cached_step`) are unwrapped, so that the step is
+    named after its own function.
+
+    Has unit test.
+    """
+    func = inspect.unwrap(func)
+    func_path = Path(inspect.getfile(func)).resolve()
+    if func_path.is_relative_to(PACKAGE_ROOT.resolve()):
+        module_name = ".".join(
+            func_path.relative_to(PACKAGE_ROOT.resolve()).with_suffix("").parts
+        )
+    else:
+        module_name = func.__module__
+    return f"{module_name}.{func.__qualname__}"
+
+
+def record_metric(
+    metric_name: str,
+    value: float,
+    *,
+    unit: str,
+    label: str = "",
+    aggregation: MetricAggregationLiteral = "sum",
+) -> None:
+    """Record a metric value into the step currently running in this thread.
+
+    Values of the same step, metric, and label are combined with `aggregation`.
+    """
+    key = (_current_step_name.get(), metric_name, label)
+    with _metrics_lock:
+        if (metric := _metrics.get(key)) is None:
+            _metrics[key] = _MetricValue(value=value, unit=unit)
+        elif aggregation == "sum":
+            metric.value += value
+        else:
+            metric.value = max(metric.value, value)
+
+
+@contextmanager
+def record_duration(metric_name: str, *, label: str = "") -> Iterator[None]:
+    """Record the duration of the block (in seconds), even if it raises."""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_metric(
+            metric_name, time.perf_counter() - start_time, unit="s", label=label
+        )
+
+
+def _get_peak_rss_bytes() -> int:
+    """Get the peak resident set size of this process so far."""
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes.
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def _get_step_metric_total(step_name: str, metric_name: str) -> float:
+    with _metrics_lock:
+        return sum(
+            metric.value
+            for (key_step_name, key_metric_name, _label), metric in _metrics.items()
+            if key_step_name == step_name and key_metric_name == metric_name
+        )
+
+
+@contextmanager
+def measure_step(step_name: str) -> Iterator[None]:
+    """Attribute all metrics recorded in this block (and thread) to the step.
+
+    Also records the step's wall time, the peak RSS of the process so far (shared by
+    concurrent steps), whether the step failed, and its HTTP request throughput.
+    """
+    token = _current_step_name.set(step_name)
+    start_time = time.perf_counter()
+    failed = True
+    try:
+        yield
+        failed = False
+    finally:
+        wall_time_seconds = time.perf_counter() - start_time
+        record_metric("wall_time", wall_time_seconds, unit="s")
+        record_metric(
+            "peak_rss", _get_peak_rss_bytes(), unit="bytes", aggregation="max"
+        )
+        record_metric("failed", float(failed), unit="bool", aggregation="max")
+        if http_requests := _get_step_metric_total(step_name, "http_requests"):
+            record_metric(
+                "http_requests_per_second",
+                http_requests / wall_time_seconds,
+                unit="1/s",
+                aggregation="max",
+            )
+        _current_step_name.reset(token)
+
+
+def metered_step[**P, R](func: Callable[P, R]) -> Callable[P, R]:
+    """Decorate a step's `main()` to measure it with `measure_step()`."""
+    step_name = get_step_name(func)
+
+    @functools.wraps(func)
+    def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        with measure_step(step_name):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def bind_current_step[**P, R](func: Callable[P, R]) -> Callable[P, R]:
+    """Wrap `func` to record into the current step, even if run in another thread.
+
+    Use when submitting work to a thread pool from within a step.
+    """
+    step_name = _current_step_name.get()
+
+    @functools.wraps(func)
+    def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        token = _current_step_name.set(step_name)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _current_step_name.reset(token)
+
+    return wrapper
+
+
+def get_run_metrics_df(
+    *, run_id: str, pipeline_name: str, run_started_at: datetime
+) -> dy.DataFrame[DySchemaRunMetrics]:
+    """Get all metrics recorded so far.
+
+    Has unit test.
+    """
+    with _metrics_lock:
+        df = pl.DataFrame(
+            [
+                {
+                    "step_name": step_name,
+                    "metric_name": metric_name,
+                    "label": label,
+                    "value": float(metric.value),
+                    "unit": metric.unit,
+                }
+                for (step_name, metric_name, label), metric in _metrics.items()
+            ],
+            schema=DySchemaRunMetrics.to_polars_schema(),
+        )
+    df = df.with_columns(
+        run_id=pl.lit(run_id),
+        pipeline_name=pl.lit(pipeline_name),
+        run_started_at=pl.lit(run_started_at, dtype=pl.Datetime(time_zone="UTC")),
+    ).sort("step_name", "metric_name", "label")
+    return DySchemaRunMetrics.validate(df, cast=True)
+
+
+def reset_run_metrics() -> None:
+    """Discard all metrics recorded so far."""
+    with _metrics_lock:
+        _metrics.clear()
+
+
+@contextmanager
+def collect_run_metrics(
+    pipeline_name: str, output_folder: Path = run_metrics_output_folder
+) -> Iterator[None]:
+    """Collect the metrics of a whole run, and write them at its end (even on failure).
+
+    Written to `<output_folder>/<run id>.parquet`, without overwriting earlier runs.
+
+    Has unit test.
+    """
+    run_started_at = datetime.now(UTC)
+    run_id = f"{pipeline_name}-{run_started_at.strftime('%Y-%m-%d-%H%M%S')}"
+    reset_run_metrics()
+    try:
+        with measure_step(pipeline_name):
+            yield
+    finally:
+        # Imported here, as `dy_util` records its own metrics.
+        from coin_profitability_scraper.dy_util import (  # noqa: PLC0415
+            write_validated_parquet,
+        )
+
+        df_metrics = get_run_metrics_df(
+            run_id=run_id, pipeline_name=pipeline_name, run_started_at=run_started_at
+        )
+        output_path = output_folder / f"{run_id}.parquet"
+        output_folder.mkdir(parents=True, exist_ok=True)
+        write_validated_parquet(df_metrics, DySchemaRunMetrics, output_path)
+        logger.info(f"Wrote {df_metrics.height} run metrics to {output_path}.")
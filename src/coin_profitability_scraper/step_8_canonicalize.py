@@ -0,0 +1,180 @@
+"""Step 8: Canonicalize the tables to write to Dolt, and report the expected delta.
+
+Writes the canonical form of each table (see `canonical.canonicalize_frame()`), which
+`step_9_dolt_write` then pushes. Also reports the expected push delta of each table,
+compared to the last-pushed state manifest (see `dolt_state_manifest`).
+"""
+
+import sys
+from collections.abc import Sequence
+from datetime import UTC, datetime
+from pathlib import Path
+
+import dataframely as dy
+import polars as pl
+from loguru import logger
+
+from coin_profitability_scraper.canonical import canonicalize_frame
+from coin_profitability_scraper.dolt_state_manifest import read_state_manifest
+from coin_profitability_scraper.dolt_util import (
+    compute_row_hashes,
+    find_changed_rows_by_hash,
+)
+from coin_profitability_scraper.dy_util import (
+    read_validated_parquet,
+    write_validated_parquet,
+)
+from coin_profitability_scraper.float_change_rules import get_float_change_rules
+from coin_profitability_scraper.run_metrics import metered_step
+from coin_profitability_scraper.tables import (
+    PRUNED_TABLES,
+    TableNameLiteral,
+    table_to_path_and_schema,
+)
+
+step_8_output_folder = Path("./out/step_8_canonicalize/")
+expected_push_delta_path = step_8_output_folder / "expected_push_delta.parquet"
+
+
+class DySchemaExpectedPushDelta(dy.Schema):
+    """Schema for the expected push delta report (one row per table)."""
+
+    table_name = dy.String(primary_key=True, min_length=1, max_length=100)
+    computed_at = dy.Datetime(nullable=False, time_zone="UTC")
+    row_count = dy.UInt32(nullable=False)
+
+    # Rows whose content was changed by canonicalization (e.g., JSON key order).
+    canonicalized_row_count = dy.UInt32(nullable=False)
+
+    # Null if there is no usable state manifest (e.g., on a fresh checkout).
+    manifest_table_hash = dy.String(nullable=True, min_length=1, max_length=100)
+    expected_inserted_row_count = dy.UInt32(nullable=True)
+    expected_updated_row_count = dy.UInt32(nullable=True)
+    expected_deleted_row_count = dy.UInt32(nullable=True)
+
+
+def get_canonical_parquet_path(table_name: TableNameLiteral) -> Path:
+    """Get the path of the canonical form of a table (the input to step 9)."""
+    return step_8_output_folder / f"{table_name}.parquet"
+
+
+def get_expected_push_delta(
+    table_name: TableNameLiteral, df: pl.DataFrame, dy_schema: type[dy.Schema]
+) -> dict[str, int | str | None]:
+    """Count the rows expected to be inserted, updated, and deleted by a push.
+
+    Compares against the last-pushed state manifest, without connecting to Dolt.
+
+    Has unit test.
+    """
+    float_change_rules = get_float_change_rules(dy_schema)
+    manifest = read_state_manifest(
+        table_name, df, float_change_rules=float_change_rules
+    )
+    if manifest is None:
+        return {
+            "manifest_table_hash": None,
+            "expected_inserted_row_count": None,
+            "expected_updated_row_count": None,
+            "expected_deleted_row_count": None,
+        }
+
+    df_current_hashes, table_hash = manifest
+    primary_key_columns = dy_schema.primary_key()
+    df_keys = compute_row_hashes(df, primary_key_columns).select(primary_key_columns)
+    df_current_keys = df_current_hashes.select(primary_key_columns)
+
+    inserted_row_count = df_keys.join(
+        df_current_keys, on=primary_key_columns, nulls_equal=True, how="anti"
+    ).height
+    changed_row_count = find_changed_rows_by_hash(
+        df,
+        df_current_hashes,
+        primary_key_columns,
+        float_change_rules=float_change_rules,
+    ).height
+    deleted_row_count = (
+        df_current_keys.join(
+            df_keys, on=primary_key_columns, nulls_equal=True, how="anti"
+        ).height
+        if table_name in PRUNED_TABLES
+        else 0
+    )
+    return {
+        "manifest_table_hash": table_hash,
+        "expected_inserted_row_count": inserted_row_count,
+        "expected_updated_row_count": changed_row_count - inserted_row_count,
+        "expected_deleted_row_count": deleted_row_count,
+    }
+
+
+def _write_expected_push_delta_report(df_report: pl.DataFrame) -> None:
+    """Write the report, keeping the rows of tables not written in this call."""
+    if expected_push_delta_path.is_file():
+        df_report = pl.concat(
+            [
+                read_validated_parquet(
+                    expected_push_delta_path, DySchemaExpectedPushDelta
+                ).join(df_report.select("table_name"), on="table_name", how="anti"),
+                df_report,
+            ],
+            how="vertical_relaxed",
+        )
+    df_report = DySchemaExpectedPushDelta.validate(
+        df_report.sort("table_name"), cast=True
+    )
+    write_validated_parquet(
+        df_report, DySchemaExpectedPushDelta, expected_push_delta_path
+    )
+
+
+@metered_step
+def main(
+    tables_to_update: Sequence[TableNameLiteral],
+) -> dy.DataFrame[DySchemaExpectedPushDelta]:
+    """Canonicalize the tables, and report their expected push delta."""
+    logger.info(f"Starting {Path(__file__).name} main()")
+    step_8_output_folder.mkdir(parents=True, exist_ok=True)
+
+    computed_at = datetime.now(UTC)
+    report_rows: list[dict[str, object]] = []
+    for table_name in tables_to_update:
+        (parquet_path, dy_schema) = table_to_path_and_schema[table_name]
+        df_raw = read_validated_parquet(parquet_path, dy_schema)
+        df = dy_schema.validate(canonicalize_frame(df_raw, dy_schema), cast=True)
+        write_validated_parquet(df, dy_schema, get_canonical_parquet_path(table_name))
+
+        canonicalized_row_count = df.join(
+            df_raw, on=df.columns, nulls_equal=True, how="anti"
+        ).height
+        expected_push_delta = get_expected_push_delta(table_name, df, dy_schema)
+        logger.info(
+            f"Canonicalized {table_name}: {df.height:,} rows "
+            f"({canonicalized_row_count:,} changed by canonicalization). "
+            f"Expected push delta: {expected_push_delta}"
+        )
+        report_rows.append(
+            {
+                "table_name": table_name,
+                "computed_at": computed_at,
+                "row_count": df.height,
+                "canonicalized_row_count": canonicalized_row_count,
+                **expected_push_delta,
+            }
+        )
+
+    df_report = pl.DataFrame(
+        report_rows, schema=DySchemaExpectedPushDelta.to_polars_schema()
+    )
+    _write_expected_push_delta_report(df_report)
+    return DySchemaExpectedPushDelta.validate(df_report, cast=True)
+
+
+if __name__ == "__main__":
+    main(
+        [
+            table_name
+            for table_name in sys.argv[1:]
+            if table_name in table_to_path_and_schema
+        ]
+    )
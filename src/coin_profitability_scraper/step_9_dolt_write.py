@@ -2,78 +2,260 @@
 
 import sys
 from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import UTC, datetime
 from pathlib import Path
 
-import backoff
 import polars as pl
-import sqlalchemy
 from loguru import logger
 
-from coin_profitability_scraper import is_dry_run
+from coin_profitability_scraper import (
+    get_dolt_write_branch,
+    is_dry_run,
+    step_8_canonicalize,
+)
+from coin_profitability_scraper.dolt_state_manifest import (
+    read_live_row_hashes,
+    read_verified_state_manifest,
+    write_state_manifest,
+)
 from coin_profitability_scraper.dolt_updater import DoltDatabaseUpdater
-from coin_profitability_scraper.dolt_util import DOLT_REPO_URL, upsert_polars_rows
-from coin_profitability_scraper.tables import TableNameLiteral, table_to_path_and_schema
+from coin_profitability_scraper.dolt_util import (
+    DOLT_REPO_URL,
+    DOLT_WRITE_BRANCH_PREFIX,
+    delete_rows_not_in_polars,
+    get_timestamp_fixup_sql,
+    upsert_polars_rows,
+    write_import_csv,
+)
+from coin_profitability_scraper.dy_util import read_validated_parquet
+from coin_profitability_scraper.float_change_rules import (
+    FloatChangeRule,
+    get_float_change_rules,
+)
+from coin_profitability_scraper.run_metrics import (
+    bind_current_step,
+    metered_step,
+    record_metric,
+)
+from coin_profitability_scraper.step_8_canonicalize import get_canonical_parquet_path
+from coin_profitability_scraper.tables import (
+    PRUNED_TABLES,
+    TABLE_WRITE_STRATEGIES,
+    TableNameLiteral,
+    TableWriteStrategyLiteral,
+    table_to_path_and_schema,
+)
 
+# Tables upserted at the same time, each on its own pooled connection(s).
+MAX_CONCURRENT_TABLES = 4
 
-@backoff.on_exception(
-    backoff.expo,
-    Exception,
-    max_time=60,
-    max_tries=10,
-    on_backoff=lambda x: logger.warning(f"Retrying: {x}"),
-)
-def _push_a_table(table_name: TableNameLiteral) -> None:
-    """Push a single table to DoltHub."""
-    (parquet_path, dy_schema) = table_to_path_and_schema[table_name]
-    with DoltDatabaseUpdater(DOLT_REPO_URL) as dolt:
-        logger.info(f"Loading {table_name}")
-        df = pl.read_parquet(parquet_path)
-        df = dy_schema.validate(df, cast=True)
-        logger.info(f"Loaded {table_name}: {df.shape}")
-        upsert_polars_rows(
+# Limit batch_size for certain very-wide tables.
+_TABLE_BATCH_SIZES: dict[TableNameLiteral, int] = {
+    "miningnow_asics": 1,
+    "wheretomine_coins": 1,
+}
+
+# Split the (single-row) batches of very-wide tables across connections.
+_TABLE_UPSERT_CONNECTIONS: dict[TableNameLiteral, int] = {
+    "miningnow_asics": 4,
+    "wheretomine_coins": 4,
+}
+
+
+@dataclass(kw_only=True)
+class _TableUpsertResult:
+    df: pl.DataFrame
+    df_current_hashes: pl.DataFrame
+    df_delta: pl.DataFrame
+    float_change_rules: dict[str, FloatChangeRule]
+
+
+def _upsert_a_table(
+    dolt: DoltDatabaseUpdater, table_name: TableNameLiteral
+) -> _TableUpsertResult:
+    """Upsert (and maybe prune) a single table, without committing."""
+    (_parquet_path, dy_schema) = table_to_path_and_schema[table_name]
+    logger.info(f"Loading {table_name}")
+    df = read_validated_parquet(get_canonical_parquet_path(table_name), dy_schema)
+    logger.info(f"Loaded {table_name}: {df.shape}")
+    float_change_rules = get_float_change_rules(dy_schema)
+    df_current_hashes = read_verified_state_manifest(
+        dolt.engine,
+        table_name,
+        df,
+        live_table_hash=dolt.get_table_hash(table_name),
+        float_change_rules=float_change_rules,
+    )
+    if df_current_hashes is None:
+        df_current_hashes = read_live_row_hashes(
+            dolt.engine, table_name, df, float_change_rules=float_change_rules
+        )
+    df_delta = upsert_polars_rows(
+        engine=dolt.engine,
+        table_name=table_name,
+        df=df,
+        batch_size=_TABLE_BATCH_SIZES.get(table_name, 500),
+        float_change_rules=float_change_rules,
+        df_current_hashes=df_current_hashes,
+        max_connections=_TABLE_UPSERT_CONNECTIONS.get(table_name, 1),
+    )
+
+    # For certain datasets, also DELETE rows no longer in the upsert content.
+    if table_name in PRUNED_TABLES:
+        deleted_row_count = delete_rows_not_in_polars(
             engine=dolt.engine,
             table_name=table_name,
             df=df,
-            # Limit batch_size for certain very-wide tables.
-            batch_size={"miningnow_asics": 1, "wheretomine_coins": 1}.get(
-                table_name, 500
-            ),
+            df_current_hashes=df_current_hashes,
         )
+        logger.info(f"Pruned {deleted_row_count} rows from {table_name}")
 
-        # For certain datasets, also DELETE rows no longer in the upsert content.
-        if table_name in {"gold_algorithms"}:
-            assert len(dy_schema.primary_key()) == 1, (
-                "Composite primary keys not supported."
+    return _TableUpsertResult(
+        df=df,
+        df_current_hashes=df_current_hashes,
+        df_delta=df_delta,
+        float_change_rules=float_change_rules,
+    )
+
+
+def _import_a_table(
+    dolt: DoltDatabaseUpdater,
+    table_name: TableNameLiteral,
+    *,
+    strategy: TableWriteStrategyLiteral,
+    imported_at: datetime,
+) -> None:
+    """Import a snapshot table with `dolt table import`, without committing."""
+    (_parquet_path, dy_schema) = table_to_path_and_schema[table_name]
+    df = read_validated_parquet(get_canonical_parquet_path(table_name), dy_schema)
+    if strategy == "replace" and df.height == 0:
+        msg = f'Refusing to replace all rows of "{table_name}" (empty DataFrame).'
+        raise ValueError(msg)
+
+    # Imported from CSV, as Dolt can't import the Enum/Categorical Parquet columns.
+    csv_path = get_canonical_parquet_path(table_name).with_suffix(".csv")
+    write_import_csv(df, csv_path, imported_at=imported_at)
+    dolt.import_table(
+        table_name, csv_path, mode="replace" if strategy == "replace" else "update"
+    )
+    dolt.run_sql(
+        get_timestamp_fixup_sql(table_name, df.columns, dy_schema.primary_key())
+    )
+    record_metric("rows_imported", df.height, unit="rows", label=table_name)
+    logger.info(f"Imported {table_name} ({strategy}): {df.height:,} rows")
+
+
+def _push_tables(
+    tables_to_update: Sequence[TableNameLiteral],
+) -> dict[TableNameLiteral, pl.DataFrame]:
+    """Push tables to DoltHub, in a single clone and commit.
+
+    Snapshot tables (see `TABLE_WRITE_STRATEGIES`) are first imported with the Dolt
+    CLI, without SQL round-trips. The other tables are then upserted concurrently,
+    on separate pooled connections. Retries are scoped to the failed phase (clone,
+    SQL batch, or push), so completed work is kept (see `DoltDatabaseUpdater` and
+    `upsert_polars_rows()`).
+
+    Returns the upsert delta of each upserted table (see `upsert_polars_rows()`).
+    """
+    tables_to_import: list[TableNameLiteral] = [
+        table_name
+        for table_name in tables_to_update
+        if TABLE_WRITE_STRATEGIES.get(table_name, "upsert") != "upsert"
+    ]
+    tables_to_upsert: list[TableNameLiteral] = [
+        table_name
+        for table_name in tables_to_update
+        if table_name not in tables_to_import
+    ]
+    concurrent_table_count = max(1, min(len(tables_to_upsert), MAX_CONCURRENT_TABLES))
+    pool_size = concurrent_table_count * max(
+        [1, *(_TABLE_UPSERT_CONNECTIONS.get(t, 1) for t in tables_to_upsert)]
+    )
+    write_branch = get_dolt_write_branch()
+    if write_branch is not None and not write_branch.startswith(
+        DOLT_WRITE_BRANCH_PREFIX
+    ):
+        msg = f"Dolt write branch must start with {DOLT_WRITE_BRANCH_PREFIX}."
+        raise ValueError(msg)
+
+    # The SQL server is only started once the snapshot tables are imported.
+    with DoltDatabaseUpdater(
+        DOLT_REPO_URL,
+        pool_size=pool_size,
+        branch=write_branch,
+        start_sql_server=False,
+    ) as dolt:
+        imported_at = datetime.now(UTC)
+        for table_name in tables_to_import:
+            _import_a_table(
+                dolt,
+                table_name,
+                strategy=TABLE_WRITE_STRATEGIES[table_name],
+                imported_at=imported_at,
             )
-            primary_key_column = dy_schema.primary_key()[0]
-            with dolt.engine.begin() as conn:
-                result = conn.execute(
-                    sqlalchemy.text(
-                        f"DELETE FROM {table_name} "  # noqa: S608
-                        f"WHERE {primary_key_column} NOT IN :ids"
-                    ),
-                    {"ids": tuple(df[primary_key_column].to_list())},
-                )
-                logger.info(f"Pruned {result.rowcount} rows from {table_name}")
 
-        logger.info("Done all upserts.")
+        results: dict[TableNameLiteral, _TableUpsertResult] = {}
+        if tables_to_upsert:
+            dolt.start_sql_server()
+            with ThreadPoolExecutor(max_workers=concurrent_table_count) as executor:
+                futures = {
+                    table_name: executor.submit(
+                        bind_current_step(_upsert_a_table),
+                        dolt,
+                        table_name,
+                    )
+                    for table_name in tables_to_upsert
+                }
+                results = {
+                    table_name: futures[table_name].result()
+                    for table_name in tables_to_upsert
+                }
+        logger.info("Done all imports and upserts.")
 
-        commit_message = f"Auto-updated table: {table_name}"
+        commit_message = f"Auto-updated tables: {', '.join(tables_to_update)}"
         if is_dry_run() is False:
             dolt.dolt_commit_and_push(commit_message=commit_message)
             logger.info("Done commit and push.")
 
+            for table_name, result in results.items():
+                write_state_manifest(
+                    dolt.engine,
+                    table_name,
+                    result.df,
+                    df_previous_hashes=result.df_current_hashes,
+                    df_delta=result.df_delta,
+                    float_change_rules=result.float_change_rules,
+                    table_hash=dolt.get_table_hash(table_name),
+                )
+
+    return {table_name: result.df_delta for table_name, result in results.items()}
 
-def main(tables_to_update: Sequence[TableNameLiteral]) -> None:
-    """Write data to DoltHub database."""
+
+@metered_step
+def main(
+    tables_to_update: Sequence[TableNameLiteral],
+) -> dict[TableNameLiteral, pl.DataFrame]:
+    """Write data to DoltHub database.
+
+    Returns the upsert delta of each upserted table (see `upsert_polars_rows()`).
+    Imported snapshot tables have no delta.
+    """
     logger.info(f"Starting {Path(__file__).name} main()")
 
     logger.info(f"Updating dolt tables: {', '.join(tables_to_update)}")
+    if not tables_to_update:
+        return {}
+
+    # Push the canonical form of each table, to minimize Dolt storage churn.
+    step_8_canonicalize.main(tables_to_update)
 
-    for table_name in tables_to_update:
-        _push_a_table(table_name)
+    table_deltas = _push_tables(tables_to_update)
 
     logger.info(f"Updated dolt tables: {', '.join(tables_to_update)}")
+    return table_deltas
 
 
 if __name__ == "__main__":
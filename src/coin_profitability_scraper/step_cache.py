@@ -0,0 +1,135 @@
+"""Skip pipeline steps whose inputs and code haven't changed since their last run.
+
+A cached step declares its input and output paths. Its fingerprint is a hash of the
+content of all inputs, plus the source code of the step's module (and of the package
+modules it imports from). After a successful run, the fingerprint and a hash of each
+output are stored in a small JSON manifest. The next run is skipped if the
+fingerprint still matches and all outputs are still as written.
+"""
+
+import functools
+import hashlib
+import inspect
+import sys
+from collections.abc import Callable, Sequence
+from pathlib import Path
+from types import ModuleType
+
+import orjson
+from loguru import logger
+
+from coin_profitability_scraper import is_step_cache_disabled
+from coin_profitability_scraper.run_metrics import get_step_name
+
+step_cache_folder = Path("./out/step_cache/")
+
+_PACKAGE_NAME = __name__.split(".")[0]
+
+
+def _hash_path(path: Path) -> str:
+    """Hash a file, or all files in a folder (recursively, with relative paths)."""
+    hasher = hashlib.sha256()
+    if path.is_dir():
+        for file_path in sorted(p for p in path.rglob("*") if p.is_file()):
+            hasher.update(file_path.relative_to(path).as_posix().encode())
+            hasher.update(hashlib.sha256(file_path.read_bytes()).digest())
+    else:
+        hasher.update(path.read_bytes())
+    return hasher.hexdigest()
+
+
+def _get_code_version(func: Callable[[], object]) -> str:
+    """Hash the source of the step's module, and of the package modules it uses."""
+    step_module = sys.modules[func.__module__]
+    modules = {step_module.__name__: step_module}
+    for value in vars(step_module).values():
+        module = value if isinstance(value, ModuleType) else inspect.getmodule(value)
+        if module is not None and module.__name__.startswith(f"{_PACKAGE_NAME}."):
+            modules[module.__name__] = module
+
+    hasher = hashlib.sha256()
+    for module_name, module in sorted(modules.items()):
+        hasher.update(module_name.encode())
+        hasher.update(inspect.getsource(module).encode())
+    return hasher.hexdigest()
+
+
+def compute_step_fingerprint(func: Callable[[], object], inputs: Sequence[Path]) -> str:
+    """Get the fingerprint of a step: its code version and the content of its inputs.
+
+    Raises `FileNotFoundError` if an input doesn't exist.
+
+    Has unit test.
+    """
+    for input_path in inputs:
+        if not input_path.exists():
+            msg = f"Step input not found: {input_path}"
+            raise FileNotFoundError(msg)
+
+    return hashlib.sha256(
+        orjson.dumps(
+            {
+                "code_version": _get_code_version(func),
+                "inputs": {str(path): _hash_path(path) for path in inputs},
+            },
+            option=orjson.OPT_SORT_KEYS,
+        )
+    ).hexdigest()
+
+
+def _is_cache_hit(
+    manifest_path: Path, fingerprint: str, outputs: Sequence[Path]
+) -> bool:
+    if not manifest_path.is_file():
+        return False
+    manifest = orjson.loads(manifest_path.read_bytes())
+    if manifest["fingerprint"] != fingerprint:
+        return False
+    return all(
+        path.exists() and manifest["outputs"].get(str(path)) == _hash_path(path)
+        for path in outputs
+    )
+
+
+def cached_step(
+    *, inputs: Sequence[Path], outputs: Sequence[Path]
+) -> Callable[[Callable[[], None]], Callable[[], None]]:
+    """Decorate a step's `main()` to skip it when its cached outputs are up to date.
+
+    Only use on deterministic steps (e.g., parsing already-scraped files), never on
+    steps that fetch from the network. Set `DISABLE_STEP_CACHE=true` to always run.
+
+    Has unit test.
+    """
+
+    def decorator(func: Callable[[], None]) -> Callable[[], None]:
+        step_name = get_step_name(func)
+
+        @functools.wraps(func)
+        def wrapper() -> None:
+            if is_step_cache_disabled():
+                func()
+                return
+
+            manifest_path = step_cache_folder / f"{step_name}.json"
+            fingerprint = compute_step_fingerprint(func, inputs)
+            if _is_cache_hit(manifest_path, fingerprint, outputs):
+                logger.info(f"Skipping {step_name}: inputs and code are unchanged.")
+                return
+
+            func()
+
+            step_cache_folder.mkdir(parents=True, exist_ok=True)
+            manifest_path.write_bytes(
+                orjson.dumps(
+                    {
+                        "fingerprint": fingerprint,
+                        "outputs": {str(path): _hash_path(path) for path in outputs},
+                    },
+                    option=orjson.OPT_INDENT_2,
+                )
+            )
+
+        return wrapper
+
+    return decorator
@@ -30,6 +30,9 @@ from coin_profitability_scraper.notify import (
     notify_new_gold_algorithms as notify_new_gold_algorithms_module,
 )
 from coin_profitability_scraper.reports import gold_algorithms as gold_algorithms_module
+from coin_profitability_scraper.reports import (
+    silver_coin_entities as silver_coin_entities_module,
+)
 from coin_profitability_scraper.reports import (
     silver_stacked_coins as silver_stacked_coins_module,
 )
@@ -58,6 +61,7 @@ TableNameLiteral = Literal[
     "whattomine_miners",
     "wheretomine_coins",
     "silver_stacked_coins",
+    "silver_coin_entities",
     "silver_stacked_miners",
     "gold_algorithms",
     "notify_log_new_algorithms",
@@ -108,6 +112,10 @@ table_to_path_and_schema: dict[TableNameLiteral, tuple[Path, type[dy.Schema]]] =
         silver_stacked_coins_module.output_folder / "silver_stacked_coins.parquet",
         silver_stacked_coins_module.DySchemaSilverStackedCoins,
     ),
+    "silver_coin_entities": (
+        silver_coin_entities_module.output_folder / "silver_coin_entities.parquet",
+        silver_coin_entities_module.DySchemaSilverCoinEntities,
+    ),
     "silver_stacked_miners": (
         silver_stacked_miners_module.output_folder / "silver_stacked_miners.parquet",
         silver_stacked_miners_module.DySchemaSilverStackedMiners,
@@ -124,3 +132,20 @@ table_to_path_and_schema: dict[TableNameLiteral, tuple[Path, type[dy.Schema]]] =
         notify_new_gold_algorithms_module.DySchemaNotifyLogNewAlgorithms,
     ),
 }
+
+# Tables where rows no longer in the upsert content are also deleted.
+PRUNED_TABLES: set[TableNameLiteral] = {"gold_algorithms"}
+
+TableWriteStrategyLiteral = Literal["upsert", "replace", "append"]
+
+# How each table is written to Dolt (default: "upsert"). Full snapshots are imported
+# with `dolt table import`, instead of being diffed and upserted over SQL:
+# - "replace": Replace the table contents (rows not in the snapshot are deleted).
+# - "append": Insert new rows, and overwrite existing rows by primary key.
+# Imports bypass the float change rules of the upsert (`float_change_rule`), so only
+# tables without such rules should be imported. Scraped tables must not be replaced:
+# that would also delete the rows of coins which dropped out of a scrape (which the
+# silver and gold tables are built from). "append" keeps them, like the upsert.
+TABLE_WRITE_STRATEGIES: dict[TableNameLiteral, TableWriteStrategyLiteral] = {
+    "crypto51_coins": "append",  # All-string snapshot, without float columns.
+}
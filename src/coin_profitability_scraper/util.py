@@ -1,14 +1,19 @@
 """Utility functions for the coin profitability scraper."""
 
+import time
 from datetime import UTC, datetime
 from pathlib import Path
+from urllib.parse import urlparse
 
 import backoff
 import fake_useragent
 import polars as pl
 import requests
+from backoff.types import Details
 from loguru import logger
 
+from coin_profitability_scraper.run_metrics import record_metric
+
 
 def write_tables(df: pl.DataFrame, file_stem: str, output_folder: Path) -> None:
     """Write the DataFrame to CSV and Parquet files."""
@@ -23,19 +28,41 @@ def get_datetime_str() -> str:
     return datetime.now(UTC).strftime("%Y-%m-%d-%H%M%S")
 
 
+def record_http_response_metrics(
+    response: requests.Response, *, elapsed_seconds: float
+) -> None:
+    """Record the request count, bytes downloaded, and duration of an HTTP request."""
+    host = urlparse(response.url).netloc
+    record_metric("http_requests", 1, unit="count", label=host)
+    record_metric(
+        "http_bytes_downloaded", len(response.content), unit="bytes", label=host
+    )
+    record_metric("http_request_time", elapsed_seconds, unit="s", label=host)
+
+
+def record_http_retry(details: Details) -> None:
+    """Log and record a retried HTTP request (as `on_backoff` handler)."""
+    logger.warning(f"Retrying download: {details}")
+    record_metric("http_retries", 1, unit="count")
+
+
 @backoff.on_exception(
     backoff.expo,
     requests.exceptions.RequestException,
     max_time=60,
     max_tries=10,
-    on_backoff=lambda x: logger.warning(f"Retrying download: {x}"),
+    on_backoff=record_http_retry,
 )
 def download_as_bytes(url: str) -> bytes:
     """Download the given URL and return the content as bytes."""
+    start_time = time.perf_counter()
     response = requests.get(
         url,
         headers={"User-Agent": fake_useragent.UserAgent().random},
         timeout=120,
     )
+    record_http_response_metrics(
+        response, elapsed_seconds=time.perf_counter() - start_time
+    )
     response.raise_for_status()
     return response.content
@@ -6,6 +6,7 @@ from pathlib import Path
 import orjson
 from loguru import logger
 
+from coin_profitability_scraper.run_metrics import metered_step
 from coin_profitability_scraper.util import download_as_bytes
 
 step_1_api_data_folder_path = Path("./out/whattomine/step_1_downloaded_coin_pages/")
@@ -22,6 +23,7 @@ def get_whattomine_api_key() -> str:
     return key
 
 
+@metered_step
 def main() -> None:
     """Scrape coin data from API.
 
@@ -9,7 +9,15 @@ import polars as pl
 from dataframely.exc import ValidationError
 from loguru import logger
 
-from coin_profitability_scraper.data_util import pl_df_all_common_str_cleaning
+from coin_profitability_scraper.canonical import dy_json_string
+from coin_profitability_scraper.data_util import (
+    pl_df_all_common_str_cleaning,
+    pl_expr_json_encode,
+)
+from coin_profitability_scraper.dy_util import write_validated_parquet
+from coin_profitability_scraper.float_change_rules import float_change_rule
+from coin_profitability_scraper.run_metrics import metered_step
+from coin_profitability_scraper.step_cache import cached_step
 from coin_profitability_scraper.whattomine.step_1_api_fetch import (
     coins_api_data_json_path,
 )
@@ -32,14 +40,22 @@ class DySchemaWhattomineCoins(dy.Schema):
     is_lagging = dy.Bool(nullable=False)
     is_testing = dy.Bool(nullable=False)
     last_update = dy.Datetime(nullable=False)
-    network_hashrate = dy.Float64(nullable=False)
+    network_hashrate = dy.Float64(
+        nullable=False, metadata=float_change_rule(rel_tolerance=0.01)
+    )
     last_block = dy.Int64(nullable=False)
     block_time = dy.String(nullable=False, min_length=2, max_length=100)
-    market_cap_usd = dy.Float64(nullable=False)
+    market_cap_usd = dy.Float64(
+        nullable=False, metadata=float_change_rule(rel_tolerance=0.01)
+    )
 
     # Extra data.
-    block_reward = dy.Float64(nullable=False)
-    difficulty = dy.Float64(nullable=False)
+    block_reward = dy.Float64(
+        nullable=False, metadata=float_change_rule(rel_tolerance=0.001)
+    )
+    difficulty = dy.Float64(
+        nullable=False, metadata=float_change_rule(rel_tolerance=0.01)
+    )
 
     # Exclude - block_reward24 = dy.Float64(nullable=False)
     # Exclude - block_reward3 = dy.Float64(nullable=False)
@@ -56,7 +72,9 @@ class DySchemaWhattomineCoins(dy.Schema):
     # Detailed price info from a list of exchanges.
     # Note that the units of this data aren't super clear, and some/all may be measured
     # in bitcoins.
-    exchanges_json = dy.String(nullable=False, min_length=2, max_length=10_000)
+    exchanges_json = dy_json_string(
+        nullable=False, min_length=2, max_length=10_000, sort_arrays=True
+    )
 
 
 def load_coin_list_df(coins_api_data: list[dict[str, Any]]) -> pl.DataFrame:
@@ -79,16 +97,7 @@ def load_coin_list_df(coins_api_data: list[dict[str, Any]]) -> pl.DataFrame:
         market_cap_usd=pl.col("market_cap"),
         block_reward=pl.col("block_reward"),
         difficulty=pl.col("difficulty"),
-        exchanges_json=(
-            pl.col("exchanges")
-            .map_elements(
-                lambda list_of_dicts_of_exchanges: orjson.dumps(
-                    list_of_dicts_of_exchanges.to_list()
-                ),
-                return_dtype=pl.Binary,
-            )
-            .cast(pl.String)
-        ),
+        exchanges_json=pl_expr_json_encode(pl.col("exchanges")),
     )
     df = df.sort("market_cap_usd", descending=True, nulls_last=True)
     logger.info(f"Coin List: {df}")
@@ -96,6 +105,8 @@ def load_coin_list_df(coins_api_data: list[dict[str, Any]]) -> pl.DataFrame:
     return df
 
 
+@metered_step
+@cached_step(inputs=[coins_api_data_json_path], outputs=[output_parquet_file])
 def main() -> None:
     """Parse HTML files and extract coin information."""
     logger.info("Starting")
@@ -124,7 +135,7 @@ def main() -> None:
     logger.info("Wrote coin list table.")
 
     step_2_output_folder.mkdir(parents=True, exist_ok=True)
-    df.write_parquet(output_parquet_file)
+    write_validated_parquet(df, DySchemaWhattomineCoins, output_parquet_file)
 
 
 if __name__ == "__main__":
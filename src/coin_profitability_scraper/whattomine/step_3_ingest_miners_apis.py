@@ -10,6 +10,9 @@ from dataframely.exc import ValidationError
 from loguru import logger
 
 from coin_profitability_scraper.data_util import pl_df_all_common_str_cleaning
+from coin_profitability_scraper.dy_util import write_validated_parquet
+from coin_profitability_scraper.run_metrics import metered_step
+from coin_profitability_scraper.step_cache import cached_step
 from coin_profitability_scraper.whattomine.step_1_api_fetch import (
     asics_api_data_json_path,
     gpus_api_data_json_path,
@@ -89,6 +92,11 @@ def load_miner_types_df(
     return df
 
 
+@metered_step
+@cached_step(
+    inputs=[asics_api_data_json_path, gpus_api_data_json_path],
+    outputs=[output_parquet_file],
+)
 def main() -> None:
     """Parse HTML files and extract coin information."""
     logger.info("Starting")
@@ -125,7 +133,7 @@ def main() -> None:
         raise
 
     step_3_output_folder.mkdir(parents=True, exist_ok=True)
-    df.write_parquet(output_parquet_file)
+    write_validated_parquet(df, DySchemaWhattomineMiners, output_parquet_file)
 
     logger.info(f"Wrote miners list table: {df.height:,} miners")
 
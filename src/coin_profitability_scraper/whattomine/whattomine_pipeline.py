@@ -1,6 +1,7 @@
 """Run the whole WhatToMine pipeline."""
 
 from coin_profitability_scraper import step_9_dolt_write
+from coin_profitability_scraper.run_metrics import collect_run_metrics
 from coin_profitability_scraper.whattomine import (
     step_1_api_fetch,
     step_2_ingest_coins_api,
@@ -18,4 +19,5 @@ def main_whattomine_pipeline() -> None:
 
 
 if __name__ == "__main__":
-    main_whattomine_pipeline()
+    with collect_run_metrics("whattomine_pipeline"):
+        main_whattomine_pipeline()
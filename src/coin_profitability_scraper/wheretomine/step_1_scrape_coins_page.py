@@ -10,7 +10,14 @@ import orjson
 import polars as pl
 from loguru import logger
 
-from coin_profitability_scraper.data_util import pl_df_all_common_str_cleaning
+from coin_profitability_scraper.canonical import dy_json_string
+from coin_profitability_scraper.data_util import (
+    pl_df_all_common_str_cleaning,
+    pl_expr_json_encode,
+)
+from coin_profitability_scraper.dy_util import write_validated_parquet
+from coin_profitability_scraper.float_change_rules import float_change_rule
+from coin_profitability_scraper.run_metrics import metered_step
 from coin_profitability_scraper.util import download_as_bytes
 
 _URL = "https://wheretomine.io/page-data/all/page-data.json"
@@ -34,16 +41,34 @@ class DySchemaWheretomineCoins(dy.Schema):
     subpool_count = dy.UInt32(nullable=False)
 
     # Basic numeric stats
-    network_hashrate = dy.Float64(nullable=False)
-    network_difficulty = dy.Float64(nullable=False)
-    block_reward = dy.Float64(nullable=False)
-    block_time = dy.Float64(nullable=False)
+    network_hashrate = dy.Float64(
+        nullable=False, metadata=float_change_rule(rel_tolerance=0.01)
+    )
+    network_difficulty = dy.Float64(
+        nullable=False, metadata=float_change_rule(rel_tolerance=0.01)
+    )
+    block_reward = dy.Float64(
+        nullable=False, metadata=float_change_rule(rel_tolerance=0.001)
+    )
+    block_time = dy.Float64(
+        nullable=False, metadata=float_change_rule(rel_tolerance=0.001)
+    )
     height = dy.Integer(nullable=False)
-    price_btc = dy.Float64(nullable=False)
-    price_usd = dy.Float64(nullable=False)
-    volume_24h = dy.Float64(nullable=False)
-    percentage_change_24h = dy.Float64(nullable=False)
-    market_cap = dy.Float64(nullable=False)
+    price_btc = dy.Float64(
+        nullable=False, metadata=float_change_rule(rel_tolerance=0.01)
+    )
+    price_usd = dy.Float64(
+        nullable=False, metadata=float_change_rule(rel_tolerance=0.01)
+    )
+    volume_24h = dy.Float64(
+        nullable=False, metadata=float_change_rule(rel_tolerance=0.01)
+    )
+    percentage_change_24h = dy.Float64(
+        nullable=False, metadata=float_change_rule(abs_tolerance=0.5)
+    )
+    market_cap = dy.Float64(
+        nullable=False, metadata=float_change_rule(rel_tolerance=0.01)
+    )
 
     # Status and boolean flags
     status = dy.String(nullable=True, min_length=3, max_length=50)
@@ -61,9 +86,12 @@ class DySchemaWheretomineCoins(dy.Schema):
     algorithm_type = dy.String(nullable=False, min_length=2, max_length=100)
     algorithm_slug = dy.String(nullable=False, min_length=2, max_length=100)
 
-    links_json = dy.String(nullable=True, min_length=2, max_length=3000)
+    links_json = dy_json_string(
+        nullable=True, min_length=2, max_length=3000, sort_arrays=True
+    )
 
 
+@metered_step
 def main() -> None:
     """Scrape and parse coins list."""
     wheretomine_step1_output_path.mkdir(parents=True, exist_ok=True)
@@ -123,15 +151,11 @@ def main() -> None:
         algorithm_type=pl.col("algorithm").struct.field("type"),
         algorithm_slug=pl.col("algorithm").struct.field("slug"),
         # JSON string of links. Could flatten/unpivot into "reddit_link", etc.
-        links_json=(
-            pl.col("links")
-            .map_elements(lambda x: orjson.dumps(x.to_list()), return_dtype=pl.Binary)
-            .cast(pl.String)
-        ),
+        links_json=pl_expr_json_encode(pl.col("links")),
     )
 
     df = DySchemaWheretomineCoins.validate(df, cast=True)
-    df.write_parquet(output_parquet_file)
+    write_validated_parquet(df, DySchemaWheretomineCoins, output_parquet_file)
 
     logger.success("Coins list scraping completed.")
 
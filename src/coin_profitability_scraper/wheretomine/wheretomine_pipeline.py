@@ -4,6 +4,7 @@ Note: This pipeline is disabled because wheretomine.io shut down in 2026-05.
 """
 
 from coin_profitability_scraper import step_9_dolt_write
+from coin_profitability_scraper.run_metrics import collect_run_metrics
 from coin_profitability_scraper.wheretomine import step_1_scrape_coins_page
 
 
@@ -15,4 +16,5 @@ def main_wheretomine_pipeline() -> None:
 
 
 if __name__ == "__main__":
-    main_wheretomine_pipeline()
+    with collect_run_metrics("wheretomine_pipeline"):
+        main_wheretomine_pipeline()
@@ -0,0 +1,81 @@
+"""Tests for notify_new_gold_algorithms.py."""
+
+from datetime import UTC, datetime
+from pathlib import Path
+
+import polars as pl
+import pytest
+
+from coin_profitability_scraper.notify import notify_new_gold_algorithms
+from coin_profitability_scraper.notify.notify_new_gold_algorithms import (
+    MAX_NEW_ALGORITHM_NOTIFICATIONS,
+    notify_new_algorithms,
+    select_added_rows,
+)
+from coin_profitability_scraper.notify.ntfy_dispatcher import NtfyDispatcher
+
+
+def test_select_added_rows() -> None:
+    """Test that the latest added version of each row is kept, without `from_`."""
+    df_diff = pl.DataFrame(
+        {
+            "to_algo_name": ["sha256", "kawpow", "kawpow", "scrypt"],
+            "to_asic_count": [3, 0, 1, 5],
+            "to_commit": ["c1", "c1", "c2", "c2"],
+            "to_commit_date": [
+                datetime(2025, 1, 1, tzinfo=UTC),
+                datetime(2025, 1, 1, tzinfo=UTC),
+                datetime(2025, 1, 2, tzinfo=UTC),
+                datetime(2025, 1, 2, tzinfo=UTC),
+            ],
+            "from_algo_name": [None, None, None, "scrypt"],
+            "from_asic_count": [None, None, None, 4],
+            "diff_type": ["added", "added", "added", "modified"],
+        }
+    )
+    df_added = select_added_rows(df_diff).sort("algo_name")
+    assert df_added.columns == ["algo_name", "asic_count"]
+    assert df_added.rows() == [("kawpow", 1), ("sha256", 3)]
+
+
+class _UnsentNtfyDispatcher(NtfyDispatcher):
+    """Keeps the enqueued messages pending, instead of sending them."""
+
+    instances: list["_UnsentNtfyDispatcher"] = []  # noqa: RUF012
+
+    def flush(self) -> int:
+        self.instances.append(self)
+        return 0
+
+
+def test_notify_new_algorithms_burst_is_not_a_digest(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that the intro and each shown algorithm are sent as separate messages."""
+    monkeypatch.setenv("NTFY_TOPIC_NAME", "test_topic")
+    monkeypatch.setattr(notify_new_gold_algorithms, "is_dry_run", lambda: False)
+    monkeypatch.setattr(
+        notify_new_gold_algorithms, "ntfy_outbox_path", tmp_path / "outbox.json"
+    )
+    monkeypatch.setattr(
+        notify_new_gold_algorithms, "NtfyDispatcher", _UnsentNtfyDispatcher
+    )
+    _UnsentNtfyDispatcher.instances = []
+    algo_count = MAX_NEW_ALGORITHM_NOTIFICATIONS + 2
+    df = pl.DataFrame(
+        {
+            "algo_name": [f"algo{i}" for i in range(algo_count)],
+            "duration_since_algo_created": ["a day ago"] * algo_count,
+            "asic_count": [0] * algo_count,
+        }
+    )
+
+    notify_new_algorithms(df)
+
+    [dispatcher] = _UnsentNtfyDispatcher.instances
+    messages = [m.message for m in dispatcher.get_pending_messages()]
+    assert len(messages) == MAX_NEW_ALGORITHM_NOTIFICATIONS + 1
+    assert len(messages) <= dispatcher.max_individual_messages
+    assert messages[0].endswith(
+        f"(only showing first {MAX_NEW_ALGORITHM_NOTIFICATIONS} of {algo_count})"
+    )
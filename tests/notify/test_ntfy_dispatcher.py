@@ -0,0 +1,119 @@
+"""Tests for ntfy_dispatcher.py."""
+
+import threading
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from coin_profitability_scraper.notify.ntfy_dispatcher import (
+    NTFY_MAX_MESSAGE_BYTES,
+    NtfyDispatcher,
+)
+
+
+class _NtfyStandIn(BaseHTTPRequestHandler):
+    """Records posted messages. The first `failures_left` posts fail with a 503."""
+
+    received_messages: list[str] = []  # noqa: RUF012
+    failures_left: int = 0
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers["Content-Length"])).decode()
+        if _NtfyStandIn.failures_left > 0:
+            _NtfyStandIn.failures_left -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+        self.received_messages.append(body)
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        del format, args
+
+
+@pytest.fixture
+def ntfy_stand_in_url() -> Iterator[str]:
+    """Run a local HTTP stand-in for an ntfy topic."""
+    _NtfyStandIn.received_messages = []
+    _NtfyStandIn.failures_left = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _NtfyStandIn)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/test_topic"
+    server.shutdown()
+    server.server_close()
+
+
+def test_flush_retries_and_skips_duplicates(
+    tmp_path: Path, ntfy_stand_in_url: str
+) -> None:
+    """Test retries, the persistent outbox, and idempotency keys."""
+    outbox_path = tmp_path / "outbox.json"
+    dispatcher = NtfyDispatcher(
+        ntfy_stand_in_url, outbox_path=outbox_path, max_tries=3, backoff_factor=0.01
+    )
+    assert dispatcher.enqueue("New algorithm: kawpow", idempotency_key="algo:kawpow")
+    assert dispatcher.enqueue("New algorithm: sha256", idempotency_key="algo:sha256")
+
+    # A restarted process sees the pending messages, and sends them with retries.
+    _NtfyStandIn.failures_left = 2
+    dispatcher = NtfyDispatcher(
+        ntfy_stand_in_url, outbox_path=outbox_path, max_tries=3, backoff_factor=0.01
+    )
+    assert len(dispatcher.get_pending_messages()) == 2  # noqa: PLR2004
+    assert dispatcher.flush() == 2  # noqa: PLR2004
+    assert sorted(_NtfyStandIn.received_messages) == [
+        "New algorithm: kawpow",
+        "New algorithm: sha256",
+    ]
+
+    # The same event is not notified again, even by another process.
+    dispatcher = NtfyDispatcher(ntfy_stand_in_url, outbox_path=outbox_path)
+    assert not dispatcher.enqueue(
+        "New algorithm: kawpow", idempotency_key="algo:kawpow"
+    )
+    assert dispatcher.flush() == 0
+    assert len(_NtfyStandIn.received_messages) == 2  # noqa: PLR2004
+
+
+def test_flush_keeps_failed_messages_pending(
+    tmp_path: Path, ntfy_stand_in_url: str
+) -> None:
+    """Test that messages which still fail after all tries stay in the outbox."""
+    dispatcher = NtfyDispatcher(
+        ntfy_stand_in_url,
+        outbox_path=tmp_path / "outbox.json",
+        max_tries=2,
+        backoff_factor=0.01,
+    )
+    dispatcher.enqueue("New algorithm: kawpow")
+    _NtfyStandIn.failures_left = 2
+    assert dispatcher.flush() == 0
+    assert [m.attempts for m in dispatcher.get_pending_messages()] == [1]
+
+    assert dispatcher.flush() == 1
+    assert dispatcher.get_pending_messages() == []
+
+
+def test_flush_coalesces_bursts_into_digests(
+    tmp_path: Path, ntfy_stand_in_url: str
+) -> None:
+    """Test that a burst is sent as digests, in order, within the size limit."""
+    dispatcher = NtfyDispatcher(
+        ntfy_stand_in_url,
+        outbox_path=tmp_path / "outbox.json",
+        max_individual_messages=3,
+    )
+    messages = [f"Message {idx}: " + "x" * 1000 for idx in range(10)]
+    for message in messages:
+        dispatcher.enqueue(message)
+
+    assert dispatcher.flush() == len(messages)
+    digests = sorted(_NtfyStandIn.received_messages)
+    assert len(digests) == 3  # Of 4, 4, and 2 messages.  # noqa: PLR2004
+    assert all(len(digest.encode()) <= NTFY_MAX_MESSAGE_BYTES for digest in digests)
+    assert digests[0].startswith(messages[0])
+    assert digests[-1].endswith(messages[-1])
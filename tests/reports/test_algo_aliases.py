@@ -1,9 +1,18 @@
 """Test algorithm aliasing operations."""
 
+from collections.abc import Sequence
+from pathlib import Path
+
 import polars as pl
+import pytest
 
+from coin_profitability_scraper.reports import aliases
 from coin_profitability_scraper.reports.aliases import (
+    add_canonical_name_column,
+    add_normalized_algorithm_name_column,
+    normalize_algorithm_names,
     pre_mapping_normalize_algorithm_names,
+    resolve_algorithm_names,
 )
 
 
@@ -33,3 +42,109 @@ def test_pre_mapping_normalize_algorithm_names() -> None:
         print(df_fail)  # noqa: T201
 
     assert len(df_fail) == 0
+
+
+def _reference_name_normalization_map(
+    all_names: Sequence[str | None],
+) -> dict[str | None, str | None]:
+    """Previous dict-based implementation, kept as a reference for equivalence."""
+    df = pl.DataFrame({"name": all_names}, schema={"name": pl.String}).unique()
+    df = df.with_columns(
+        name_normalized=(
+            pl.col("name").str.to_lowercase().str.replace_all(r"[^A-Za-z0-9]", "")
+        )
+    )
+    df = df.group_by("name_normalized").agg(
+        names_in_group=pl.col("name").unique().sort(),
+    )
+    normalization_map: dict[str | None, str | None] = {}
+    for row in df.iter_rows(named=True):
+        canonical_name = row["names_in_group"][0]
+        for name in row["names_in_group"]:
+            if canonical_name not in {None, ""}:
+                normalization_map[name] = canonical_name
+            else:
+                normalization_map[name] = name
+    return normalization_map
+
+
+def test_add_canonical_name_column_matches_reference() -> None:
+    """Test `add_canonical_name_column()` against the previous implementation."""
+    names = [
+        "Bitcoin",
+        "bitcoin",
+        "BIT-coin",
+        "Monero",
+        "monero!",
+        "Ravencoin",
+        "???",
+        "比特币",  # Non-alphanumeric names all share the "" boring form.
+        "以太坊",
+        None,
+        "Bitcoin",  # Repeated.
+        "Zcash",
+    ]
+    df = pl.DataFrame({"name": names})
+
+    result = add_canonical_name_column(
+        df.lazy(), name_col="name", canonical_name_col="canonical_name"
+    ).collect()
+
+    expected_map = _reference_name_normalization_map(names)
+    assert result["name"].to_list() == names  # Order and rows are preserved.
+    assert result["canonical_name"].to_list() == [expected_map[n] for n in names]
+    assert result["canonical_name"].to_list()[:3] == ["BIT-coin"] * 3
+
+
+def test_resolve_algorithm_names_caches(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that `resolve_algorithm_names()` matches the expression, and caches."""
+    monkeypatch.setattr(aliases, "algorithm_name_cache_folder", tmp_path)
+    names = pl.Series(["Cryptonight V7", "SHA256", None, "SHA256", "Blake2b Sha3"])
+
+    df_map = resolve_algorithm_names(names)
+    assert sorted(df_map["reported_algo_name"].to_list(), key=str) == sorted(
+        set(names.to_list()), key=str
+    )
+    assert df_map.equals(
+        df_map.with_columns(
+            algo_name=normalize_algorithm_names(pl.col("reported_algo_name"))
+        )
+    )
+    assert len(list(tmp_path.glob("algorithm_name_cache_*.parquet"))) == 1
+
+    # Only new names are resolved. Cached results are re-used as-is.
+    cache_path = next(tmp_path.glob("algorithm_name_cache_*.parquet"))
+    pl.DataFrame(
+        {"reported_algo_name": ["SHA256"], "algo_name": ["cached"]}
+    ).write_parquet(cache_path)
+    df_map = resolve_algorithm_names(pl.Series(["SHA256", "KAWPOW"]))
+    assert dict(df_map.iter_rows()) == {"SHA256": "cached", "KAWPOW": "KawPow"}
+
+
+def test_add_normalized_algorithm_name_column_stays_lazy(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that the source is only read when the returned plan is collected."""
+    monkeypatch.setattr(aliases, "algorithm_name_cache_folder", tmp_path)
+    source_reads: list[int] = []
+
+    def read_source() -> pl.DataFrame:
+        source_reads.append(1)
+        return pl.DataFrame({"reported": ["SHA256", "Kaw Pow", None, "SHA256"]})
+
+    lf = add_normalized_algorithm_name_column(
+        pl.defer(read_source, schema={"reported": pl.String}),
+        reported_algo_name_col="reported",
+        algo_name_col="normalized",
+    )
+    assert source_reads == []
+
+    df = lf.collect()
+    assert df.rows() == [
+        ("SHA256", "SHA-256"),
+        ("Kaw Pow", "KawPow"),
+        (None, None),
+        ("SHA256", "SHA-256"),
+    ]
@@ -0,0 +1,36 @@
+"""Tests for alias_suggestions.py."""
+
+from coin_profitability_scraper.reports.alias_suggestions import (
+    suggest_algorithm_aliases,
+)
+
+
+def test_suggest_algorithm_aliases() -> None:
+    """Test that near-duplicates are suggested and ranked, and distinct ones aren't."""
+    df = suggest_algorithm_aliases(
+        [
+            "SHA-256",
+            "SHA256",
+            "Blake2b Sha3",
+            "SHA3 Blake2b",
+            "Cuckatoo31",
+            "Cuckatoo32",
+            "X16R",
+            "X16Rv2",
+            "Scrypt",
+            "Ethash",
+            "X11",
+        ]
+    )
+    pairs = {
+        frozenset((row["standard_name"], row["alias"])): row["reason"]
+        for row in df.iter_rows(named=True)
+    }
+
+    assert pairs == {
+        frozenset(("SHA-256", "SHA256")): "same when lowercased and stripped",
+        frozenset(("Blake2b Sha3", "SHA3 Blake2b")): "same tokens, reordered",
+        frozenset(("X16R", "X16Rv2")): "differ by version suffix",
+    }
+    assert frozenset(("Cuckatoo31", "Cuckatoo32")) not in pairs
+    assert df["score"].is_sorted(descending=True)
@@ -0,0 +1,123 @@
+"""Tests for gold_algorithms.py."""
+
+import datetime as dt
+
+import dataframely as dy
+import polars as pl
+
+from coin_profitability_scraper.reports.gold_algorithms import (
+    DySchemaGoldAlgorithms,
+    _compute_gold_algorithms,  # pyright: ignore[reportPrivateUsage]
+    _patch_gold_algorithms,  # pyright: ignore[reportPrivateUsage]
+    _transform_coin_list_to_gold_algorithms,  # pyright: ignore[reportPrivateUsage]
+)
+from coin_profitability_scraper.reports.silver_coin_entities import (
+    resolve_coin_entities,
+)
+from coin_profitability_scraper.reports.silver_stacked_coins import (
+    DySchemaSilverStackedCoins,
+)
+from coin_profitability_scraper.reports.silver_stacked_miners import (
+    DySchemaSilverStackedMiners,
+)
+
+
+def test_reported_aliases_json_is_not_empty_list() -> None:
+    """Test the `reported_aliases_json_is_not_empty_list` rule."""
+    df = pl.DataFrame(
+        {"reported_aliases_json": ['["SHA256"]', "[]", '["Scrypt","scrypt"]']}
+    )
+
+    rules = DySchemaGoldAlgorithms._schema_validation_rules()  # pyright: ignore[reportPrivateUsage]  # noqa: SLF001
+    rule = rules["reported_aliases_json_is_not_empty_list"]
+    result = df.select(rule.expr).to_series()
+
+    assert result.to_list() == [True, False, True]
+
+
+def _make_silver_stacked_coins(
+    df: pl.DataFrame,
+) -> dy.DataFrame[DySchemaSilverStackedCoins]:
+    """Fill in the columns not given in `df` with placeholder values."""
+    placeholders = {
+        "coin_name": pl.col("coin_unique_source_id"),
+        "reported_coin_name": pl.col("coin_unique_source_id"),
+        "algo_name": pl.lit("SHA256"),
+        "reported_algo_name": pl.col("algo_name"),
+        "source_table": pl.col("source_site") + "_coins",
+        "coin_url": pl.lit(None, pl.String),
+        "coin_symbol": pl.lit(None, pl.String),
+        "market_cap_usd": pl.lit(None, pl.UInt64),
+        "volume_24h_usd": pl.lit(None, pl.UInt64),
+        "founded_date": pl.lit(None, pl.Date),
+        "coin_created_at": pl.lit(dt.datetime(2025, 1, 1)),  # noqa: DTZ001
+    }
+    for col, expr in placeholders.items():
+        if col not in df.columns:
+            df = df.with_columns(expr.alias(col))
+    return DySchemaSilverStackedCoins.validate(df, cast=True)
+
+
+def test_transform_coin_list_dedupes_coin_entities() -> None:
+    """Test that coins reported by several sources are counted and summed once."""
+    df_coins = _make_silver_stacked_coins(
+        pl.DataFrame(
+            {
+                "source_site": ["crypto51", "miningnow", "miningnow"],
+                "coin_unique_source_id": ["Bitcoin", "Bitcoin", "Bitcoin Cash"],
+                "market_cap_usd": [100, 200, 50],
+            }
+        )
+    )
+
+    df = _transform_coin_list_to_gold_algorithms(  # pyright: ignore[reportPrivateUsage]
+        df_coins, resolve_coin_entities(df_coins)
+    )
+
+    assert df["coin_count"].to_list() == [2]
+    assert df["market_cap_usd"].to_list() == [150 + 50]
+
+
+def test_patch_gold_algorithms_matches_full_recompute() -> None:
+    """Test that recomputing only the affected algorithms equals a full recompute."""
+    df_coins_before = _make_silver_stacked_coins(
+        pl.DataFrame(
+            {
+                "source_site": ["crypto51", "crypto51", "miningnow"],
+                "coin_unique_source_id": ["Bitcoin", "Litecoin", "Dogecoin"],
+                "algo_name": ["SHA256", "Scrypt", "Scrypt"],
+                "market_cap_usd": [100, 20, 10],
+            }
+        )
+    )
+    # Dogecoin moves from Scrypt to a new algorithm.
+    df_coins_after = _make_silver_stacked_coins(
+        df_coins_before.with_columns(
+            algo_name=pl.when(pl.col("coin_unique_source_id") == "Dogecoin")
+            .then(pl.lit("X11"))
+            .otherwise(pl.col("algo_name").cast(pl.String))
+        ).drop("reported_algo_name")
+    )
+    df_miners = DySchemaSilverStackedMiners.create_empty()
+
+    def compute(
+        df_coins: dy.DataFrame[DySchemaSilverStackedCoins],
+    ) -> dy.DataFrame[DySchemaGoldAlgorithms]:
+        return _compute_gold_algorithms(  # pyright: ignore[reportPrivateUsage]
+            df_coins, resolve_coin_entities(df_coins), df_miners
+        )
+
+    affected_algo_names = ["Scrypt", "X11"]
+    df_patched = _patch_gold_algorithms(  # pyright: ignore[reportPrivateUsage]
+        compute(df_coins_before),
+        compute(
+            _make_silver_stacked_coins(
+                df_coins_after.filter(
+                    pl.col("algo_name").cast(pl.String).is_in(affected_algo_names)
+                )
+            )
+        ),
+        affected_algo_names,
+    )
+
+    assert df_patched.equals(compute(df_coins_after).sort("algo_name"))
@@ -0,0 +1,75 @@
+"""Tests for silver_coin_entities.py."""
+
+import datetime as dt
+
+import polars as pl
+
+from coin_profitability_scraper.reports.silver_coin_entities import (
+    resolve_coin_entities,
+)
+from coin_profitability_scraper.reports.silver_stacked_coins import (
+    DySchemaSilverStackedCoins,
+)
+
+
+def test_resolve_coin_entities() -> None:
+    """Test linking by name, by symbol+algorithm, transitively, and splits."""
+    rows = [
+        # Columns: source_site, id, coin_name, coin_symbol, and algo_name.
+        ("crypto51", "Bitcoin", "Bitcoin", "BTC", "SHA256"),
+        ("miningnow", "Bitcoin", "Bitcoin", "btc", "SHA256"),
+        ("whattomine", "1-BTC", "BTC", "BTC", "SHA256"),  # Linked by symbol.
+        ("minerstat", "xmr", "XMR", "XMR", "RandomX"),
+        ("crypto51", "Monero", "Monero", "XMR", "RandomX"),
+        ("wheretomine", "monero", "monero", None, None),  # Linked via name only.
+        # Same name, different algorithms: not linked.
+        ("crypto51", "Ghost", "Ghost", None, "X11"),
+        ("miningnow", "Ghost", "Ghost", None, "Scrypt"),
+        # Same symbol, different algorithms: not linked.
+        ("crypto51", "Other", "Other", "BTC", "Scrypt"),
+    ]
+    df_coins = DySchemaSilverStackedCoins.validate(
+        pl.DataFrame(
+            rows,
+            schema=[
+                "source_site",
+                "coin_unique_source_id",
+                "coin_name",
+                "coin_symbol",
+                "algo_name",
+            ],
+            orient="row",
+        ).with_columns(
+            reported_coin_name=pl.col("coin_name"),
+            reported_algo_name=pl.col("algo_name"),
+            source_table=pl.col("source_site") + "_coins",
+            coin_url=pl.lit(None, pl.String),
+            market_cap_usd=pl.lit(None, pl.UInt64),
+            volume_24h_usd=pl.lit(None, pl.UInt64),
+            founded_date=pl.lit(None, pl.Date),
+            coin_created_at=pl.lit(dt.datetime(2025, 1, 1)),  # noqa: DTZ001
+        ),
+        cast=True,
+    )
+
+    df = resolve_coin_entities(df_coins)
+
+    entities = {
+        (row["source_site"], row["coin_unique_source_id"]): row["coin_entity_id"]
+        for row in df.iter_rows(named=True)
+    }
+    assert entities == {
+        ("crypto51", "Bitcoin"): "crypto51:Bitcoin",
+        ("miningnow", "Bitcoin"): "crypto51:Bitcoin",
+        ("whattomine", "1-BTC"): "crypto51:Bitcoin",
+        ("minerstat", "xmr"): "crypto51:Monero",
+        ("crypto51", "Monero"): "crypto51:Monero",
+        ("wheretomine", "monero"): "crypto51:Monero",
+        ("crypto51", "Ghost"): "crypto51:Ghost",
+        ("miningnow", "Ghost"): "miningnow:Ghost",
+        ("crypto51", "Other"): "crypto51:Other",
+    }
+
+    df_monero = df.filter(pl.col("coin_entity_id") == "crypto51:Monero")
+    assert df_monero["coin_entity_record_count"].unique().to_list() == [3]
+    assert df_monero["coin_entity_symbol"].unique().to_list() == ["XMR"]
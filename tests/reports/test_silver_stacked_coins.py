@@ -0,0 +1,188 @@
+"""Tests for silver_stacked_coins.py."""
+
+import datetime as dt
+import re
+from pathlib import Path
+
+import polars as pl
+import pytest
+
+from coin_profitability_scraper.reports import aliases, silver_stacked_coins
+from coin_profitability_scraper.reports.aliases import normalize_algorithm_names
+from coin_profitability_scraper.reports.silver_stacked_coins import (
+    DySchemaSilverStackedCoins,
+    _silver_stacked_coins,  # pyright: ignore[reportPrivateUsage]
+)
+
+_CREATED_AT = dt.datetime(2025, 1, 1)  # noqa: DTZ001
+
+# Rows of the sources with data. The other sources are empty.
+_SOURCE_ROWS: dict[str, dict[str, list[object]]] = {
+    "crypto51_coins": {
+        "coin_name": ["Bitcoin", "Monero"],
+        "coin_symbol": ["BTC", "XMR"],
+        "algorithm": ["SHA256", "RandomX"],
+        "url": ["https://crypto51.app/coins/BTC.html", None],
+    },
+    "miningnow_coins": {
+        "coin_name": ["BITCOIN", "Ravencoin"],
+        "coin_slug": ["bitcoin", "ravencoin"],
+        "ticker": ["BTC", "RVN"],
+        "algorithm": ["SHA-256", "Kaw Pow"],
+        "market_cap_usd": [2_000_000, 300],
+        "volume_usd": [10_000, None],
+        "founded_date": [dt.date(2009, 1, 3), None],
+    },
+    "whattomine_coins": {
+        "whattomine_id": [1, 234],
+        "coin_name": ["bitcoin", "Ravencoin"],
+        "tag": ["BTC", "RVN"],
+        "algorithm": ["SHA-256", "KawPow"],
+        "market_cap_usd": [1_999_999.6, 301.2],
+    },
+}
+
+_SOURCE_SCHEMAS: dict[str, dict[str, pl.DataType]] = {
+    "crypto51_coins": {
+        "coin_name": pl.String(),
+        "coin_symbol": pl.String(),
+        "algorithm": pl.String(),
+        "url": pl.String(),
+    },
+    "cryptodelver_coins": {
+        "coin_slug": pl.String(),
+        "coin_name": pl.String(),
+        "algo_name": pl.String(),
+        "market_cap_usd": pl.Int64(),
+        "volume_usd": pl.Int64(),
+        "coin_url": pl.String(),
+    },
+    "cryptoslate_coins": {
+        "coin_slug": pl.String(),
+        "coin_name": pl.String(),
+        "hash_algo": pl.String(),
+        "market_cap_usd": pl.Int64(),
+        "url": pl.String(),
+        "earliest_logo_date": pl.Date(),
+        "earliest_year_in_description": pl.Int32(),
+    },
+    "minerstat_coins": {
+        "coin_slug": pl.String(),
+        "reported_algorithm": pl.String(),
+        "volume_usd": pl.Int64(),
+        "reported_founded": pl.String(),
+    },
+    "miningnow_coins": {
+        "coin_name": pl.String(),
+        "coin_slug": pl.String(),
+        "ticker": pl.String(),
+        "algorithm": pl.String(),
+        "market_cap_usd": pl.Int64(),
+        "volume_usd": pl.Int64(),
+        "founded_date": pl.Date(),
+    },
+    "whattomine_coins": {
+        "whattomine_id": pl.Int64(),
+        "coin_name": pl.String(),
+        "tag": pl.String(),
+        "algorithm": pl.String(),
+        "market_cap_usd": pl.Float64(),
+    },
+    "wheretomine_coins": {
+        "coin_name": pl.String(),
+        "coin_slug": pl.String(),
+        "coin_abbreviation": pl.String(),
+        "algorithm_name": pl.String(),
+        "market_cap": pl.Float64(),
+        "volume_24h": pl.Float64(),
+    },
+}
+
+
+def _build_eagerly(folder: Path) -> pl.DataFrame:
+    """Build the stacked coins of the non-empty sources eagerly, step by step."""
+    df = pl.concat(
+        [
+            pl.read_parquet(folder / "src_crypto51_coins.parquet").select(
+                source_site=pl.lit("crypto51"),
+                source_table=pl.lit("crypto51_coins"),
+                coin_unique_source_id=pl.col("coin_name"),
+                reported_coin_name=pl.col("coin_name"),
+                coin_symbol=pl.col("coin_symbol"),
+                reported_algo_name=pl.col("algorithm"),
+                market_cap_usd=pl.lit(None, pl.Int64),
+                volume_24h_usd=pl.lit(None, pl.Int64),
+                coin_url=pl.col("url"),
+                founded_date=pl.lit(None, pl.Date),
+                coin_created_at=pl.col("created_at"),
+            ),
+            pl.read_parquet(folder / "src_miningnow_coins.parquet").select(
+                source_site=pl.lit("miningnow"),
+                source_table=pl.lit("miningnow_coins"),
+                coin_unique_source_id=pl.col("coin_name"),
+                reported_coin_name=pl.col("coin_name"),
+                coin_symbol=pl.col("ticker"),
+                reported_algo_name=pl.col("algorithm"),
+                market_cap_usd=pl.col("market_cap_usd"),
+                volume_24h_usd=pl.col("volume_usd"),
+                coin_url="https://miningnow.com/coins/" + pl.col("coin_slug") + "/",
+                founded_date=pl.col("founded_date"),
+                coin_created_at=pl.col("created_at"),
+            ),
+            pl.read_parquet(folder / "src_whattomine_coins.parquet").select(
+                source_site=pl.lit("whattomine"),
+                source_table=pl.lit("whattomine_coins"),
+                coin_unique_source_id=(
+                    pl.col("whattomine_id").cast(pl.String) + "-" + pl.col("coin_name")
+                ),
+                reported_coin_name=pl.col("coin_name"),
+                coin_symbol=pl.col("tag"),
+                reported_algo_name=pl.col("algorithm"),
+                market_cap_usd=pl.col("market_cap_usd").round().cast(pl.Int64),
+                volume_24h_usd=pl.lit(None, pl.Int64),
+                coin_url="https://whattomine.com/coins/"
+                + pl.col("whattomine_id").cast(pl.String),
+                founded_date=pl.lit(None, pl.Date),
+                coin_created_at=pl.col("created_at"),
+            ),
+        ]
+    )
+
+    # Canonical name: the first name (sorted) with the same boring form.
+    names_by_boring_name: dict[str, list[str]] = {}
+    for name in df["reported_coin_name"].unique().sort():
+        boring_name = re.sub(r"[^A-Za-z0-9]", "", name.lower())
+        names_by_boring_name.setdefault(boring_name, []).append(name)
+    coin_name_map = {
+        name: names[0] for names in names_by_boring_name.values() for name in names
+    }
+
+    df = df.with_columns(
+        coin_name=pl.col("reported_coin_name").replace_strict(coin_name_map),
+        algo_name=normalize_algorithm_names(pl.col("reported_algo_name")),
+    )
+    return DySchemaSilverStackedCoins.validate(df, cast=True)
+
+
+def test_silver_stacked_coins_matches_eager_build(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that the lazy, streaming plan matches an eager build of the sources."""
+    monkeypatch.setattr(silver_stacked_coins, "output_folder", tmp_path)
+    monkeypatch.setattr(aliases, "algorithm_name_cache_folder", tmp_path / "aliases")
+    for table_name, schema in _SOURCE_SCHEMAS.items():
+        pl.DataFrame(_SOURCE_ROWS.get(table_name, {}), schema=schema).with_columns(
+            created_at=pl.lit(_CREATED_AT)
+        ).write_parquet(tmp_path / f"src_{table_name}.parquet")
+
+    df_lazy = _silver_stacked_coins()
+    df_eager = _build_eagerly(tmp_path)
+
+    primary_key = DySchemaSilverStackedCoins.primary_key()
+    assert df_lazy.height == 6  # noqa: PLR2004
+    assert df_lazy.sort(primary_key).equals(df_eager.sort(primary_key))
+    assert sorted(df_lazy["coin_name"].unique()) == [
+        "BITCOIN",
+        "Monero",
+        "Ravencoin",
+    ]
@@ -0,0 +1,97 @@
+"""Tests for benchmark.py."""
+
+from collections.abc import Callable
+from pathlib import Path
+
+import polars as pl
+
+from coin_profitability_scraper.benchmark import (
+    BenchmarkCase,
+    compare_to_baseline,
+    run_benchmarks,
+)
+
+
+def test_run_benchmarks_reads_fixtures_folder(tmp_path: Path) -> None:
+    """Test that cases resolve relative paths in the fixtures folder."""
+    fixture_path = Path("./out/source/step_1/data.txt")
+    (tmp_path / fixture_path).parent.mkdir(parents=True)
+    (tmp_path / fixture_path).write_text("a\nb\nc")
+
+    def _prepare_count_lines() -> Callable[[], int]:
+        text = fixture_path.read_text()
+        return lambda: len(text.splitlines())
+
+    df_results = run_benchmarks(
+        [
+            BenchmarkCase(
+                name="count_lines",
+                fixture_paths=(fixture_path,),
+                prepare=_prepare_count_lines,
+            ),
+            BenchmarkCase(
+                name="missing_fixture",
+                fixture_paths=(Path("./out/missing.txt"),),
+                prepare=_prepare_count_lines,
+            ),
+        ],
+        fixtures_folder=tmp_path,
+        repeats=2,
+    )
+
+    assert df_results["case_name"].to_list() == ["count_lines"]
+    assert df_results["item_count"].to_list() == [3]
+    assert (df_results["items_per_second"] > 0).all()
+
+
+def test_run_benchmarks_discards_outputs_and_caches(tmp_path: Path) -> None:
+    """Test that outputs don't land in the fixtures, and each repeat runs cold."""
+    fixture_path = Path("./out/source/step_1/data.txt")
+    (tmp_path / fixture_path).parent.mkdir(parents=True)
+    (tmp_path / fixture_path).write_text("a\nb\nc")
+    cache_path = Path("./out/cache/")
+    cache_hits: list[bool] = []
+
+    def _prepare_cached_count_lines() -> Callable[[], int]:
+        def run() -> int:
+            cache_hits.append(cache_path.exists())
+            cache_path.mkdir(parents=True, exist_ok=True)
+            Path("./out/failures.parquet").write_bytes(b"")
+            return len(fixture_path.read_text().splitlines())
+
+        return run
+
+    run_benchmarks(
+        [
+            BenchmarkCase(
+                name="cached_count_lines",
+                fixture_paths=(fixture_path,),
+                prepare=_prepare_cached_count_lines,
+                cache_paths=(cache_path,),
+            ),
+        ],
+        fixtures_folder=tmp_path,
+        repeats=3,
+    )
+
+    assert cache_hits == [False, False, False]
+    assert sorted(p.relative_to(tmp_path) for p in tmp_path.rglob("*.*")) == [
+        fixture_path
+    ]
+
+
+def test_compare_to_baseline() -> None:
+    """Test that only cases slower than the tolerance are regressions."""
+    df_results = pl.DataFrame(
+        {
+            "case_name": ["fast", "slow", "new"],
+            "item_count": [10, 10, 10],
+            "best_seconds": [1.1, 2.0, 1.0],
+            "items_per_second": [9.1, 5.0, 10.0],
+        }
+    )
+
+    df = compare_to_baseline(df_results, {"fast": 1.0, "slow": 1.0}, tolerance=0.25)
+
+    assert df["is_regression"].to_list() == [False, True, False]
+    assert df["slowdown"].to_list() == [1.1, 2.0, None]
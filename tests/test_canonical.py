@@ -0,0 +1,55 @@
+"""Tests for canonical.py."""
+
+import dataframely as dy
+import polars as pl
+
+from coin_profitability_scraper.canonical import (
+    canonical_json_string,
+    canonicalize_frame,
+    dy_json_string,
+)
+
+
+class _DySchemaExample(dy.Schema):
+    coin_id = dy.String(primary_key=True)
+    links_json = dy_json_string(
+        nullable=True, min_length=2, max_length=1000, sort_arrays=True
+    )
+    path_json = dy_json_string(
+        nullable=True, min_length=2, max_length=1000, sort_arrays=False
+    )
+    price = dy.Float64(nullable=True)
+
+
+def test_canonical_json_string() -> None:
+    """Test that key order, array order (if a set), and float form are canonical."""
+    assert (
+        canonical_json_string(
+            '[{"url": "b", "kind": "x"}, {"kind": "a", "rate": 1.50}]',
+            sort_arrays=True,
+        )
+        == '[{"kind":"a","rate":1.5},{"kind":"x","url":"b"}]'
+    )
+    assert canonical_json_string('["b", "a"]', sort_arrays=False) == '["b","a"]'
+
+
+def test_canonicalize_frame() -> None:
+    """Test that frames are sorted by key, with canonical JSON and float zeros."""
+    df = pl.DataFrame(
+        {
+            "coin_id": ["Zcash", "Bitcoin", "Monero"],
+            "links_json": ['["b","a"]', None, '["b","a"]'],
+            "path_json": ['["b","a"]', '{"z":1,"a":2}', None],
+            "price": [-0.0, 1.0, None],
+        }
+    )
+
+    df_canonical = canonicalize_frame(df, _DySchemaExample)
+
+    assert df_canonical.to_dict(as_series=False) == {
+        "coin_id": ["Bitcoin", "Monero", "Zcash"],
+        "links_json": [None, '["a","b"]', '["a","b"]'],
+        "path_json": ['{"a":2,"z":1}', None, '["b","a"]'],
+        "price": [1.0, None, 0.0],
+    }
+    assert str(df_canonical["price"][2]) == "0.0"  # Not "-0.0".
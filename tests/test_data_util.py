@@ -0,0 +1,32 @@
+"""Tests for data_util.py."""
+
+import orjson
+import polars as pl
+
+from coin_profitability_scraper.data_util import pl_expr_json_encode
+
+
+def test_pl_expr_json_encode_matches_orjson() -> None:
+    """Test that `pl_expr_json_encode()` is byte-identical to `orjson.dumps()`."""
+    df = pl.DataFrame(
+        {
+            "str_list": [["a", "b"], [], None, ['é"\\\n/\t\x01 ☃', "1e5"]],
+            "struct_list": [
+                [{"name": "A", "price": 1e-5, "volume": 1e20, "count": 3}],
+                [{"name": "B,1e5", "price": 0.1 + 0.2, "volume": None, "count": None}],
+                [],
+                None,
+            ],
+            "float_list": [[1.0, 1e16, -2.5e300], [float("nan")], [1e-7], None],
+        }
+    )
+
+    for col in df.columns:
+        expected = (
+            df[col]
+            .map_elements(lambda x: orjson.dumps(x.to_list()), return_dtype=pl.Binary)
+            .cast(pl.String)
+        )
+        result = df.select(pl_expr_json_encode(pl.col(col))).to_series()
+
+        assert result.to_list() == expected.to_list(), col
@@ -0,0 +1,173 @@
+"""Tests for dolt_reader.py."""
+
+import threading
+from collections.abc import Iterator, Sequence
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import orjson
+import polars as pl
+import pytest
+
+from coin_profitability_scraper.dolt_reader import (
+    DoltHubApiBackend,
+    DoltReadBackend,
+    LocalFileBackend,
+    read_dolt_tables,
+    read_table_csv,
+)
+
+
+def test_read_table_csv_keeps_string_columns_verbatim() -> None:
+    """Test that date-like and zero-padded string columns are not inferred."""
+    content = (
+        b"asic_slug,asic_id,algo_id,hash_rate,price_index_enable,"
+        b"reported_created_at,launch_date,created_at\n"
+        b"s19,007,0042,110.5,1,2023-10-01T12:34:56.000Z,2023-10-01,"
+        b"2025-01-02 03:04:05\n"
+        b"l7,12,,9.5,0,,,2025-01-03 00:00:00\n"
+    )
+    df = read_table_csv(content, "miningnow_asics")
+
+    assert df["asic_id"].to_list() == ["007", "12"]
+    assert df["algo_id"].to_list() == ["0042", None]
+    assert df["reported_created_at"].to_list() == ["2023-10-01T12:34:56.000Z", None]
+    assert df["launch_date"].to_list() == ["2023-10-01", None]
+    assert df["hash_rate"].to_list() == [110.5, 9.5]
+    assert df["price_index_enable"].to_list() == [True, False]
+    assert df["created_at"].to_list() == [
+        datetime(2025, 1, 2, 3, 4, 5),  # noqa: DTZ001
+        datetime(2025, 1, 3),  # noqa: DTZ001
+    ]
+
+
+class _FailingBackend(DoltReadBackend):
+    name = "failing"
+
+    def estimate_cost(
+        self, table_names: Sequence[str], commit: str | None
+    ) -> float | None:
+        del table_names, commit
+        return -1  # Cheapest, so that it's tried first.
+
+    def read_tables(
+        self, table_names: Sequence[str], commit: str | None
+    ) -> dict[str, pl.DataFrame]:
+        del table_names, commit
+        msg = "Backend is down."
+        raise ConnectionError(msg)
+
+
+def test_read_dolt_tables_picks_cheapest_backend(tmp_path: Path) -> None:
+    """Test backend selection by cost, and the fallback when a backend fails."""
+    pl.DataFrame({"algo_name": ["sha256"]}).write_parquet(
+        tmp_path / "gold_algorithms.parquet"
+    )
+    api_backend = DoltHubApiBackend(
+        base_url="http://127.0.0.1:9",  # Unreachable, so it must not be used.
+        cache_folder=tmp_path / "cache",
+    )
+    local_backend = LocalFileBackend(tmp_path)
+
+    tables = read_dolt_tables(
+        ["gold_algorithms"], backends=[api_backend, local_backend]
+    )
+    assert tables["gold_algorithms"]["algo_name"].to_list() == ["sha256"]
+
+    tables = read_dolt_tables(
+        ["gold_algorithms"], backends=[_FailingBackend(), local_backend]
+    )
+    assert tables["gold_algorithms"]["algo_name"].to_list() == ["sha256"]
+
+    # A missing file can't be served by the local backend.
+    with pytest.raises(ValueError, match="No Dolt read backend"):
+        read_dolt_tables(["missing_table"], backends=[local_backend])
+
+
+class _DoltHubStandIn(BaseHTTPRequestHandler):
+    """Serves the head commit (SQL API), and CSV tables with an ETag.
+
+    Records each request's path and conditional header.
+    """
+
+    head_commit: str = "c1"
+    received_requests: list[tuple[str, str | None]] = []  # noqa: RUF012
+
+    def do_GET(self) -> None:
+        etag = self.headers.get("If-None-Match")
+        self.received_requests.append((self.path.split("?")[0], etag))
+        if self.path.startswith("/api/v1alpha1/"):
+            body = orjson.dumps({"rows": [{"commit_hash": self.head_commit}]})
+        elif etag == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        else:
+            body = b"algo_name,asic_count\nsha256,12\nscrypt,\n"
+        self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        del format, args
+
+
+@pytest.fixture
+def dolthub_stand_in_url() -> Iterator[str]:
+    """Run a local HTTP stand-in for the DoltHub CSV and SQL APIs."""
+    _DoltHubStandIn.head_commit = "c1"
+    _DoltHubStandIn.received_requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _DoltHubStandIn)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_dolthub_api_backend_reads_one_commit(
+    tmp_path: Path, dolthub_stand_in_url: str
+) -> None:
+    """Test that the head is resolved once, and each table is read at that commit.
+
+    Tables cached at the commit are read without a request, and a table unchanged at
+    a new commit is revalidated with its ETag.
+    """
+    backend = DoltHubApiBackend(
+        repo_url="https://www.dolthub.com/repositories/test/db",
+        base_url=dolthub_stand_in_url,
+        cache_folder=tmp_path / "cache",
+    )
+    head_request = ("/api/v1alpha1/test/db/main", None)
+    tables = backend.read_tables(["table_a", "table_b"], None)
+    assert _DoltHubStandIn.received_requests == [
+        head_request,
+        ("/csv/test/db/c1/table_a", None),
+        ("/csv/test/db/c1/table_b", None),
+    ]
+    assert tables["table_b"]["asic_count"].to_list() == [12, None]
+
+    # Same head: only the head is requested.
+    _DoltHubStandIn.received_requests = []
+    df_cached = backend.read_tables(["table_a"], None)["table_a"]
+    assert _DoltHubStandIn.received_requests == [head_request]
+    assert df_cached.equals(tables["table_a"])
+
+    # New head: the table is revalidated at the new commit.
+    _DoltHubStandIn.head_commit = "c2"
+    _DoltHubStandIn.received_requests = []
+    df_revalidated = backend.read_tables(["table_a"], None)["table_a"]
+    assert _DoltHubStandIn.received_requests == [
+        head_request,
+        ("/csv/test/db/c2/table_a", '"v1"'),
+    ]
+    assert df_revalidated.equals(tables["table_a"])
+
+    # A table cached at a commit is read without a request.
+    assert backend.estimate_cost(["table_a"], "c2") == 0
+    _DoltHubStandIn.received_requests = []
+    backend.read_tables(["table_a"], "c2")
+    assert _DoltHubStandIn.received_requests == []
@@ -0,0 +1,80 @@
+"""Tests for dolt_state_manifest.py."""
+
+from pathlib import Path
+
+import polars as pl
+import pytest
+import sqlalchemy
+
+from coin_profitability_scraper import dolt_state_manifest
+from coin_profitability_scraper.dolt_state_manifest import (
+    read_live_row_hashes,
+    read_verified_state_manifest,
+    write_state_manifest,
+)
+
+
+@pytest.fixture
+def engine() -> sqlalchemy.engine.Engine:
+    """Get a SQLite engine with a small `coins` table."""
+    engine = sqlalchemy.create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(
+            sqlalchemy.text(
+                "CREATE TABLE coins (coin_id TEXT PRIMARY KEY, algorithm TEXT)"
+            )
+        )
+        conn.execute(
+            sqlalchemy.text("INSERT INTO coins VALUES (:coin_id, :algorithm)"),
+            [
+                {"coin_id": "Bitcoin", "algorithm": "SHA-256"},
+                {"coin_id": "Monero", "algorithm": "RandomX"},
+                {"coin_id": "Zcash", "algorithm": "Equihash"},  # Not in `df`.
+            ],
+        )
+    return engine
+
+
+def test_state_manifest_verification(
+    engine: sqlalchemy.engine.Engine,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that the manifest is only used while it matches the live table."""
+    monkeypatch.setattr(dolt_state_manifest, "dolt_state_manifest_folder", tmp_path)
+    df = pl.DataFrame(
+        {"coin_id": ["Bitcoin", "Monero"], "algorithm": ["SHA-256", "RandomX"]}
+    )
+
+    assert (
+        read_verified_state_manifest(engine, "coins", df, live_table_hash="a") is None
+    )
+
+    # Nothing was upserted, so the previous hashes (incl. rows not in `df`) are kept.
+    df_previous_hashes = read_live_row_hashes(engine, "coins", df)
+    write_state_manifest(
+        engine,
+        "coins",
+        df,
+        df_previous_hashes=df_previous_hashes,
+        df_delta=df.clear(),
+        table_hash="a",
+    )
+    df_hashes = read_verified_state_manifest(engine, "coins", df, live_table_hash="a")
+    assert df_hashes is not None
+    assert sorted(df_hashes["coin_id"]) == ["Bitcoin", "Monero", "Zcash"]
+
+    assert (
+        read_verified_state_manifest(engine, "coins", df, live_table_hash="b") is None
+    )
+
+    with engine.begin() as conn:
+        conn.execute(
+            sqlalchemy.text("UPDATE coins SET algorithm = 'X' WHERE coin_id = 'Zcash'")
+        )
+    assert (
+        read_verified_state_manifest(
+            engine, "coins", df, live_table_hash="a", sample_size=10
+        )
+        is None
+    )
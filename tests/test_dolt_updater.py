@@ -0,0 +1,180 @@
+"""Tests for dolt_updater.py."""
+
+import subprocess
+import time
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+
+import pytest
+import sqlalchemy
+import sqlalchemy.event
+
+from coin_profitability_scraper import dolt_updater
+from coin_profitability_scraper.dolt_updater import DoltDatabaseUpdater
+
+_NON_FAST_FORWARD_OUTPUT = (
+    "To https://doltremoteapi.dolthub.com/test/db\n"
+    " ! [rejected]          main -> main (non-fast-forward)\n"
+    "error: failed to push some refs to 'https://doltremoteapi.dolthub.com/test/db'\n"
+    "hint: Updates were rejected because the tip of your current branch is behind\n"
+    "hint: its remote counterpart. Integrate the remote changes (e.g.\n"
+    "hint: 'dolt pull ...') before pushing again.\n"
+)
+
+
+class _FakeDoltCli:
+    """Stands in for `subprocess.run`. Records the Dolt commands, and fails some.
+
+    `failures` are the (returncode, stderr) of the first commands. Later commands
+    succeed.
+    """
+
+    def __init__(self, failures: Sequence[tuple[int, str]] = ()) -> None:
+        self.failures: list[tuple[int, str]] = list(failures)
+        self.commands: list[list[str]] = []
+
+    def __call__(
+        self,
+        args: list[str],
+        *,
+        check: bool = False,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> subprocess.CompletedProcess[str]:
+        del kwargs
+        self.commands.append([str(arg) for arg in args[1:]])
+        (returncode, stderr) = self.failures.pop(0) if self.failures else (0, "")
+        proc = subprocess.CompletedProcess(args, returncode, stdout="", stderr=stderr)
+        if check:
+            proc.check_returncode()
+        return proc
+
+
+def _make_updater(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, fake_cli: _FakeDoltCli
+) -> DoltDatabaseUpdater:
+    """Make an updater for an already-cloned repo, without running Dolt."""
+    monkeypatch.setattr(dolt_updater.subprocess, "run", fake_cli)
+    dolt = DoltDatabaseUpdater("https://www.dolthub.com/repositories/test/db")
+    dolt.dolt_clone_dir = tmp_path
+    return dolt
+
+
+def test_push_new_branch_is_never_pulled(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that a rejected branch push is retried without pulling."""
+    fake_cli = _FakeDoltCli(failures=[(1, _NON_FAST_FORWARD_OUTPUT)])
+    dolt = _make_updater(tmp_path, monkeypatch, fake_cli)
+    dolt.branch = "auto/job-1"
+
+    dolt.push()
+
+    assert fake_cli.commands == [
+        ["push", "--set-upstream", "origin", "auto/job-1"],
+        ["push", "--set-upstream", "origin", "auto/job-1"],
+    ]
+
+
+def test_push_pulls_then_pushes_when_behind(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that a non-fast-forward push to main is pulled, then pushed again."""
+    fake_cli = _FakeDoltCli(failures=[(1, _NON_FAST_FORWARD_OUTPUT)])
+    dolt = _make_updater(tmp_path, monkeypatch, fake_cli)
+
+    dolt.push()
+
+    assert fake_cli.commands == [["push"], ["pull"], ["push"]]
+
+
+def test_push_retries_other_failures_without_pulling(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that other push failures are retried, but never pulled.
+
+    A "rejected" push which isn't non-fast-forward (e.g., no permission) raises once
+    the retries are used up.
+    """
+    monkeypatch.setattr(time, "sleep", lambda _seconds: None)  # No backoff waits.
+    fake_cli = _FakeDoltCli(failures=[(1, "error: connection reset by peer")])
+    dolt = _make_updater(tmp_path, monkeypatch, fake_cli)
+
+    dolt.push()
+    assert fake_cli.commands == [["push"], ["push"]]
+
+    permission_denied = "error: push rejected: permission denied for test/db"
+    fake_cli = _FakeDoltCli(failures=[(1, permission_denied)] * 5)
+    dolt = _make_updater(tmp_path, monkeypatch, fake_cli)
+
+    with pytest.raises(subprocess.CalledProcessError):
+        dolt.push()
+    assert fake_cli.commands == [["push"]] * 5
+
+
+def test_delete_remote_branches_keeps_going_on_failure(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that a branch which can't be deleted doesn't stop the other deletes."""
+    fake_cli = _FakeDoltCli(failures=[(1, "branch not found")])
+    dolt = _make_updater(tmp_path, monkeypatch, fake_cli)
+
+    dolt.delete_remote_branches(["auto/job-1", "auto/job-2"])
+
+    assert fake_cli.commands == [
+        ["push", "origin", ":auto/job-1"],
+        ["push", "origin", ":auto/job-2"],
+    ]
+
+
+def _make_fake_dolt_engine(
+    remote_branch_names: Sequence[str], merged_branches: list[str]
+) -> sqlalchemy.engine.Engine:
+    """Make a SQLite engine which answers the Dolt procedures used by the merge.
+
+    `DOLT_FETCH` is a no-op, and `DOLT_MERGE` records the merged branch. Merging a
+    branch with "conflict" in its name reports conflicts.
+    """
+    engine = sqlalchemy.create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(sqlalchemy.text("CREATE TABLE dolt_remote_branches (name TEXT)"))
+        conn.execute(
+            sqlalchemy.text("INSERT INTO dolt_remote_branches VALUES (:name)"),
+            [{"name": f"remotes/origin/{name}"} for name in remote_branch_names],
+        )
+
+    @sqlalchemy.event.listens_for(engine, "before_cursor_execute", retval=True)
+    def _rewrite_dolt_procedures(  # pyright: ignore[reportUnusedFunction]  # noqa: PLR0913
+        conn: Any,  # noqa: ANN401
+        cursor: Any,  # noqa: ANN401
+        statement: str,
+        parameters: Any,  # noqa: ANN401
+        context: Any,  # noqa: ANN401
+        executemany: bool,  # noqa: FBT001
+    ) -> tuple[str, Any]:
+        del conn, cursor, context, executemany
+        if statement.startswith("CALL DOLT_FETCH"):
+            return ("SELECT 0 AS status", ())
+        if statement.startswith("CALL DOLT_MERGE"):
+            (branch, _message) = parameters
+            merged_branches.append(branch)
+            return ("SELECT instr(?, 'conflict') > 0 AS conflicts", (branch,))
+        return (statement, parameters)
+
+    return engine
+
+
+def test_merge_remote_branches(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that only the `auto/` branches are merged, in name order."""
+    dolt = _make_updater(tmp_path, monkeypatch, _FakeDoltCli())
+    merged_branches: list[str] = []
+    dolt.engine = _make_fake_dolt_engine(
+        ["main", "auto/job-2", "auto/job-1", "feature/x"], merged_branches
+    )
+
+    assert dolt.merge_remote_branches("auto/") == ["auto/job-1", "auto/job-2"]
+    assert merged_branches == ["origin/auto/job-1", "origin/auto/job-2"]
+
+    dolt.engine = _make_fake_dolt_engine(["auto/job-1-conflict"], merged_branches)
+    with pytest.raises(RuntimeError, match="has conflicts"):
+        dolt.merge_remote_branches("auto/")
@@ -0,0 +1,309 @@
+"""Tests for dolt_util.py."""
+
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+import polars as pl
+import pytest
+import sqlalchemy
+import sqlalchemy.event
+import sqlalchemy.exc
+
+from coin_profitability_scraper.dolt_util import (
+    compute_row_hashes,
+    delete_rows_not_in_polars,
+    find_changed_rows,
+    find_changed_rows_by_hash,
+    get_timestamp_fixup_sql,
+    read_query_where_in,
+    upsert_polars_rows,
+    write_import_csv,
+)
+from coin_profitability_scraper.float_change_rules import FloatChangeRule
+
+
+def test_delete_rows_not_in_polars_composite_key() -> None:
+    """Test pruning with a composite primary key, in batches."""
+    engine = sqlalchemy.create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(
+            sqlalchemy.text(
+                "CREATE TABLE coins (source_site TEXT, coin_id TEXT, price REAL, "
+                "PRIMARY KEY (source_site, coin_id))"
+            )
+        )
+        conn.execute(
+            sqlalchemy.text("INSERT INTO coins VALUES (:site, :coin, 1.0)"),
+            [
+                {"site": site, "coin": coin}
+                for site in ("crypto51", "miningnow")
+                for coin in ("Bitcoin", "Monero", "Ravencoin")
+            ],
+        )
+
+    df_keep = pl.DataFrame(
+        {
+            "source_site": pl.Series(
+                ["crypto51", "miningnow", "miningnow"],
+                dtype=pl.Enum(["crypto51", "miningnow"]),
+            ),
+            "coin_id": ["Bitcoin", "Bitcoin", "Monero"],
+            "price": [2.0, 2.0, 2.0],
+        }
+    )
+    deleted_row_count = delete_rows_not_in_polars(
+        engine, "coins", df_keep, batch_size=2
+    )
+
+    assert deleted_row_count == 3  # noqa: PLR2004
+    df_remaining = pl.read_database(
+        "SELECT source_site, coin_id FROM coins ORDER BY source_site, coin_id", engine
+    )
+    assert df_remaining.rows() == [
+        ("crypto51", "Bitcoin"),
+        ("miningnow", "Bitcoin"),
+        ("miningnow", "Monero"),
+    ]
+
+    with pytest.raises(ValueError, match="Refusing to delete all rows"):
+        delete_rows_not_in_polars(engine, "coins", df_keep.clear())
+
+
+def test_read_query_where_in_batches() -> None:
+    """Test reading by a (composite) key in batches, and with no keys."""
+    engine = sqlalchemy.create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(
+            sqlalchemy.text(
+                "CREATE TABLE coins (source_site TEXT, coin_id TEXT, algo_name TEXT, "
+                "PRIMARY KEY (source_site, coin_id))"
+            )
+        )
+        conn.execute(
+            sqlalchemy.text("INSERT INTO coins VALUES (:site, :coin, :algo)"),
+            [
+                {"site": site, "coin": coin, "algo": algo}
+                for site in ("crypto51", "miningnow")
+                for (coin, algo) in (
+                    ("Bitcoin", "SHA256"),
+                    ("Bitcoin Cash", "SHA256"),
+                    ("Monero", "RandomX"),
+                )
+            ],
+        )
+    coins = sqlalchemy.Table("coins", sqlalchemy.MetaData(), autoload_with=engine)
+
+    df_algo_names = read_query_where_in(
+        engine,
+        sqlalchemy.select(coins.c.algo_name).distinct(),
+        sqlalchemy.tuple_(coins.c.source_site, coins.c.coin_id),
+        pl.DataFrame(
+            {
+                "source_site": ["crypto51", "miningnow", "miningnow"],
+                "coin_id": ["Bitcoin", "Bitcoin Cash", "Monero"],
+            }
+        ),
+        batch_size=2,
+    )
+    assert sorted(df_algo_names["algo_name"].unique()) == ["RandomX", "SHA256"]
+
+    df_coins = read_query_where_in(
+        engine,
+        sqlalchemy.select(coins),
+        coins.c.algo_name,
+        pl.DataFrame({"algo_name": ["SHA256", "X11"]}),
+        batch_size=1,
+    )
+    assert df_coins.height == 4  # noqa: PLR2004
+
+    df_none = read_query_where_in(
+        engine,
+        sqlalchemy.select(coins),
+        coins.c.algo_name,
+        pl.DataFrame({"algo_name": []}, schema={"algo_name": pl.String}),
+    )
+    assert df_none.columns == ["source_site", "coin_id", "algo_name"]
+    assert df_none.height == 0
+
+
+def test_upsert_polars_rows_across_connections(tmp_path: Path) -> None:
+    """Test that a partitioned upsert writes every changed row exactly once."""
+    engine = sqlalchemy.create_engine(f"sqlite:///{tmp_path / 'coins.sqlite'}")
+    with engine.begin() as conn:
+        conn.execute(
+            sqlalchemy.text(
+                "CREATE TABLE coins (coin_id INTEGER PRIMARY KEY, algo TEXT)"
+            )
+        )
+        conn.execute(
+            sqlalchemy.text("INSERT INTO coins VALUES (:coin_id, 'old')"),
+            [{"coin_id": coin_id} for coin_id in range(50)],
+        )
+
+    upserted_coin_ids: list[int] = []
+
+    @sqlalchemy.event.listens_for(engine, "before_cursor_execute")
+    def _record_upserted_rows(  # pyright: ignore[reportUnusedFunction]  # noqa: PLR0913
+        conn: Any,  # noqa: ANN401
+        cursor: Any,  # noqa: ANN401
+        statement: str,
+        parameters: Any,  # noqa: ANN401
+        context: Any,  # noqa: ANN401
+        executemany: bool,  # noqa: FBT001
+    ) -> None:
+        del conn, cursor, context
+        if statement.startswith("INSERT INTO coins"):
+            rows = parameters if executemany else [parameters]
+            upserted_coin_ids.extend(row[0] for row in rows)
+
+    # 25 changed, 25 unchanged, and 150 new rows.
+    df = pl.DataFrame(
+        {
+            "coin_id": range(200),
+            "algo": ["new"] * 25 + ["old"] * 25 + ["new"] * 150,
+        }
+    )
+    df_delta = upsert_polars_rows(engine, "coins", df, batch_size=7, max_connections=4)
+
+    expected_coin_ids = [*range(25), *range(50, 200)]
+    assert sorted(upserted_coin_ids) == expected_coin_ids
+    assert df_delta.height == len(expected_coin_ids) + 25  # Plus previous versions.
+    df_live = pl.read_database("SELECT * FROM coins ORDER BY coin_id", engine)
+    assert df_live.equals(df)
+
+
+def test_find_changed_rows_by_hash_matches_find_changed_rows() -> None:
+    """Test that diffing by row hash finds the same rows as diffing full rows."""
+    df_current = pl.DataFrame(
+        {
+            "coin_id": ["Bitcoin", "Monero", "Ravencoin", "Zcash"],
+            "algorithm": ["SHA-256", "RandomX", "KawPow", None],
+            "price": [1.0, 2.0, 3.0, 4.0],
+        }
+    )
+    df = pl.DataFrame(
+        {
+            "coin_id": ["Bitcoin", "Monero", "Ravencoin", "Zcash", "Dogecoin"],
+            "algorithm": ["SHA-256", "RandomX", "KawPoW", "Equihash", "Scrypt"],
+            "price": [9.0, 2.0, 3.0, 4.0, 5.0],  # Float change alone is ignored.
+        }
+    )
+    df_current_hashes = compute_row_hashes(df_current, ["coin_id"])
+
+    df_changed = find_changed_rows_by_hash(df, df_current_hashes, ["coin_id"])
+
+    assert df_changed.equals(find_changed_rows(df, df_current))
+    assert df_changed["coin_id"].to_list() == ["Ravencoin", "Zcash", "Dogecoin"]
+
+
+def test_find_changed_rows_with_float_change_rules() -> None:
+    """Test that only materially changed floats count as changes, in both diffs."""
+    df_current = pl.DataFrame(
+        {
+            "coin_id": ["Bitcoin", "Monero", "Ravencoin", "Zcash"],
+            "price": [100.0, 100.0, None, 100.0],
+            "hashrate": [1.0, 1.0, 1.0, 1.0],  # No rule. Ignored.
+        }
+    )
+    df = pl.DataFrame(
+        {
+            "coin_id": ["Bitcoin", "Monero", "Ravencoin", "Zcash"],
+            "price": [100.5, 102.0, 1.0, 100.0],
+            "hashrate": [2.0, 2.0, 2.0, 2.0],
+        }
+    )
+    float_change_rules = {"price": FloatChangeRule(rel_tolerance=0.01)}
+
+    df_changed = find_changed_rows(
+        df, df_current, float_change_rules=float_change_rules
+    )
+    assert df_changed["coin_id"].to_list() == ["Monero", "Ravencoin"]
+
+    df_current_hashes = compute_row_hashes(
+        df_current, ["coin_id"], float_change_rules=float_change_rules
+    )
+    assert df_changed.equals(
+        find_changed_rows_by_hash(
+            df,
+            df_current_hashes,
+            ["coin_id"],
+            float_change_rules=float_change_rules,
+        )
+    )
+
+
+def test_delete_rows_not_in_polars_retries_only_the_failed_batch(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that a connection error retries the failed batch, keeping the others."""
+    engine = sqlalchemy.create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(sqlalchemy.text("CREATE TABLE coins (coin_id TEXT PRIMARY KEY)"))
+        conn.execute(
+            sqlalchemy.text("INSERT INTO coins VALUES (:coin)"),
+            [{"coin": coin} for coin in ("Bitcoin", "Monero", "Ravencoin", "Zcash")],
+        )
+
+    begin_call_count = 0
+    original_begin = engine.begin
+
+    def _flaky_begin() -> Any:  # noqa: ANN401
+        nonlocal begin_call_count
+        begin_call_count += 1
+        if begin_call_count == 2:  # noqa: PLR2004
+            statement = "DELETE"
+            raise sqlalchemy.exc.OperationalError(
+                statement, {}, ConnectionError("Lost connection")
+            )
+        return original_begin()
+
+    monkeypatch.setattr(engine, "begin", _flaky_begin)
+    deleted_row_count = delete_rows_not_in_polars(
+        engine, "coins", pl.DataFrame({"coin_id": ["Bitcoin"]}), batch_size=1
+    )
+
+    assert deleted_row_count == 3  # noqa: PLR2004
+    assert begin_call_count == 4  # noqa: PLR2004 (3 batches, plus 1 retry.)
+    monkeypatch.undo()
+    assert pl.read_database("SELECT coin_id FROM coins", engine).rows() == [
+        ("Bitcoin",)
+    ]
+
+
+def test_write_import_csv(tmp_path: Path) -> None:
+    """Test the CSV export for `dolt table import`."""
+    df = pl.DataFrame(
+        {
+            "coin": pl.Series(["BTC", "LTC"], dtype=pl.Enum(["BTC", "LTC"])),
+            "is_active": [True, False],
+            "seen_at": pl.Series(
+                [datetime(2025, 1, 2, 3, 4, 5, tzinfo=UTC), None],
+                dtype=pl.Datetime("us", "Europe/Berlin"),
+            ),
+        }
+    )
+    csv_path = tmp_path / "coins.csv"
+    write_import_csv(
+        df, csv_path, imported_at=datetime(2025, 6, 7, 8, 9, 10, tzinfo=UTC)
+    )
+    assert csv_path.read_text().splitlines() == [
+        "coin,is_active,seen_at,created_at,updated_at",
+        "BTC,1,2025-01-02 03:04:05,2025-06-07 08:09:10,2025-06-07 08:09:10",
+        "LTC,0,,2025-06-07 08:09:10,2025-06-07 08:09:10",
+    ]
+
+
+def test_get_timestamp_fixup_sql() -> None:
+    """Test the query restoring `created_at`/`updated_at` after an import."""
+    query = get_timestamp_fixup_sql(
+        "coins", ["coin", "chain", "price", "created_at"], ["coin", "chain"]
+    )
+    assert query == (
+        "UPDATE `coins` AS t "
+        "JOIN `coins` AS OF 'HEAD' AS prev "
+        "ON t.`coin` = prev.`coin` AND t.`chain` = prev.`chain` "
+        "SET t.`created_at` = prev.`created_at`, "
+        "t.`updated_at` = IF(t.`price` <=> prev.`price`, "
+        "prev.`updated_at`, t.`updated_at`)"
+    )
@@ -0,0 +1,52 @@
+"""Tests for dy_util.py."""
+
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import dataframely as dy
+import polars as pl
+import pytest
+from dataframely.exc import ValidationError
+
+from coin_profitability_scraper.dy_util import (
+    read_validated_parquet,
+    write_validated_parquet,
+)
+
+
+class _DySchemaExample(dy.Schema):
+    coin_name = dy.String(primary_key=True, nullable=False, min_length=1)
+    market_cap_usd = dy.UInt64(nullable=True)
+
+
+def test_read_validated_parquet_uses_stamp(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that a stamped file skips validation, unless it's strict or tampered."""
+    path = tmp_path / "coins.parquet"
+    df = _DySchemaExample.validate(
+        pl.DataFrame({"coin_name": ["Bitcoin", "Monero"], "market_cap_usd": [1, None]}),
+        cast=True,
+    )
+    write_validated_parquet(df, _DySchemaExample, path)
+
+    validate_mock = MagicMock(wraps=_DySchemaExample.validate)
+    monkeypatch.setattr(_DySchemaExample, "validate", validate_mock)
+
+    # Matching stamp: no validation.
+    df_read = read_validated_parquet(path, _DySchemaExample)
+    assert df_read.equals(df)
+    assert validate_mock.call_count == 0
+
+    # Strict mode: always validates.
+    read_validated_parquet(path, _DySchemaExample, strict=True)
+    assert validate_mock.call_count == 1
+
+    # Content changed without a new stamp: validates (and fails here).
+    metadata = pl.read_parquet_metadata(path)
+    pl.DataFrame({"coin_name": ["Bitcoin", "Bitcoin"]}).write_parquet(
+        path, metadata=metadata
+    )
+    with pytest.raises(ValidationError):
+        read_validated_parquet(path, _DySchemaExample)
+    assert validate_mock.call_count == 2  # noqa: PLR2004
@@ -0,0 +1,40 @@
+"""Tests for float_change_rules.py."""
+
+import dataframely as dy
+import polars as pl
+
+from coin_profitability_scraper.float_change_rules import (
+    FloatChangeRule,
+    float_change_rule,
+    get_float_change_rules,
+)
+
+
+class _DySchemaExample(dy.Schema):
+    coin_id = dy.String(primary_key=True)
+    price_usd = dy.Float64(
+        nullable=True, metadata=float_change_rule(abs_tolerance=0.5, decimals=1)
+    )
+    hashrate = dy.Float64(nullable=True)
+
+
+def test_float_change_rule_is_changed_expr() -> None:
+    """Test the tolerances, rounding, and nulls of a change rule."""
+    df = pl.DataFrame(
+        {
+            "new": [1.0, 1.5, 1.04, 10.0, None, None, 1.0],
+            "current": [1.0, 1.0, 1.0, 10.9, None, 1.0, None],
+        }
+    )
+    rule = get_float_change_rules(_DySchemaExample)["price_usd"]
+    assert rule == FloatChangeRule(abs_tolerance=0.5, decimals=1)
+
+    assert df.select(rule.is_changed_expr(pl.col("new"), pl.col("current")))[
+        "new"
+    ].to_list() == [False, False, False, True, False, True, True]
+
+    # 10% of the larger absolute value.
+    relative_rule = FloatChangeRule(rel_tolerance=0.1)
+    assert df.select(relative_rule.is_changed_expr(pl.col("new"), pl.col("current")))[
+        "new"
+    ].to_list() == [False, True, False, False, False, True, True]
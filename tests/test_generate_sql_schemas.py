@@ -0,0 +1,19 @@
+"""Tests for generate_sql_schemas.py."""
+
+from coin_profitability_scraper.generate_sql_schemas import (
+    generate_create_table_sql,
+    schema_output_folder,
+)
+from coin_profitability_scraper.tables import table_to_path_and_schema
+
+
+def test_generated_sql_matches_dolt_schema() -> None:
+    """Ensure the committed `dolt_schema/*.sql` files match the Dataframely schemas.
+
+    In particular, Enum/Categorical columns must still be written as `VARCHAR(n)`.
+    """
+    for table_name, (_path, schema_class) in table_to_path_and_schema.items():
+        expected_sql = (schema_output_folder / f"{table_name}.sql").read_text()
+        assert generate_create_table_sql(table_name, schema_class) == expected_sql, (
+            table_name
+        )
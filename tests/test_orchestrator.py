@@ -0,0 +1,105 @@
+"""Tests for orchestrator.py."""
+
+import re
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable
+from pathlib import Path
+
+from coin_profitability_scraper.orchestrator import (
+    BRONZE_STEPS,
+    BRONZE_TABLE_TO_STEP_NAME,
+    PipelineStep,
+    run_pipeline_steps,
+)
+
+
+def test_run_pipeline_steps() -> None:
+    """Test dependency order, skipping after failures, and resource slot limits."""
+    lock = threading.Lock()
+    finished_step_names: list[str] = []
+    running_count: Counter[str] = Counter()
+    max_running_count: Counter[str] = Counter()
+
+    def make_func(
+        name: str, resource: str, *, fail: bool = False
+    ) -> Callable[[], None]:
+        def func() -> None:
+            with lock:
+                running_count[resource] += 1
+                max_running_count[resource] = max(
+                    max_running_count[resource], running_count[resource]
+                )
+            time.sleep(0.02)
+            with lock:
+                running_count[resource] -= 1
+                finished_step_names.append(name)
+            if fail:
+                msg = f"{name} failed"
+                raise RuntimeError(msg)
+
+        return func
+
+    steps = [
+        PipelineStep(name="a.1", func=make_func("a.1", "network"), resource="network"),
+        PipelineStep(name="b.1", func=make_func("b.1", "network"), resource="network"),
+        PipelineStep(name="c.1", func=make_func("c.1", "network"), resource="network"),
+        PipelineStep(
+            name="a.2",
+            func=make_func("a.2", "cpu"),
+            resource="cpu",
+            depends_on=("a.1",),
+        ),
+        PipelineStep(
+            name="b.2",
+            func=make_func("b.2", "cpu", fail=True),
+            resource="cpu",
+            depends_on=("b.1",),
+        ),
+        PipelineStep(
+            name="b.3",
+            func=make_func("b.3", "cpu"),
+            resource="cpu",
+            depends_on=("b.2",),
+        ),
+    ]
+
+    statuses = run_pipeline_steps(steps, resource_slots={"network": 2, "cpu": 1})
+
+    assert statuses == {
+        "a.1": "succeeded",
+        "b.1": "succeeded",
+        "c.1": "succeeded",
+        "a.2": "succeeded",
+        "b.2": "failed",
+        "b.3": "skipped",
+    }
+    assert finished_step_names.index("a.1") < finished_step_names.index("a.2")
+    assert "b.3" not in finished_step_names
+    assert max_running_count["network"] <= 2  # noqa: PLR2004
+    assert max_running_count["cpu"] == 1
+
+
+def test_bronze_steps_graph() -> None:
+    """Ensure every bronze table is produced by a known bronze step.
+
+    Also ensures that the bronze steps are those of the pipelines run in CI (so that
+    disabled pipelines aren't run).
+    """
+    step_names = {step.name for step in BRONZE_STEPS}
+    assert set(BRONZE_TABLE_TO_STEP_NAME.values()) <= step_names
+    for step in BRONZE_STEPS:
+        assert set(step.depends_on) <= step_names
+
+    workflow = (
+        Path(__file__).parents[1] / ".github/workflows/validate_and_run.yml"
+    ).read_text()
+    ci_pipelines = set(
+        re.findall(
+            r"^\s*uv run src/coin_profitability_scraper/(\w+)/\w+_pipeline\.py$",
+            workflow,
+            flags=re.MULTILINE,
+        )
+    )
+    assert {name.split(".")[0] for name in step_names} == ci_pipelines - {"reports"}
@@ -0,0 +1,91 @@
+"""Tests for run_metrics.py."""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import polars as pl
+import pytest
+
+from coin_profitability_scraper import step_cache
+from coin_profitability_scraper.run_metrics import (
+    bind_current_step,
+    collect_run_metrics,
+    get_step_name,
+    metered_step,
+    record_metric,
+)
+from coin_profitability_scraper.step_cache import cached_step
+
+
+def test_collect_run_metrics_attributes_metrics_to_steps(tmp_path: Path) -> None:
+    """Test that metrics (also from thread pools) are attributed to their step."""
+    output_folder = tmp_path / "run_metrics"
+
+    def _download(url: str) -> None:
+        record_metric("http_requests", 1, unit="count", label=url)
+
+    @metered_step
+    def step_download() -> None:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(bind_current_step(_download), ["a", "a", "b"]))
+
+    @metered_step
+    def step_fail() -> None:
+        record_metric("rows_read", 10, unit="rows")
+        raise RuntimeError
+
+    with collect_run_metrics("test_pipeline", output_folder):
+        step_download()
+        with pytest.raises(RuntimeError):
+            step_fail()
+        record_metric("rows_read", 5, unit="rows")
+
+    (output_path,) = output_folder.glob("test_pipeline-*.parquet")
+    df = pl.read_parquet(output_path)
+    assert df["run_id"].str.starts_with("test_pipeline-").all()
+
+    def _get_value(step_suffix: str, metric_name: str, label: str = "") -> float:
+        return df.filter(
+            pl.col("step_name").str.ends_with(step_suffix),
+            metric_name=metric_name,
+            label=label,
+        )["value"].item()
+
+    assert _get_value("step_download", "http_requests", "a") == 2  # noqa: PLR2004
+    assert _get_value("step_download", "http_requests", "b") == 1
+    assert _get_value("step_download", "failed") == 0
+    assert _get_value("step_download", "http_requests_per_second") > 0
+    assert _get_value("step_fail", "rows_read") == 10  # noqa: PLR2004
+    assert _get_value("step_fail", "failed") == 1
+    assert _get_value("test_pipeline", "rows_read") == 5  # noqa: PLR2004
+    assert _get_value("test_pipeline", "wall_time") > 0
+    assert _get_value("test_pipeline", "peak_rss") > 0
+
+
+def test_metered_cached_step_is_named_after_its_function(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that `@metered_step` over `@cached_step` names the step, not the wrapper."""
+    monkeypatch.setattr(step_cache, "step_cache_folder", tmp_path / "step_cache")
+    monkeypatch.delenv("DISABLE_STEP_CACHE", raising=False)
+    input_path = tmp_path / "input.json"
+    input_path.write_text("{}")
+
+    @metered_step
+    @cached_step(inputs=[input_path], outputs=[])
+    def step_parse() -> None:
+        record_metric("rows_read", 3, unit="rows")
+
+    assert get_step_name(step_parse).endswith(
+        "test_metered_cached_step_is_named_after_its_function.<locals>.step_parse"
+    )
+    assert "step_cache" not in get_step_name(step_parse)
+
+    output_folder = tmp_path / "run_metrics"
+    with collect_run_metrics("test_pipeline", output_folder):
+        step_parse()
+
+    (output_path,) = output_folder.glob("*.parquet")
+    step_names = set(pl.read_parquet(output_path)["step_name"].to_list())
+    assert get_step_name(step_parse) in step_names
+    assert not any(name.startswith("step_cache.") for name in step_names)
@@ -0,0 +1,67 @@
+"""Tests for step_8_canonicalize.py."""
+
+from pathlib import Path
+
+import polars as pl
+import pytest
+import sqlalchemy
+
+from coin_profitability_scraper import dolt_state_manifest
+from coin_profitability_scraper.dolt_state_manifest import (
+    read_live_row_hashes,
+    write_state_manifest,
+)
+from coin_profitability_scraper.float_change_rules import get_float_change_rules
+from coin_profitability_scraper.reports.gold_algorithms import DySchemaGoldAlgorithms
+from coin_profitability_scraper.step_8_canonicalize import get_expected_push_delta
+
+
+def test_get_expected_push_delta(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test the expected delta against the last-pushed manifest (pruned table)."""
+    monkeypatch.setattr(dolt_state_manifest, "dolt_state_manifest_folder", tmp_path)
+    df_pushed = pl.DataFrame(
+        {"algo_name": ["SHA-256", "RandomX", "Scrypt"], "coin_count": [1, 2, 3]},
+        schema={"algo_name": pl.String, "coin_count": pl.UInt32},
+    )
+    df = pl.DataFrame(
+        {"algo_name": ["SHA-256", "RandomX", "KawPow"], "coin_count": [1, 5, 1]},
+        schema=df_pushed.schema,
+    )
+
+    assert get_expected_push_delta("gold_algorithms", df, DySchemaGoldAlgorithms) == {
+        "manifest_table_hash": None,
+        "expected_inserted_row_count": None,
+        "expected_updated_row_count": None,
+        "expected_deleted_row_count": None,
+    }
+
+    engine = sqlalchemy.create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(
+            sqlalchemy.text(
+                "CREATE TABLE gold_algorithms "
+                "(algo_name TEXT PRIMARY KEY, coin_count INTEGER)"
+            )
+        )
+        conn.execute(
+            sqlalchemy.text("INSERT INTO gold_algorithms VALUES (:algo_name, :n)"),
+            [{"algo_name": a, "n": n} for a, n in df_pushed.iter_rows()],
+        )
+    write_state_manifest(
+        engine,
+        "gold_algorithms",
+        df_pushed,
+        df_previous_hashes=read_live_row_hashes(engine, "gold_algorithms", df_pushed),
+        df_delta=df_pushed,
+        float_change_rules=get_float_change_rules(DySchemaGoldAlgorithms),
+        table_hash="abc",
+    )
+
+    assert get_expected_push_delta("gold_algorithms", df, DySchemaGoldAlgorithms) == {
+        "manifest_table_hash": "abc",
+        "expected_inserted_row_count": 1,  # KawPow.
+        "expected_updated_row_count": 1,  # RandomX.
+        "expected_deleted_row_count": 1,  # Scrypt.
+    }
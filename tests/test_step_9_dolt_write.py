@@ -0,0 +1,220 @@
+"""Tests for step_9_dolt_write.py."""
+
+import hashlib
+from pathlib import Path
+from types import TracebackType
+from typing import TYPE_CHECKING, Literal
+
+import dataframely as dy
+import polars as pl
+import pytest
+import sqlalchemy
+
+from coin_profitability_scraper import dolt_state_manifest, step_9_dolt_write
+
+if TYPE_CHECKING:
+    from coin_profitability_scraper.tables import TableNameLiteral
+
+
+class _DySchemaTestCoins(dy.Schema):
+    coin_name = dy.String(primary_key=True, nullable=False)
+    algo_name = dy.String(nullable=False)
+
+
+class _DySchemaTestAlgorithms(dy.Schema):
+    algo_name = dy.String(primary_key=True, nullable=False)
+    coin_count = dy.Int64(nullable=False)
+
+
+class _FakeDoltDatabaseUpdater:
+    """Stands in for `DoltDatabaseUpdater`, on a file-backed SQLite database."""
+
+    database_path: Path
+    commit_messages: list[str] = []  # noqa: RUF012
+    events: list[str] = []  # noqa: RUF012
+
+    def __init__(
+        self,
+        repo_url: str,
+        *,
+        pool_size: int,
+        branch: str | None,
+        start_sql_server: bool,
+    ) -> None:
+        del repo_url, branch, start_sql_server
+        self.engine: sqlalchemy.engine.Engine = sqlalchemy.create_engine(
+            f"sqlite:///{self.database_path}", pool_size=pool_size
+        )
+
+    def __enter__(self) -> "_FakeDoltDatabaseUpdater":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> Literal[False]:
+        self.engine.dispose()
+        return False
+
+    def import_table(
+        self,
+        table_name: str,
+        file_path: Path,
+        *,
+        mode: Literal["replace", "update"],
+    ) -> None:
+        self.events.append(f"import {table_name} ({mode})")
+        table = sqlalchemy.Table(
+            table_name, sqlalchemy.MetaData(), autoload_with=self.engine
+        )
+        df = pl.read_csv(file_path).select(table.columns.keys())
+        with self.engine.begin() as conn:
+            if mode == "replace":
+                conn.execute(sqlalchemy.delete(table))
+            conn.execute(table.insert().prefix_with("OR REPLACE"), df.to_dicts())
+
+    def run_sql(self, query: str) -> None:
+        self.events.append(f"sql {query.split(' AS ')[0]}")
+
+    def start_sql_server(self) -> None:
+        self.events.append("start_sql_server")
+
+    def get_table_hash(self, table_name: str) -> str:
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                sqlalchemy.text(f"SELECT * FROM {table_name} ORDER BY 1")  # noqa: S608
+            ).all()
+        return hashlib.sha256(repr(rows).encode()).hexdigest()
+
+    def dolt_commit_and_push(self, commit_message: str) -> None:
+        self.commit_messages.append(commit_message)
+
+
+@pytest.fixture
+def fake_dolt(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> type[_FakeDoltDatabaseUpdater]:
+    """Stub out Dolt, with a SQLite database holding two tables to update."""
+    database_path = tmp_path / "dolt.sqlite"
+    engine = sqlalchemy.create_engine(f"sqlite:///{database_path}")
+    with engine.begin() as conn:
+        conn.execute(
+            sqlalchemy.text(
+                "CREATE TABLE crypto51_coins (coin_name TEXT PRIMARY KEY, algo_name TEXT)"
+            )
+        )
+        conn.execute(
+            sqlalchemy.text(
+                "INSERT INTO crypto51_coins VALUES "
+                "('Bitcoin', 'SHA-256'), ('Monero', 'CryptoNight')"
+            )
+        )
+        conn.execute(
+            sqlalchemy.text(
+                "CREATE TABLE gold_algorithms "
+                "(algo_name TEXT PRIMARY KEY, coin_count INTEGER)"
+            )
+        )
+        conn.execute(
+            sqlalchemy.text(
+                "INSERT INTO gold_algorithms VALUES ('SHA-256', 1), ('CryptoNight', 1)"
+            )
+        )
+    engine.dispose()
+
+    _FakeDoltDatabaseUpdater.database_path = database_path
+    _FakeDoltDatabaseUpdater.commit_messages = []
+    _FakeDoltDatabaseUpdater.events = []
+    monkeypatch.setattr(
+        step_9_dolt_write, "DoltDatabaseUpdater", _FakeDoltDatabaseUpdater
+    )
+    monkeypatch.setattr(step_9_dolt_write, "is_dry_run", lambda: False)
+    monkeypatch.setattr(step_9_dolt_write, "get_dolt_write_branch", lambda: None)
+    monkeypatch.setattr(
+        step_9_dolt_write,
+        "get_canonical_parquet_path",
+        lambda table_name: tmp_path / f"{table_name}.parquet",
+    )
+    monkeypatch.setattr(
+        step_9_dolt_write,
+        "table_to_path_and_schema",
+        {
+            "crypto51_coins": (tmp_path / "unused.parquet", _DySchemaTestCoins),
+            "gold_algorithms": (tmp_path / "unused.parquet", _DySchemaTestAlgorithms),
+        },
+    )
+    monkeypatch.setattr(
+        dolt_state_manifest, "dolt_state_manifest_folder", tmp_path / "manifests"
+    )
+    return _FakeDoltDatabaseUpdater
+
+
+def test_push_tables(tmp_path: Path, fake_dolt: type[_FakeDoltDatabaseUpdater]) -> None:
+    """Test the import, upserts, prune, commit, and state manifests of a push.
+
+    `crypto51_coins` is imported (with the "append" strategy, before the SQL server
+    is started), and `gold_algorithms` is upserted.
+    """
+    assert step_9_dolt_write.TABLE_WRITE_STRATEGIES["crypto51_coins"] == "append"
+    _DySchemaTestCoins.write_parquet(
+        _DySchemaTestCoins.validate(
+            pl.DataFrame(
+                {
+                    "coin_name": ["Monero", "Ravencoin"],  # Bitcoin dropped out.
+                    "algo_name": ["RandomX", "KawPow"],
+                }
+            )
+        ),
+        tmp_path / "crypto51_coins.parquet",
+    )
+    _DySchemaTestAlgorithms.write_parquet(
+        _DySchemaTestAlgorithms.validate(
+            pl.DataFrame(
+                {
+                    "algo_name": ["KawPow", "RandomX", "SHA-256"],
+                    "coin_count": [1, 1, 1],
+                }
+            )
+        ),
+        tmp_path / "gold_algorithms.parquet",
+    )
+    table_names: list[TableNameLiteral] = ["crypto51_coins", "gold_algorithms"]
+
+    table_deltas = step_9_dolt_write._push_tables(table_names)  # pyright: ignore[reportPrivateUsage]  # noqa: SLF001
+
+    assert fake_dolt.events == [
+        "import crypto51_coins (update)",
+        "sql UPDATE `crypto51_coins`",  # The timestamp fix-up.
+        "start_sql_server",
+    ]
+    assert (tmp_path / "crypto51_coins.csv").exists()
+    engine = sqlalchemy.create_engine(f"sqlite:///{fake_dolt.database_path}")
+    # Monero changed, Ravencoin was added, and Bitcoin is kept.
+    assert pl.read_database(
+        "SELECT * FROM crypto51_coins ORDER BY 1", engine
+    ).rows() == [
+        ("Bitcoin", "SHA-256"),
+        ("Monero", "RandomX"),
+        ("Ravencoin", "KawPow"),
+    ]
+    # Only the upserted table has a delta.
+    assert list(table_deltas) == ["gold_algorithms"]
+    assert sorted(table_deltas["gold_algorithms"]["algo_name"]) == [
+        "KawPow",
+        "RandomX",
+    ]
+    assert pl.read_database(
+        "SELECT algo_name FROM gold_algorithms ORDER BY 1", engine
+    ).to_series().to_list() == ["KawPow", "RandomX", "SHA-256"]  # CryptoNight pruned.
+    assert fake_dolt.commit_messages == [
+        "Auto-updated tables: crypto51_coins, gold_algorithms"
+    ]
+    assert sorted(p.name for p in (tmp_path / "manifests").iterdir()) == [
+        "gold_algorithms.parquet",
+    ]
+
+    # Pushing the same content again upserts nothing.
+    table_deltas = step_9_dolt_write._push_tables(table_names)  # pyright: ignore[reportPrivateUsage]  # noqa: SLF001
+    assert [df.height for df in table_deltas.values()] == [0]
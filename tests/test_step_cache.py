@@ -0,0 +1,70 @@
+"""Tests for step_cache.py."""
+
+from pathlib import Path
+
+import pytest
+
+from coin_profitability_scraper import step_cache
+from coin_profitability_scraper.step_cache import (
+    cached_step,
+    compute_step_fingerprint,
+)
+
+
+def test_cached_step_skips_unchanged_inputs(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that a step only re-runs when its inputs or outputs change."""
+    monkeypatch.setattr(step_cache, "step_cache_folder", tmp_path / "step_cache")
+    monkeypatch.delenv("DISABLE_STEP_CACHE", raising=False)
+    input_path = tmp_path / "input.json"
+    output_path = tmp_path / "output.txt"
+    run_count = 0
+
+    @cached_step(inputs=[input_path], outputs=[output_path])
+    def step() -> None:
+        nonlocal run_count
+        run_count += 1
+        output_path.write_text(input_path.read_text().upper())
+
+    input_path.write_text('{"coin": "monero"}')
+    step()
+    step()
+    assert run_count == 1
+
+    # Changed input: re-run.
+    input_path.write_text('{"coin": "bitcoin"}')
+    step()
+    assert run_count == 2  # noqa: PLR2004
+    assert output_path.read_text() == '{"COIN": "BITCOIN"}'
+
+    # Deleted or modified output: re-run.
+    output_path.unlink()
+    step()
+    output_path.write_text("tampered")
+    step()
+    assert run_count == 4  # noqa: PLR2004
+    step()
+    assert run_count == 4  # noqa: PLR2004
+
+    # Disabled cache: always run.
+    monkeypatch.setenv("DISABLE_STEP_CACHE", "true")
+    step()
+    assert run_count == 5  # noqa: PLR2004
+
+
+def test_compute_step_fingerprint_hashes_folders(tmp_path: Path) -> None:
+    """Test that a folder input's fingerprint covers its file names and content."""
+    (tmp_path / "a.html").write_text("<p>a</p>")
+
+    def step() -> None:
+        pass
+
+    fingerprint = compute_step_fingerprint(step, [tmp_path])
+    assert compute_step_fingerprint(step, [tmp_path]) == fingerprint
+
+    (tmp_path / "a.html").rename(tmp_path / "b.html")
+    assert compute_step_fingerprint(step, [tmp_path]) != fingerprint
+
+    with pytest.raises(FileNotFoundError):
+        compute_step_fingerprint(step, [tmp_path / "missing"])
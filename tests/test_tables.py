@@ -0,0 +1,13 @@
+"""Tests for tables.py."""
+
+from coin_profitability_scraper.tables import table_to_path_and_schema
+
+
+def test_schema_rules_have_no_python_udfs() -> None:
+    """Ensure no `dy.rule` calls back into Python per row (e.g., `map_elements`)."""
+    for table_name, (_path, schema) in table_to_path_and_schema.items():
+        rules = schema._schema_validation_rules()  # pyright: ignore[reportPrivateUsage]  # noqa: SLF001
+        for rule_name, rule in rules.items():
+            assert "python_udf" not in str(rule.expr), (
+                f"Rule {table_name}.{rule_name} uses a Python UDF: {rule.expr}"
+            )